@@ -108,6 +108,44 @@ app.register_blueprint(unified_metrics_bp)
 app.register_blueprint(news_bp)
 app.register_blueprint(water_quality_bp)  # ✅ YENİ: K-Means Su Kalitesi
 
+def setup_cache_invalidation(use_mongodb):
+    """Ingest versiyon belgesine göre worker önbelleklerini düşür (bkz. cache_versions)
+
+    Import sırasında yalnızca handler'lar kaydedilir; /api/reload bunları
+    MongoDB olmadan da doğrudan çalıştırır.
+    """
+    from cache_versions import get_version_watcher
+    from data_loader_mongodb import get_data_loader
+    from routes.unified_forecast_routes import reset_unified_data
+    from routes.water_quality_routes import load_models as load_water_quality_models
+    from routes.news_routes import reset_news_stats_cache
+    
+    watcher = get_version_watcher()
+    
+    # Dosya tabanlı tahmin/metrik global'leri ve birleştirilmiş veri
+    watcher.register("predictions", lambda _: load_data())
+    watcher.register("predictions", reset_unified_data)
+    # Model sözlükleri
+    watcher.register("models", lambda _: load_models())
+    watcher.register("models", lambda _: load_water_quality_models())
+    watcher.register("news", reset_news_stats_cache)
+    if not use_mongodb:
+        return
+    
+    # MongoDBDataLoader önbelleği - sadece ilgili anahtarlar
+    for dataset in ("observations", "predictions", "training_data", "models",
+                    "lakes", "quality", "system_config"):
+        watcher.register(dataset, lambda d: get_data_loader().invalidate_dataset(d))
+    
+    # Bağlantı, referans sayaçlar ve change stream worker içinde ilk istekte
+    # kurulur (gunicorn --preload: master'da açılan thread fork'a geçmez)
+    @app.before_request
+    def poll_data_versions():
+        watcher.ensure_started()
+        watcher.poll()
+
+setup_cache_invalidation(bool(os.getenv('MONGODB_URI')))
+
 # Debug: Print all registered routes
 print("🔍 Registered routes:")
 for rule in app.url_map.iter_rules():
@@ -162,6 +200,21 @@ def initialize_data():
     except Exception as e:
         log_error(f"❌ Model yükleme hatası: {e}")
     
+    # Hot sorguların index kullanımını doğrula (VERIFY_QUERY_INDEXES=warn|fail)
+    verify_mode = os.getenv('VERIFY_QUERY_INDEXES', 'off').lower()
+    if verify_mode in ('warn', 'fail'):
+        from database import get_client, get_db
+        from query_registry import verify_query_shapes
+        client = get_client()
+        try:
+            problems = verify_query_shapes(get_db(client))
+        finally:
+            client.close()
+        if problems:
+            log_error(f"❌ {len(problems)} sorgu index kullanmıyor: {[p['name'] for p in problems]}")
+            if verify_mode == 'fail':
+                raise RuntimeError("Sorgu index doğrulaması başarısız (scripts/verify_query_indexes.py --create-indexes)")
+    
     return data_success
 
 # Health check endpoint for deployment monitoring
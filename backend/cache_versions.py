@@ -0,0 +1,195 @@
+"""
+Worker'lar arası önbellek geçersiz kılma - ingest versiyon belgesi.
+
+Ingest script'leri ve /api/reload, data_versions koleksiyonundaki tek bir
+belgede veri seti başına sayaçları artırır. Her gunicorn worker'ı bu belgeyi
+ucuz bir find_one ile (en fazla poll_interval saniyede bir) okur ya da
+replica set üzerinde change stream ile anında bildirim alır; yalnızca
+sayacı değişen veri setlerinin önbelleklerini düşürür.
+
+Handler kaydı import sırasında yapılabilir, ancak MongoDB bağlantısı, ilk
+okuma ve change stream thread'i ensure_started() ile her process'te ayrı
+kurulur: gunicorn --preload master'da açılan istemci ve thread fork
+sonrası worker'lara geçmez.
+"""
+
+import os
+import time
+import threading
+from datetime import datetime
+
+from utils import log_info, log_error
+
+VERSION_COLLECTION = "data_versions"
+VERSION_DOC_ID = "ingest"
+
+# Sayaç tutulan veri setleri
+DATASETS = (
+    "observations",      # water_quantity_observations
+    "predictions",       # model_prediction_history + predictions parquet
+    "training_data",     # training_data
+    "models",            # CatBoost/K-Means model dosyaları ve metadata
+    "lakes",             # lakes
+    "quality",           # water_quality_parameters / spectral_profiles / quality_scores
+    "system_config",     # system_config
+    "news",              # news
+)
+
+
+def bump_versions(db, *datasets):
+    """Verilen veri setlerinin sayaçlarını atomik olarak artır"""
+    unknown = [d for d in datasets if d not in DATASETS]
+    if unknown:
+        raise ValueError(f"Bilinmeyen veri seti: {unknown}")
+    if not datasets:
+        return
+    db[VERSION_COLLECTION].update_one(
+        {"_id": VERSION_DOC_ID},
+        {
+            "$inc": {f"datasets.{d}": 1 for d in datasets},
+            "$set": {"updated_at": datetime.utcnow()},
+        },
+        upsert=True,
+    )
+
+
+def read_versions(db):
+    """Güncel sayaçları {veri_seti: versiyon} olarak döndür"""
+    doc = db[VERSION_COLLECTION].find_one({"_id": VERSION_DOC_ID}, {"datasets": 1})
+    return (doc or {}).get("datasets", {})
+
+
+class VersionWatcher:
+    """Versiyon belgesini izleyip değişen veri setleri için handler çağırır"""
+
+    def __init__(self, db=None, poll_interval: float = None, db_factory=None):
+        self._db = db
+        self._db_factory = db_factory
+        if poll_interval is None:
+            poll_interval = float(os.getenv("CACHE_VERSION_POLL_SECONDS", "5"))
+        self.poll_interval = poll_interval
+        self._handlers = {}
+        self._reset_process_state()
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child=self._after_fork)
+
+    def _reset_process_state(self):
+        self._seen = None
+        self._last_poll = 0.0
+        self._lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._stream_active = False
+        self._started_pid = None
+
+    def _after_fork(self):
+        # Kilitler parent'taki bir thread tarafından tutuluyor olabilir;
+        # stream thread'i ve istemci çocuğa geçmez
+        self._reset_process_state()
+        if self._db_factory is not None:
+            self._db = None
+
+    @property
+    def db(self):
+        if self._db is None and self._db_factory is not None:
+            self._db = self._db_factory()
+        return self._db
+
+    def ensure_started(self):
+        """Bu process'te bir kez: referans sayaçları oku ve change stream'i başlat"""
+        pid = os.getpid()
+        if self._started_pid == pid:
+            return
+        with self._start_lock:
+            if self._started_pid == pid:
+                return
+            self._started_pid = pid
+            self.poll(force=True)
+            self.start_change_stream()
+
+    def register(self, dataset: str, handler):
+        """dataset değiştiğinde handler(dataset) çağrılır"""
+        if dataset not in DATASETS:
+            raise ValueError(f"Bilinmeyen veri seti: {dataset}")
+        self._handlers.setdefault(dataset, []).append(handler)
+
+    def run_handlers(self, *datasets):
+        """Handler'ları bu process'te doğrudan çalıştır (sayaçlara bakmadan)"""
+        for dataset in datasets:
+            for handler in self._handlers.get(dataset, []):
+                try:
+                    handler(dataset)
+                except Exception as e:
+                    log_error(f"Önbellek geçersiz kılma hatası ({dataset}): {e}")
+
+    def _apply(self, current, handled=()):
+        """Yeni sayaçları görülenlerle karşılaştır, değişenlerin handler'larını çalıştır
+
+        handled: bu process'te zaten yenilenmiş veri setleri; sayaçları
+        güncellenir, handler'ları tekrar çalıştırılmaz.
+        """
+        if self._seen is None:
+            # İlk okuma sadece referans noktasıdır
+            self._seen = dict(current)
+            return []
+
+        changed = [d for d, v in current.items() if v != self._seen.get(d)]
+        self._seen = dict(current)
+        self.run_handlers(*[d for d in changed if d not in handled])
+        if changed:
+            log_info(f"🔄 Değişen veri setleri, önbellek düşürüldü: {changed}")
+        return changed
+
+    def poll(self, force: bool = False, handled=()):
+        """Sayaçları oku (aralık dolmadıysa hiçbir şey yapma); değişenleri döndür"""
+        now = time.monotonic()
+        if self._stream_active and not force:
+            return []
+        if not force and now - self._last_poll < self.poll_interval:
+            return []
+        if not self._lock.acquire(blocking=force):
+            return []
+        try:
+            self._last_poll = now
+            try:
+                current = read_versions(self.db)
+            except Exception as e:
+                log_error(f"Versiyon belgesi okunamadı: {e}")
+                return []
+            return self._apply(current, handled)
+        finally:
+            self._lock.release()
+
+    def start_change_stream(self):
+        """Change stream ile bildirim al; desteklenmiyorsa polling devam eder"""
+        def run():
+            pipeline = [{"$match": {"documentKey._id": VERSION_DOC_ID}}]
+            try:
+                with self.db[VERSION_COLLECTION].watch(pipeline, full_document="updateLookup") as stream:
+                    self._stream_active = True
+                    log_info("📡 Versiyon change stream'i aktif")
+                    for change in stream:
+                        doc = change.get("fullDocument") or {}
+                        with self._lock:
+                            self._apply(doc.get("datasets", {}))
+            except Exception as e:
+                log_info(f"Change stream kullanılamıyor, polling ile devam: {e}")
+            finally:
+                self._stream_active = False
+
+        thread = threading.Thread(target=run, name="data-version-stream", daemon=True)
+        thread.start()
+        return thread
+
+
+# Worker başına tek izleyici
+_watcher = None
+
+
+def get_version_watcher() -> VersionWatcher:
+    """Global izleyiciyi döndür (ilk çağrıda oluşturulur)"""
+    global _watcher
+    if _watcher is None:
+        from database import get_client, get_db
+        # Bağlantı ilk kullanımda (worker içinde) kurulur
+        _watcher = VersionWatcher(db_factory=lambda: get_db(get_client()))
+    return _watcher
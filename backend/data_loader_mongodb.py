@@ -21,6 +21,18 @@ from database import get_client, get_db
 from utils import log_info, log_error
 
 
+# Veri seti -> etkilediği önbellek anahtarı önekleri (bkz. cache_versions.DATASETS)
+DATASET_CACHE_PREFIXES = {
+    "observations": ("predictions_", "all_predictions"),
+    "predictions": ("predictions_", "all_predictions"),
+    "training_data": ("predictions_", "all_predictions", "lake_data_points", "training_data_"),
+    "models": ("model_metrics",),
+    "lakes": ("lakes",),
+    "quality": ("quality_params_", "spectral_profiles_", "quality_scores_"),
+    "system_config": ("system_config_",),
+}
+
+
 class MongoDBDataLoader:
     """MongoDB-based data loader"""
     
@@ -31,13 +43,13 @@ class MongoDBDataLoader:
         self.db = get_db(self.client, effective_db_name)
         self._cache = {}
         self._cache_timestamps = {}
-        self.cache_ttl = int(os.getenv("CACHE_TTL_SECONDS"))
+        self.cache_ttl = int(os.getenv("CACHE_TTL_SECONDS", "300"))
     
     def _is_cache_valid(self, cache_key: str) -> bool:
         """Check if cache is still valid"""
         if cache_key not in self._cache_timestamps:
             return False
-        return (datetime.now() - self._cache_timestamps[cache_key]).seconds < self.cache_ttl
+        return (datetime.now() - self._cache_timestamps[cache_key]).total_seconds() < self.cache_ttl
     
     def _get_cached_data(self, cache_key: str, fetch_func, *args, **kwargs):
         """Get data from cache or fetch if expired"""
@@ -368,6 +380,16 @@ class MongoDBDataLoader:
         self._cache_timestamps.clear()
         log_info("Cache cleared")
     
+    def invalidate_dataset(self, dataset: str):
+        """Drop only the cache entries derived from the given dataset"""
+        prefixes = DATASET_CACHE_PREFIXES.get(dataset, ())
+        stale = [key for key in self._cache if key.startswith(prefixes)]
+        for key in stale:
+            self._cache.pop(key, None)
+            self._cache_timestamps.pop(key, None)
+        if stale:
+            log_info(f"Cache invalidated for {dataset}: {stale}")
+    
     def close(self):
         """Close database connection"""
         self.client.close()
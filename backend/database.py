@@ -1,6 +1,7 @@
-from pymongo import MongoClient, GEOSPHERE  # type: ignore
+from pymongo import MongoClient, GEOSPHERE, UpdateOne, DeleteMany, InsertOne  # type: ignore
 from datetime import datetime
 import os
+import time
 try:
     from dotenv import load_dotenv  # type: ignore
     load_dotenv()
@@ -12,6 +13,7 @@ from models import (
     WaterQualityParameters, QualityTrends, SpectralProfiles, QualityScores,
     SystemConfig, TrainingData, LabelEncoder
 )
+from query_registry import ensure_query_indexes
 
 
 # --------------------------
@@ -27,7 +29,92 @@ def get_db(client, db_name: str = None):
     return client[db_name]
 
 
-def init_collections(db):
+# Koleksiyonlar time-series modunda açıldığında kullanılan şema.
+# metaField olarak lake_id seçildi; horizon/model_id üst düzey alan olarak
+# kalır, böylece mevcut {"lake_id": ...} sorguları değişmeden çalışır.
+TIMESERIES_COLLECTIONS = {
+    "water_quantity_observations": {
+        "timeField": "date",
+        "metaField": "lake_id",
+        "granularity": "hours",
+    },
+    "model_prediction_history": {
+        "timeField": "date",
+        "metaField": "lake_id",
+        "granularity": "hours",
+    },
+}
+
+# (db, koleksiyon) -> (time-series mi, kontrol zamanı). Taşıma betiği
+# koleksiyonu çalışan süreçlerin altından değiştirebildiği için sonuç
+# TIMESERIES_CACHE_TTL saniye sonra yeniden okunur.
+_timeseries_cache = {}
+TIMESERIES_CACHE_TTL = float(os.getenv("MONGODB_TIMESERIES_CACHE_TTL", "60"))
+
+
+def use_timeseries_mode():
+    """MONGODB_TIMESERIES=true ise gözlem/tahmin geçmişi time-series olarak açılır"""
+    return os.getenv("MONGODB_TIMESERIES", "false").lower() == "true"
+
+
+def is_timeseries_collection(db, name: str) -> bool:
+    """Koleksiyonun native time-series olup olmadığını (TTL önbellekli) döndür"""
+    key = (db.name, name)
+    cached = _timeseries_cache.get(key)
+    now = time.monotonic()
+    if cached is None or now - cached[1] > TIMESERIES_CACHE_TTL:
+        info = next(iter(db.list_collections(filter={"name": name})), None)
+        cached = (bool(info and info.get("type") == "timeseries"), now)
+        _timeseries_cache[key] = cached
+    return cached[0]
+
+
+def to_bson_date(val):
+    """timeField için değeri datetime'a çevir (epoch ms/s, ISO string, datetime)"""
+    if isinstance(val, datetime):
+        return val
+    if isinstance(val, (int, float)):
+        # Epoch saniye ~1.7e9; 1e11'den büyükse milisaniye (saniye olarak 5138 yılı)
+        if abs(val) > 1e11:
+            return datetime.utcfromtimestamp(val / 1000.0)
+        return datetime.utcfromtimestamp(val)
+    if isinstance(val, str):
+        try:
+            return datetime.fromisoformat(val.replace('Z', '+00:00'))
+        except ValueError:
+            return None
+    if hasattr(val, "year"):
+        return datetime(val.year, val.month, val.day)
+    return None
+
+
+def ensure_timeseries_collection(db, name: str):
+    """Time-series koleksiyonunu yoksa oluştur (varsa dokunma)"""
+    if name not in db.list_collection_names():
+        db.create_collection(name, timeseries=TIMESERIES_COLLECTIONS[name])
+    _timeseries_cache.pop((db.name, name), None)
+    return db[name]
+
+
+def upsert_ops(db, name: str, filt: dict, doc: dict):
+    """Koleksiyon tipine uygun upsert operasyonlarını üret.
+
+    Time-series koleksiyonlar unique index ve upsert desteklemediği için
+    aynı anahtarlı kayıt silinip yeniden eklenir (MongoDB 7.0+).
+    bulk_write(ordered=True) ile çalıştırılmalıdır.
+    """
+    if is_timeseries_collection(db, name):
+        timefield = TIMESERIES_COLLECTIONS[name]["timeField"]
+        filt = dict(filt, **{timefield: to_bson_date(filt[timefield])})
+        doc = dict(doc, **{timefield: filt[timefield]})
+        return [DeleteMany(filt), InsertOne(doc)]
+    return [UpdateOne(filt, {"$set": doc}, upsert=True)]
+
+
+def init_collections(db, timeseries: bool = None):
+    if timeseries is None:
+        timeseries = use_timeseries_mode()
+
     # Lakes
     lakes = db["lakes"]
     lakes.create_index([("lake_id", 1)], unique=True)
@@ -47,8 +134,12 @@ def init_collections(db):
     )
 
     # Observations (real values)
-    observations = db["water_quantity_observations"]
-    observations.create_index([("lake_id", 1), ("date", 1)], unique=True)
+    if timeseries:
+        observations = ensure_timeseries_collection(db, "water_quantity_observations")
+        observations.create_index([("lake_id", 1), ("date", 1)])
+    else:
+        observations = db["water_quantity_observations"]
+        observations.create_index([("lake_id", 1), ("date", 1)], unique=True)
 
     # Users
     users = db["users"]
@@ -66,7 +157,10 @@ def init_collections(db):
     model_metadata.create_index([("status", 1)])
 
     # Model prediction history
-    model_prediction_history = db["model_prediction_history"]
+    if timeseries:
+        model_prediction_history = ensure_timeseries_collection(db, "model_prediction_history")
+    else:
+        model_prediction_history = db["model_prediction_history"]
     model_prediction_history.create_index([("lake_id", 1), ("date", 1), ("model_id", 1), ("horizon", 1)])
 
     # Water quality parameters
@@ -97,6 +191,9 @@ def init_collections(db):
     label_encoders = db["label_encoders"]
     label_encoders.create_index([("encoder_name", 1)], unique=True)
 
+    # Hot sorguların (query_registry) compound/covering index'leri
+    ensure_query_indexes(db)
+
     return {
         "lakes": lakes,
         "satellite_images": satellite_images,
@@ -119,6 +216,8 @@ def init_collections(db):
 # --------------------------
 # Insert Functions
 # --------------------------
+# Önbellek sürümleri burada artırılmaz; yükleme betikleri batch bittikten
+# sonra cache_versions.bump_versions'ı bir kez çağırır.
 def insert_lake(db, lake: Lake):
     doc = lake.dict()
     doc["created_at"] = datetime.utcnow()
@@ -156,8 +255,10 @@ def insert_prediction(db, prediction):
 def insert_water_quantity_observation(db, obs):
     doc = obs.dict()
     doc["created_at"] = datetime.utcnow()
-    db["water_quantity_observations"].update_one(
-        {"lake_id": obs.lake_id, "date": obs.date}, {"$set": doc}, upsert=True
+    db["water_quantity_observations"].bulk_write(
+        upsert_ops(db, "water_quantity_observations",
+                   {"lake_id": obs.lake_id, "date": obs.date}, doc),
+        ordered=True,
     )
     return doc
 
@@ -187,15 +288,19 @@ def insert_model_metadata(db, model: ModelMetadata):
 def insert_model_prediction_history(db, prediction: ModelPredictionHistory):
     doc = prediction.dict()
     doc["created_at"] = datetime.utcnow()
-    db["model_prediction_history"].update_one(
-        {
-            "lake_id": prediction.lake_id,
-            "date": prediction.date,
-            "model_id": prediction.model_id,
-            "horizon": prediction.horizon
-        },
-        {"$set": doc},
-        upsert=True
+    db["model_prediction_history"].bulk_write(
+        upsert_ops(
+            db,
+            "model_prediction_history",
+            {
+                "lake_id": prediction.lake_id,
+                "date": prediction.date,
+                "model_id": prediction.model_id,
+                "horizon": prediction.horizon
+            },
+            doc,
+        ),
+        ordered=True,
     )
     return doc
 
@@ -0,0 +1,375 @@
+"""
+Göl x ufuk grupları için vektörel normalize metrikler.
+
+utils.calculate_normalized_metrics tek bir (y_true, y_pred) çifti için
+MAPE / WMAPE / NRMSE / CV-RMSE / R² hesaplıyor; çağıranlar göller ve
+ufuklar üzerinde döngü kurup yüzdelik ve ortalamaları grup başına yeniden
+hesaplıyordu. grouped_normalized_metrics() uzun formatlı tahmin tablosunu
+alır ve tüm grupları tek geçişte hesaplar:
+
+- Toplamlar (n, Σy, Σ|e|, Σe²) ve ortalamadan sapma kareleri (M2, iki
+  geçişli; 1e9-1e10 m² alanlarda Σy² - n·ȳ² iptal hatası verir) grup kodu
+  üzerinden np.bincount ile, Python döngüsü olmadan.
+- MAPE eşiği (pozitif hedeflerin %5 yüzdeliği, np.percentile 'linear' ile
+  aynı) grup kodu + değer üzerinden tek lexsort ile vektörel.
+
+GroupedMetricsState yeni tahminler geldikçe (n, ortalama, M2) ve toplamları
+Chan birleştirmesiyle artımlı günceller; ham satır tutmaz. MAPE eşiği
+toplanabilir olmadığından grup başına yalnızca pozitif hedefler ve mutlak
+yüzde hataları (hedefe göre sıralı) saklanır ve sadece dokunulan gruplar
+için yeniden hesaplanır. Sonuçlar
+unified_normalized_metrics.json'a ve lake_performance_metrics
+koleksiyonuna yazılabilir:
+
+    python grouped_metrics.py --predictions models/all_predictions_final.parquet \\
+        --unified-out models/unified_normalized_metrics.json [--mongo]
+"""
+
+import argparse
+import json
+import os
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from utils import log_info, log_error
+
+GROUP_COLS = ("lake_id", "horizon")
+# Artımlı birleştirilebilir grup istatistikleri
+STATE_COLS = ("n", "sum_y", "mean_y", "m2_y", "sum_abs_err", "sum_sq_err")
+MAPE_PERCENTILE = 5
+MAPE_DEFAULT_THRESHOLD = 1000000
+
+
+def _group_codes(df, group_cols):
+    """Satır başına grup kodu ve grup anahtarları tablosu"""
+    codes, uniques = pd.MultiIndex.from_frame(df[list(group_cols)]).factorize()
+    keys = pd.DataFrame(list(uniques), columns=list(group_cols))
+    return codes, keys
+
+
+def _moments(codes, n_groups, y, e):
+    n = np.bincount(codes, minlength=n_groups).astype(np.float64)
+    sum_y = np.bincount(codes, weights=y, minlength=n_groups)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean_y = sum_y / n
+    # İki geçiş: sapmalar grup ortalamasından (calculate_normalized_metrics ile aynı)
+    dev = y - mean_y[codes]
+    return {
+        "n": n,
+        "sum_y": sum_y,
+        "mean_y": mean_y,
+        "m2_y": np.bincount(codes, weights=dev * dev, minlength=n_groups),
+        "sum_abs_err": np.bincount(codes, weights=np.abs(e), minlength=n_groups),
+        "sum_sq_err": np.bincount(codes, weights=e * e, minlength=n_groups),
+    }
+
+
+def _merge_moments(a, b):
+    """İki grup istatistiği kümesini birleştir (Chan et al. paralel varyans)"""
+    n = a["n"] + b["n"]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        delta = b["mean_y"] - a["mean_y"]
+        mean_y = np.where(a["n"] == 0, b["mean_y"], a["mean_y"] + delta * b["n"] / n)
+        m2_y = np.where(a["n"] == 0, b["m2_y"], a["m2_y"] + b["m2_y"] + delta ** 2 * a["n"] * b["n"] / n)
+    return {
+        "n": n,
+        "sum_y": a["sum_y"] + b["sum_y"],
+        "mean_y": mean_y,
+        "m2_y": m2_y,
+        "sum_abs_err": a["sum_abs_err"] + b["sum_abs_err"],
+        "sum_sq_err": a["sum_sq_err"] + b["sum_sq_err"],
+    }
+
+
+def _sorted_mape(y_sorted, ape_sorted, percentile=MAPE_PERCENTILE):
+    """Artan sıralı pozitif hedefler ve APE'lerden tek grubun MAPE'si"""
+    if len(y_sorted) == 0:
+        return np.nan
+    threshold = np.percentile(y_sorted, percentile)
+    start = np.searchsorted(y_sorted, threshold, side="left")
+    return float(ape_sorted[start:].mean() * 100) if start < len(y_sorted) else np.nan
+
+
+def _grouped_mape(codes, n_groups, y, e, percentile=MAPE_PERCENTILE):
+    """calculate_normalized_metrics ile aynı MAPE: y >= grup içi %p yüzdelik (y > 0)"""
+    pos = y > 0
+    c, v = codes[pos], y[pos]
+    order = np.lexsort((v, c))
+    c, v = c[order], v[order]
+    counts = np.bincount(c, minlength=n_groups)
+    starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+
+    # np.percentile(method='linear'): konum (n - 1) * p / 100
+    has = counts > 0
+    rank = (np.maximum(counts, 1) - 1) * (percentile / 100.0)
+    lo = np.floor(rank).astype(np.int64)
+    hi = np.minimum(lo + 1, np.maximum(counts, 1) - 1)
+    frac = rank - lo
+    lo_val = v[np.minimum(starts + lo, len(v) - 1)] if len(v) else np.zeros(n_groups)
+    hi_val = v[np.minimum(starts + hi, len(v) - 1)] if len(v) else np.zeros(n_groups)
+    threshold = np.where(has, lo_val + (hi_val - lo_val) * frac, MAPE_DEFAULT_THRESHOLD)
+
+    valid = pos & (y >= threshold[codes])
+    ape = np.zeros_like(y)
+    ape[valid] = np.abs(e[valid] / y[valid])
+    n_valid = np.bincount(codes, weights=valid.astype(np.float64), minlength=n_groups)
+    sum_ape = np.bincount(codes, weights=ape, minlength=n_groups)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(n_valid > 0, sum_ape / n_valid * 100, np.nan)
+
+
+def _finalize(stats):
+    """Toplamlardan metrikler (calculate_normalized_metrics anahtarları + MAE/RMSE)"""
+    n = stats["n"]
+    mean_y = stats["mean_y"]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        rmse = np.sqrt(stats["sum_sq_err"] / n)
+        ss_tot = stats["m2_y"]
+        r2 = np.where(ss_tot != 0, 1 - stats["sum_sq_err"] / ss_tot, 0.0)
+        stats["MAE"] = stats["sum_abs_err"] / n
+        stats["RMSE"] = rmse
+        stats["WMAPE"] = stats["sum_abs_err"] / stats["sum_y"] * 100
+        stats["NRMSE"] = rmse / mean_y * 100
+        stats["CV_RMSE"] = rmse / mean_y * 100
+        stats["R2"] = r2
+    stats["sample_count"] = n.astype(np.int64)
+    return stats
+
+
+def grouped_normalized_metrics(df, group_cols=GROUP_COLS, y_true="y_true", y_pred="y_pred"):
+    """Uzun formatlı tahminler -> grup başına tüm metrikler (tek geçiş)
+
+    NaN hedef/tahmin satırları calculate_normalized_metrics'teki gibi atılır.
+    """
+    y = df[y_true].to_numpy(dtype=np.float64)
+    p = df[y_pred].to_numpy(dtype=np.float64)
+    mask = ~(np.isnan(y) | np.isnan(p))
+    df = df.loc[mask]
+    y, p = y[mask], p[mask]
+    codes, keys = _group_codes(df, group_cols)
+    e = y - p
+    stats = _moments(codes, len(keys), y, e)
+    stats["MAPE"] = _grouped_mape(codes, len(keys), y, e)
+    result = pd.concat([keys, pd.DataFrame(_finalize(stats))], axis=1)
+    return result.sort_values(list(group_cols), kind="stable").reset_index(drop=True)
+
+
+class GroupedMetricsState:
+    """Artımlı grup metrikleri: yeni tahminler grup istatistiklerine eklenir
+
+    Bellek grup sayısı + MAPE için saklanan pozitif hedef sayısıyla
+    büyür; güncelleme maliyeti partinin ve dokunduğu grupların boyutudur.
+    """
+
+    def __init__(self, group_cols=GROUP_COLS, y_true="y_true", y_pred="y_pred"):
+        self.group_cols = list(group_cols)
+        self.y_true = y_true
+        self.y_pred = y_pred
+        self._index = {}       # grup anahtarı -> satır
+        self._keys = []
+        self._stats = {c: np.zeros(0) for c in STATE_COLS}
+        self._mape_rows = []   # satır başına (artan y, aynı sıradaki |e|/y), yalnızca y > 0
+        self._mape = np.zeros(0)
+
+    def _rows_for(self, keys):
+        rows = []
+        for key in keys.itertuples(index=False, name=None):
+            if key not in self._index:
+                self._index[key] = len(self._keys)
+                self._keys.append(key)
+                self._mape_rows.append((np.zeros(0), np.zeros(0)))
+            rows.append(self._index[key])
+        grow = len(self._keys) - len(self._mape)
+        if grow:
+            for c in STATE_COLS:
+                self._stats[c] = np.concatenate([self._stats[c], np.zeros(grow)])
+            self._mape = np.concatenate([self._mape, np.full(grow, np.nan)])
+        return np.asarray(rows, dtype=np.int64)
+
+    def update(self, df):
+        """Yeni tahmin satırlarını ekle; güncellenen grup sayısını döndür"""
+        df = df[[*self.group_cols, self.y_true, self.y_pred]]
+        df = df[df[self.y_true].notna() & df[self.y_pred].notna()]
+        if df.empty:
+            return 0
+        codes, keys = _group_codes(df, self.group_cols)
+        y = df[self.y_true].to_numpy(dtype=np.float64)
+        e = y - df[self.y_pred].to_numpy(dtype=np.float64)
+        rows = self._rows_for(keys)
+
+        batch = _moments(codes, len(keys), y, e)
+        merged = _merge_moments({c: self._stats[c][rows] for c in STATE_COLS}, batch)
+        for c in STATE_COLS:
+            self._stats[c][rows] = merged[c]
+
+        # MAPE: partinin pozitif hedefleri grup başına sıralı dizilere eklenir
+        pos = y > 0
+        c, v, ape = codes[pos], y[pos], np.abs(e[pos] / y[pos])
+        order = np.lexsort((v, c))
+        c, v, ape = c[order], v[order], ape[order]
+        bounds = np.searchsorted(c, np.arange(len(keys) + 1))
+        for g, row in enumerate(rows):
+            lo, hi = bounds[g], bounds[g + 1]
+            if lo < hi:
+                old_v, old_ape = self._mape_rows[row]
+                all_v = np.concatenate([old_v, v[lo:hi]])
+                all_ape = np.concatenate([old_ape, ape[lo:hi]])
+                merge = np.argsort(all_v, kind="mergesort")
+                self._mape_rows[row] = (all_v[merge], all_ape[merge])
+            self._mape[row] = _sorted_mape(*self._mape_rows[row])
+        return len(keys)
+
+    def metrics(self):
+        keys = pd.DataFrame(self._keys, columns=self.group_cols)
+        stats = {c: self._stats[c].copy() for c in STATE_COLS}
+        stats["MAPE"] = self._mape.copy()
+        result = pd.concat([keys, pd.DataFrame(_finalize(stats))], axis=1)
+        return result.sort_values(self.group_cols, kind="stable").reset_index(drop=True)
+
+
+# ---------------------------------------------------------------------------
+# Çıktılar
+# ---------------------------------------------------------------------------
+
+def unified_entry(lake_name, wmape, r2, samples):
+    """unified_normalized_metrics.json göl kaydı
+
+    r2 > 0 ise skor %50 WMAPE (100 - 5*wmape) + %50 R²; değilse yalnızca
+    WMAPE (100 - 10*wmape). Eşikler mevcut dosyadaki değerlerle aynıdır.
+    """
+    r2 = 0.0 if r2 is None or not np.isfinite(r2) or r2 < 0 else float(r2)
+    wmape = float(wmape)
+    if r2 > 0:
+        score = 0.5 * max(0.0, 100 - 5 * wmape) + 0.5 * r2 * 100
+    else:
+        score = max(0.0, 100 - 10 * wmape)
+    if score >= 90:
+        reliability = "Mukemmel"
+    elif score >= 80:
+        reliability = "Iyi"
+    elif score >= 60:
+        reliability = "Orta"
+    else:
+        reliability = "Zayif"
+    return {
+        "lake_name": lake_name,
+        "wmape": wmape,
+        "r2": r2,
+        "samples": int(samples),
+        "unified_score": round(score, 2),
+        "reliability": reliability,
+        "data_quality": "Good" if samples >= 50 else "Limited",
+    }
+
+
+def unified_metrics(metrics, lake_names):
+    """grouped metrikler -> {'H1': {lake_id: kayıt}}"""
+    result = {}
+    for row in metrics.itertuples(index=False):
+        lake_key = str(int(row.lake_id))
+        result.setdefault(f"H{int(row.horizon)}", {})[lake_key] = unified_entry(
+            lake_names.get(lake_key, lake_key), row.WMAPE, row.R2, row.sample_count
+        )
+    return result
+
+
+def lake_performance_documents(metrics, lake_names):
+    """lake_performance_metrics koleksiyonu belgeleri"""
+    now = datetime.utcnow()
+    docs = []
+    for row in metrics.itertuples(index=False):
+        lake_key = str(int(row.lake_id))
+        docs.append({
+            "lake_id": int(row.lake_id),
+            "lake_name": lake_names.get(lake_key, lake_key),
+            "horizon": f"H{int(row.horizon)}",
+            "performance_metrics": {
+                "r2": float(row.R2),
+                "wmape": float(row.WMAPE),
+                "mape": None if np.isnan(row.MAPE) else float(row.MAPE),
+                "nrmse": float(row.NRMSE),
+                "mae": float(row.MAE),
+                "rmse": float(row.RMSE),
+                "samples": int(row.sample_count),
+            },
+            "updated_at": now,
+        })
+    return docs
+
+
+def sync_lake_performance_metrics(db, docs):
+    """Belgeleri (lake_id, horizon) anahtarıyla tek bulk_write ile upsert et"""
+    from pymongo import ReplaceOne
+
+    if not docs:
+        return 0
+    ops = [ReplaceOne({"lake_id": d["lake_id"], "horizon": d["horizon"]}, d, upsert=True) for d in docs]
+    result = db["lake_performance_metrics"].bulk_write(ops, ordered=False)
+    return result.upserted_count + result.modified_count
+
+
+def predictions_frame(path, split="test"):
+    """all_predictions_*.parquet -> (lake_id, horizon, y_true, y_pred)
+
+    split: yalnızca bu split_type satırları (unified metrikler test
+    üzerinden); None verilirse tüm satırlar.
+    """
+    df = pd.read_parquet(path)
+    if split is not None and "split_type" in df.columns:
+        df = df[df["split_type"] == split]
+    return pd.DataFrame({
+        "lake_id": df["lake_id"],
+        "horizon": df["H"],
+        "y_true": df["target_water_area_m2"],
+        "y_pred": df["predicted_water_area_m2"],
+    }).reset_index(drop=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Göl x ufuk metriklerini tek geçişte yeniden üret")
+    parser.add_argument("--predictions", default=os.path.join("models", "all_predictions_final.parquet"))
+    parser.add_argument("--unified-out", default=os.path.join("models", "unified_normalized_metrics.json"))
+    parser.add_argument("--split", default="test", choices=["train", "val", "test", "all"],
+                        help="Metriklerin hesaplanacağı split_type (varsayılan: test)")
+    parser.add_argument("--mongo", action="store_true", help="lake_performance_metrics koleksiyonunu da güncelle")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    metrics = grouped_normalized_metrics(
+        predictions_frame(args.predictions, None if args.split == "all" else args.split)
+    )
+    log_info(f"{len(metrics)} göl x ufuk grubu {1000 * (time.perf_counter() - start):.1f} ms")
+
+    # Göl adları: mevcut unified dosyası, --mongo ile lakes koleksiyonu
+    lake_names = {}
+    if os.path.exists(args.unified_out):
+        with open(args.unified_out, "r", encoding="utf-8") as f:
+            for lakes in json.load(f).values():
+                lake_names.update({k: v.get("lake_name", k) for k, v in lakes.items()})
+    db = None
+    if args.mongo:
+        from database import get_client, get_db
+
+        db = get_db(get_client())
+        lake_names.update({str(l["lake_id"]): l["name"] for l in db["lakes"].find({}, {"lake_id": 1, "name": 1})})
+
+    with open(args.unified_out, "w", encoding="utf-8") as f:
+        json.dump(unified_metrics(metrics, lake_names), f, indent=2, ensure_ascii=False)
+    log_info(f"Yazıldı: {args.unified_out}")
+
+    if db is not None:
+        try:
+            from cache_versions import bump_versions
+
+            count = sync_lake_performance_metrics(db, lake_performance_documents(metrics, lake_names))
+            bump_versions(db, "models")
+            log_info(f"lake_performance_metrics: {count} belge güncellendi")
+        except Exception as e:
+            log_error(f"lake_performance_metrics güncellenemedi: {e}")
+
+
+if __name__ == "__main__":
+    main()
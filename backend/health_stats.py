@@ -0,0 +1,108 @@
+"""
+Sağlık kontrolleri için önbellekli koleksiyon istatistikleri.
+
+Orkestratör probları sık geldiği için istekler MongoDB'ye gitmez; sayımlar
+(estimated_document_count - metadata'dan okunur, tarama yapmaz) arka plan
+thread'inde yenilenir. Art arda başarısız yenilemeler basit bir devre
+kesiciyi (breaker) açar; açıkken yenileme aralığı uzatılır.
+"""
+
+import os
+import time
+import threading
+from datetime import datetime
+
+from utils import log_info, log_error
+
+HEALTH_COLLECTIONS = ['lakes', 'predictions', 'water_quality_measurements', 'news']
+
+
+class CollectionStatsCache:
+    """Arka planda yenilenen koleksiyon istatistikleri + MongoDB devre kesicisi"""
+
+    def __init__(self, get_db, collections=None, refresh_seconds: float = None,
+                 failure_threshold: int = 3):
+        self._get_db = get_db
+        self.collections = collections or HEALTH_COLLECTIONS
+        if refresh_seconds is None:
+            refresh_seconds = float(os.getenv("HEALTH_STATS_REFRESH_SECONDS", "30"))
+        self.refresh_seconds = refresh_seconds
+        self.failure_threshold = failure_threshold
+        self.stats = {}
+        self.last_refresh = None        # monotonic zaman
+        self.last_refresh_at = None     # ISO zaman (yanıt için)
+        self.last_error = None
+        self.consecutive_failures = 0
+        self._thread = None
+        self._thread_pid = None
+        self._lock = threading.Lock()
+        self._start_lock = threading.Lock()
+
+    @property
+    def breaker_open(self) -> bool:
+        return self.consecutive_failures >= self.failure_threshold
+
+    @property
+    def is_stale(self) -> bool:
+        if self.last_refresh is None:
+            return True
+        return time.monotonic() - self.last_refresh > 3 * self.refresh_seconds
+
+    def refresh(self):
+        """Ping + tahmini sayımlar; sonucu önbelleğe yaz"""
+        try:
+            db = self._get_db()
+            db.command('ping')
+            stats = {}
+            for name in self.collections:
+                stats[name] = db[name].estimated_document_count()
+            with self._lock:
+                self.stats = stats
+                self.last_refresh = time.monotonic()
+                self.last_refresh_at = datetime.now().isoformat()
+                self.last_error = None
+                self.consecutive_failures = 0
+        except Exception as e:
+            with self._lock:
+                self.last_error = str(e)[:100]
+                self.consecutive_failures += 1
+            log_error(f"Sağlık istatistikleri yenilenemedi ({self.consecutive_failures}): {e}")
+
+    def _run(self):
+        while True:
+            # Breaker açıkken MongoDB'yi zorlamamak için bekleme uzar
+            delay = self.refresh_seconds * (4 if self.breaker_open else 1)
+            time.sleep(delay)
+            self.refresh()
+
+    def start(self):
+        """Arka plan yenileyicisini (process başına bir kez) başlat
+
+        İlk yenileme senkron yapılır; aksi halde worker'ın ilk probu
+        henüz hiç yenilenmemiş önbelleği "stale" görüp 503 döner.
+        """
+        pid = os.getpid()
+        if self._thread_pid == pid:
+            return
+        with self._start_lock:
+            if self._thread_pid == pid:
+                return
+            self.refresh()
+            self._thread = threading.Thread(target=self._run, name="health-stats", daemon=True)
+            self._thread.start()
+            self._thread_pid = pid
+        log_info(f"🩺 Sağlık istatistikleri her {self.refresh_seconds:.0f}s yenilenecek")
+
+    def snapshot(self):
+        """Yanıta konacak, I/O yapmayan durum özeti"""
+        with self._lock:
+            return {
+                "collections": dict(self.stats),
+                "refreshed_at": self.last_refresh_at,
+                "stale": self.is_stale,
+                "breaker": {
+                    "state": "open" if self.breaker_open else "closed",
+                    "consecutive_failures": self.consecutive_failures,
+                    "last_error": self.last_error,
+                },
+            }
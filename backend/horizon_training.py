@@ -0,0 +1,202 @@
+"""
+Çok ufuklu (H1/H2/H3) CatBoost eğitim sürücüsü.
+
+water-quantity/training/train_model.py ve scripts/train_from_mongodb.py
+ufukları sırayla eğitiyor, her ufuk için DataFrame'leri yeniden dilimleyip
+CatBoost veri yapılarını her fit'te baştan kuruyordu. Burada:
+
+- Özellik matrisi split başına bir kez (float32) kurulur; ufuklar yalnızca
+  satır indeksleridir.
+- Ufuk başına Pool'lar bir kez oluşturulup önbelleğe alınır; eğitim
+  Pool'u quantize edilir ve (veri parmak izi ile) diske kaydedilebilir,
+  aynı veriyle tekrar eğitimde quantization atlanır.
+- Ufuklar eşzamanlı eğitilir; CPU thread'leri ufuklar arasında bölünür
+  (CatBoost fit'i GIL'i bıraktığı için thread havuzu yeterli).
+- Ufuk başına fit süresi ve toplam duvar süresi raporlanır.
+"""
+
+import hashlib
+import os
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from utils import log_info, log_error
+
+HORIZONS = (1, 2, 3)
+BORDER_COUNT = 254
+
+FeatureMatrix = namedtuple("FeatureMatrix", ["X", "y", "horizon", "feature_names"])
+
+
+def fill_missing_features(train_df, val_df, test_df, target_col, keep=("lake_id",)):
+    """Sayısal eksikleri train medyanıyla, kalanları ffill ile doldur (yerinde)"""
+    num_cols = train_df.select_dtypes(include=[np.number]).columns.tolist()
+    num_cols = [c for c in num_cols if c not in (*keep, target_col)]
+    medians = train_df[num_cols].median()
+    for df in (train_df, val_df, test_df):
+        df[num_cols] = df[num_cols].fillna(medians)
+        df.ffill(inplace=True)
+    return train_df, val_df, test_df
+
+
+def build_feature_matrix(df, feature_cols, target_col, horizon_col):
+    """DataFrame -> FeatureMatrix (tek seferlik float32 kopya)"""
+    X = np.ascontiguousarray(df[feature_cols].to_numpy(dtype=np.float32))
+    y = df[target_col].to_numpy(dtype=np.float64)
+    horizon = df[horizon_col].to_numpy()
+    return FeatureMatrix(X, y, horizon, list(feature_cols))
+
+
+def horizon_rows(matrix, horizon):
+    """Ufkun satır indeksleri (kaynak DataFrame sırasıyla)"""
+    return np.flatnonzero(matrix.horizon == horizon)
+
+
+def _fingerprint(X, y, feature_names, border_count):
+    digest = hashlib.sha1()
+    digest.update(np.ascontiguousarray(X).tobytes())
+    digest.update(np.ascontiguousarray(y).tobytes())
+    digest.update(",".join(feature_names).encode("utf-8"))
+    digest.update(str(border_count).encode("utf-8"))
+    return digest.hexdigest()[:16]
+
+
+class HorizonPools:
+    """Split/ufuk başına CatBoost Pool önbelleği"""
+
+    def __init__(self, matrices, cache_dir=None, border_count=BORDER_COUNT):
+        self.matrices = matrices  # {"train": FeatureMatrix, "val": ..., "test": ...}
+        self.cache_dir = cache_dir
+        self.border_count = border_count
+        self._pools = {}
+        self._rows = {}
+
+    def rows(self, split, horizon):
+        key = (split, horizon)
+        if key not in self._rows:
+            self._rows[key] = horizon_rows(self.matrices[split], horizon)
+        return self._rows[key]
+
+    def has(self, split, horizon):
+        return split in self.matrices and len(self.rows(split, horizon)) > 0
+
+    def data(self, split, horizon):
+        """(X, y) dilimi"""
+        matrix = self.matrices[split]
+        rows = self.rows(split, horizon)
+        return matrix.X[rows], matrix.y[rows]
+
+    def get(self, split, horizon):
+        """Pool (train: quantize edilmiş; val/test: ham, eğitim sınırlarıyla quantize edilir)"""
+        key = (split, horizon)
+        if key not in self._pools:
+            self._pools[key] = self._build(split, horizon)
+        return self._pools[key]
+
+    def _build(self, split, horizon):
+        from catboost import Pool
+
+        X, y = self.data(split, horizon)
+        names = self.matrices[split].feature_names
+        if split != "train":
+            return Pool(X, label=y, feature_names=names)
+
+        path = None
+        if self.cache_dir:
+            fp = _fingerprint(X, y, names, self.border_count)
+            path = os.path.join(self.cache_dir, f"train_H{horizon}_{fp}.quantized")
+            if os.path.exists(path):
+                log_info(f"H{horizon}: quantized pool önbellekten yüklendi ({path})")
+                return Pool(f"quantized://{path}")
+
+        start = time.perf_counter()
+        pool = Pool(X, label=y, feature_names=names)
+        pool.quantize(border_count=self.border_count)
+        log_info(f"H{horizon}: pool quantize edildi ({len(y)} satır, {time.perf_counter() - start:.1f}s)")
+        if path:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            pool.save(path)
+        return pool
+
+    def prepare(self, horizons):
+        """Pool'ları eğitimden önce (sırayla) hazırla"""
+        for horizon in horizons:
+            for split in ("train", "val"):
+                if self.has(split, horizon):
+                    self.get(split, horizon)
+
+
+def split_threads(n_jobs, total_threads=None):
+    """Toplam CPU thread'lerini eşzamanlı işlere böl"""
+    total_threads = total_threads or os.cpu_count() or 1
+    return max(1, total_threads // max(1, n_jobs))
+
+
+def train_horizons(pools, params, horizons=HORIZONS, fit_params=None, total_threads=None,
+                   max_parallel=None, train_dir="catboost_info"):
+    """Ufukları eşzamanlı eğit -> (sonuçlar, rapor)
+
+    sonuçlar: {H: {"model", "fit_seconds", "best_iteration"}}; eğitim
+    verisi olmayan ya da hata veren ufuklar {"error": ...} içerir.
+    """
+    from catboost import CatBoostRegressor
+
+    horizons = [h for h in horizons if pools.has("train", h)]
+    if not horizons:
+        return {}, {"wall_seconds": 0.0, "horizons": {}}
+    parallel = min(len(horizons), max_parallel or len(horizons))
+    threads = split_threads(parallel, total_threads)
+    pools.prepare(horizons)
+    log_info(f"{len(horizons)} ufuk eğitiliyor: {parallel} paralel x {threads} thread")
+
+    def fit(horizon):
+        start = time.perf_counter()
+        try:
+            model = CatBoostRegressor(
+                **params,
+                thread_count=threads,
+                # Eşzamanlı fit'ler aynı catboost_info klasörüne yazmasın
+                train_dir=os.path.join(train_dir, f"H{horizon}"),
+            )
+            kwargs = dict(fit_params or {})
+            if pools.has("val", horizon):
+                kwargs["eval_set"] = pools.get("val", horizon)
+            else:
+                kwargs.pop("early_stopping_rounds", None)
+                kwargs.pop("use_best_model", None)
+            model.fit(pools.get("train", horizon), **kwargs)
+            result = {"model": model, "best_iteration": model.get_best_iteration()}
+        except Exception as e:
+            log_error(f"H{horizon} eğitimi başarısız: {e}")
+            result = {"error": str(e)}
+        result["fit_seconds"] = time.perf_counter() - start
+        return horizon, result
+
+    wall_start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=parallel) as executor:
+        results = dict(executor.map(fit, horizons))
+    wall = time.perf_counter() - wall_start
+
+    report = {
+        "wall_seconds": round(wall, 2),
+        "threads_per_horizon": threads,
+        "parallel": parallel,
+        "horizons": {
+            f"H{h}": {
+                "fit_seconds": round(r["fit_seconds"], 2),
+                "best_iteration": r.get("best_iteration"),
+                "train_rows": int(len(pools.rows("train", h))),
+                "error": r.get("error"),
+            }
+            for h, r in results.items()
+        },
+    }
+    for h in horizons:
+        info = report["horizons"][f"H{h}"]
+        log_info(f"H{h}: fit {info['fit_seconds']:.1f}s, best_iteration={info['best_iteration']}")
+    serial = sum(r["fit_seconds"] for r in results.values())
+    log_info(f"Toplam duvar süresi {wall:.1f}s (ardışık toplam {serial:.1f}s)")
+    return results, report
@@ -0,0 +1,406 @@
+"""
+Çok ufuklu CatBoost modelleri için paralel Optuna hiperparametre araması.
+
+catboost_H*_optuna.pkl modelleri bir aramadan geliyordu ama tekrar
+kullanılabilir bir arama sürücüsü yoktu. Burada:
+
+- Veri, train_model.py ile aynı adımlarla (fill_missing_features,
+  build_feature_matrix) bir kez hazırlanıp .npy dosyalarına yazılır;
+  worker process'ler bunları mmap ile salt okunur açar (page cache
+  paylaşılır, trial başına yeniden okuma/parse yok).
+- Trial'lar birden çok process'te paralel koşar; hepsi aynı SQLite
+  study'sine yazar, yarıda kalan arama aynı komutla devam eder.
+- CatBoost iterasyonları callback ile Optuna'ya raporlanır; median ya
+  da successive-halving pruner kötü trial'ları erken keser.
+- Süre bütçesi: ufuk başına toplam saniye; bütçe dolunca koşan trial da
+  durdurulur.
+- En iyi trial tüm veriyle yeniden eğitilip backend'in okuduğu
+  metadata_H*_improved.json formatında dışa aktarılır.
+
+Kullanım (backend/ içinden):
+    python horizon_tuning.py --data-dir <output> --trials 200 --timeout 3600 --workers 4
+"""
+
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import numpy as np
+
+from horizon_training import (
+    HORIZONS, FeatureMatrix, build_feature_matrix, fill_missing_features, horizon_rows, split_threads,
+)
+from utils import log_info, log_error, get_season_name
+
+TARGET_COL = "target_water_area_m2"
+DROP_COLS = ["lake_name", "date", TARGET_COL]
+SPLITS = ("train", "val", "test")
+META_NAME = "dataset.json"
+SMALL_LAKE_MIN_SAMPLES = 10
+SEASONS = {"Kış": "winter", "İlkbahar": "spring", "Yaz": "summer", "Sonbahar": "fall"}
+
+FIXED_PARAMS = dict(loss_function="RMSE", eval_metric="RMSE", random_seed=42, verbose=0)
+
+
+def search_space(trial):
+    """metadata_H*_improved.json'daki best_params anahtarları"""
+    return {
+        "iterations": trial.suggest_int("iterations", 300, 2000),
+        "depth": trial.suggest_int("depth", 4, 10),
+        "learning_rate": trial.suggest_float("learning_rate", 0.01, 0.3, log=True),
+        "l2_leaf_reg": trial.suggest_float("l2_leaf_reg", 1.0, 30.0, log=True),
+        "random_strength": trial.suggest_float("random_strength", 0.0, 2.0),
+        "bagging_temperature": trial.suggest_float("bagging_temperature", 0.0, 2.0),
+        "border_count": trial.suggest_int("border_count", 32, 255),
+    }
+
+
+# ---------------------------------------------------------------------------
+# Veri önbelleği (bir kez yaz, worker'larda mmap ile oku)
+# ---------------------------------------------------------------------------
+
+def export_dataset(data_dir, cache_dir):
+    """*_combined.parquet -> {cache_dir}/{split}_{X,y,H,lake,month}.npy + dataset.json"""
+    import pandas as pd
+
+    frames = {s: pd.read_parquet(os.path.join(data_dir, f"{s}_combined.parquet")) for s in SPLITS}
+    fill_missing_features(frames["train"], frames["val"], frames["test"], TARGET_COL)
+    feature_cols = [c for c in frames["train"].columns if c not in DROP_COLS]
+
+    os.makedirs(cache_dir, exist_ok=True)
+    meta_path = os.path.join(cache_dir, META_NAME)
+    if os.path.exists(meta_path):
+        os.remove(meta_path)
+    lake_names = {}
+    for split, df in frames.items():
+        matrix = build_feature_matrix(df, feature_cols, TARGET_COL, "H")
+        arrays = {
+            "X": matrix.X,
+            "y": matrix.y,
+            "H": matrix.horizon,
+            "lake": df["lake_id"].to_numpy(),
+            "month": pd.to_datetime(df["date"]).dt.month.to_numpy(),
+        }
+        for name, array in arrays.items():
+            np.save(os.path.join(cache_dir, f"{split}_{name}.npy"), array)
+        if "lake_name" in df.columns:
+            for lake_id, name in df[["lake_id", "lake_name"]].drop_duplicates().itertuples(index=False):
+                lake_names[str(int(lake_id))] = name
+
+    # En son yazılır: yarım kalmış klasör kullanılmaz
+    with open(meta_path, "w", encoding="utf-8") as f:
+        json.dump({"feature_names": feature_cols, "lake_names": lake_names}, f, ensure_ascii=False)
+    log_info(f"Veri önbelleği yazıldı: {cache_dir}")
+
+
+def dataset_exists(cache_dir):
+    return os.path.exists(os.path.join(cache_dir, META_NAME))
+
+
+def load_dataset(cache_dir, mmap=True):
+    """-> ({split: FeatureMatrix}, {split: (lake, month)}, meta); diziler salt okunur mmap"""
+    mode = "r" if mmap else None
+    with open(os.path.join(cache_dir, META_NAME), "r", encoding="utf-8") as f:
+        meta = json.load(f)
+
+    def load(split, name):
+        return np.load(os.path.join(cache_dir, f"{split}_{name}.npy"), mmap_mode=mode)
+
+    matrices, extras = {}, {}
+    for split in SPLITS:
+        matrices[split] = FeatureMatrix(load(split, "X"), load(split, "y"), load(split, "H"), meta["feature_names"])
+        extras[split] = (load(split, "lake"), load(split, "month"))
+    return matrices, extras, meta
+
+
+# ---------------------------------------------------------------------------
+# Trial
+# ---------------------------------------------------------------------------
+
+class _PruningCallback:
+    """CatBoost iterasyonlarını trial'a raporlar; prune ya da süre dolunca eğitimi keser"""
+
+    def __init__(self, trial, deadline=None, report_every=25, metric="RMSE"):
+        self.trial = trial
+        self.deadline = deadline
+        self.report_every = report_every
+        self.metric = metric
+        self.stopped = None  # None | "pruned" | "timeout"
+
+    def after_iteration(self, info):
+        if self.deadline is not None and time.time() > self.deadline:
+            self.stopped = "timeout"
+            return False
+        if info.iteration % self.report_every:
+            return True
+        score = info.metrics["validation"][self.metric][-1]
+        self.trial.report(score, step=info.iteration)
+        if self.trial.should_prune():
+            self.stopped = "pruned"
+            return False
+        return True
+
+
+class Objective:
+    """Bir ufuk için trial hedefi: en iyi validation RMSE"""
+
+    def __init__(self, cache_dir, horizon, thread_count=1, deadline=None, early_stopping_rounds=100):
+        self.cache_dir = cache_dir
+        self.horizon = horizon
+        self.thread_count = thread_count
+        self.deadline = deadline
+        self.early_stopping_rounds = early_stopping_rounds
+        self._pools = None
+
+    def pools(self):
+        """(train, val) Pool'ları process başına bir kez kurulur, trial'lar arasında paylaşılır"""
+        if self._pools is None:
+            from catboost import Pool
+
+            matrices, _, _ = load_dataset(self.cache_dir)
+            pools = []
+            for split in ("train", "val"):
+                m = matrices[split]
+                rows = horizon_rows(m, self.horizon)
+                pools.append(Pool(m.X[rows], label=m.y[rows], feature_names=m.feature_names))
+            self._pools = tuple(pools)
+        return self._pools
+
+    def __call__(self, trial):
+        import optuna
+        from catboost import CatBoostRegressor
+
+        train_pool, val_pool = self.pools()
+        callback = _PruningCallback(trial, self.deadline)
+        model = CatBoostRegressor(**search_space(trial), **FIXED_PARAMS, thread_count=self.thread_count,
+                                  allow_writing_files=False)
+        model.fit(train_pool, eval_set=val_pool, early_stopping_rounds=self.early_stopping_rounds,
+                  callbacks=[callback])
+        if callback.stopped is not None:
+            raise optuna.TrialPruned(callback.stopped)
+        trial.set_user_attr("best_iteration", model.get_best_iteration())
+        return model.get_best_score()["validation"]["RMSE"]
+
+
+def _make_pruner(name):
+    import optuna
+
+    if name == "halving":
+        return optuna.pruners.SuccessiveHalvingPruner()
+    return optuna.pruners.MedianPruner(n_startup_trials=5, n_warmup_steps=100)
+
+
+def _storage(url):
+    import optuna
+
+    # Eşzamanlı process'ler SQLite kilidinde beklesin
+    return optuna.storages.RDBStorage(url, engine_kwargs={"connect_args": {"timeout": 60}})
+
+
+def _study_name(horizon):
+    return f"catboost_H{horizon}"
+
+
+def _worker(args):
+    """Process worker: paylaşılan study'de bütçe/trial sayısı dolana kadar trial koş"""
+    storage_url, cache_dir, horizon, n_trials, deadline, threads, pruner, seed = args
+    import optuna
+
+    optuna.logging.set_verbosity(optuna.logging.WARNING)
+    study = optuna.load_study(
+        study_name=_study_name(horizon),
+        storage=_storage(storage_url),
+        sampler=optuna.samplers.TPESampler(seed=seed),
+        pruner=_make_pruner(pruner),
+    )
+    objective = Objective(cache_dir, horizon, thread_count=threads, deadline=deadline)
+    timeout = None if deadline is None else max(0.0, deadline - time.time())
+    study.optimize(
+        objective,
+        timeout=timeout,
+        callbacks=[optuna.study.MaxTrialsCallback(n_trials, states=None)],
+        gc_after_trial=True,
+    )
+    return len(study.trials)
+
+
+def tune_horizon(cache_dir, horizon, storage_url, n_trials=100, timeout=None, workers=None,
+                 pruner="median", seed=42):
+    """Bir ufuk için paralel arama -> optuna.Study (mevcut study'ye devam eder)"""
+    import optuna
+
+    study = optuna.create_study(
+        study_name=_study_name(horizon),
+        storage=_storage(storage_url),
+        direction="minimize",
+        load_if_exists=True,
+    )
+    done = len(study.trials)
+    if done >= n_trials:
+        log_info(f"H{horizon}: {done} trial zaten var, arama atlanıyor")
+        return study
+
+    workers = workers or os.cpu_count() or 1
+    threads = split_threads(workers)
+    deadline = None if timeout is None else time.time() + timeout
+    log_info(f"H{horizon}: {n_trials - done} trial, {workers} process x {threads} thread"
+             + (f", bütçe {timeout:.0f}s" if timeout else ""))
+
+    start = time.perf_counter()
+    tasks = [(storage_url, cache_dir, horizon, n_trials, deadline, threads, pruner, seed + done + w)
+             for w in range(workers)]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        list(executor.map(_worker, tasks))
+
+    study = optuna.load_study(study_name=_study_name(horizon), storage=_storage(storage_url))
+    states = [t.state for t in study.trials]
+    log_info(f"H{horizon}: {len(states)} trial ({states.count(optuna.trial.TrialState.COMPLETE)} tamamlandı, "
+             f"{states.count(optuna.trial.TrialState.PRUNED)} budandı), {time.perf_counter() - start:.0f}s")
+    return study
+
+
+# ---------------------------------------------------------------------------
+# Dışa aktarma (metadata_H*_improved.json)
+# ---------------------------------------------------------------------------
+
+def _mae(y, p):
+    return float(np.mean(np.abs(y - p)))
+
+
+def _r2(y, p):
+    ss_tot = np.sum((y - y.mean()) ** 2)
+    return float(1 - np.sum((y - p) ** 2) / ss_tot) if ss_tot > 0 else float("nan")
+
+
+def _group_metrics(y, p, horizon):
+    return {
+        "horizon": horizon,
+        "mae": _mae(y, p),
+        "rmse": float(np.sqrt(np.mean((y - p) ** 2))),
+        "wmape": float(np.sum(np.abs(y - p)) / np.sum(y) * 100) if np.sum(y) else float("nan"),
+        "r2": _r2(y, p),
+        "samples": int(len(y)),
+        "mean_area": float(np.mean(y)),
+    }
+
+
+def export_best(study, cache_dir, horizon, models_dir, model_name="catboost_H{horizon}_optuna.pkl"):
+    """En iyi parametrelerle yeniden eğit; modeli ve metadata_H{H}_improved.json'ı yaz"""
+    from catboost import CatBoostRegressor
+
+    matrices, extras, meta = load_dataset(cache_dir)
+    data = {}
+    for split in SPLITS:
+        m = matrices[split]
+        rows = horizon_rows(m, horizon)
+        lake, month = extras[split]
+        data[split] = (np.asarray(m.X[rows]), np.asarray(m.y[rows]), lake[rows], month[rows])
+
+    best_params = dict(study.best_params)
+    model = CatBoostRegressor(**best_params, **FIXED_PARAMS, thread_count=os.cpu_count() or 1,
+                              allow_writing_files=False)
+    X_train, y_train = data["train"][:2]
+    X_val, y_val = data["val"][:2]
+    model.fit(X_train, y_train, eval_set=(X_val, y_val), use_best_model=True)
+
+    preds = {split: model.predict(data[split][0]) for split in SPLITS}
+    metrics = {}
+    for split in SPLITS:
+        metrics[f"{split}_mae"] = _mae(data[split][1], preds[split])
+    for split in SPLITS:
+        metrics[f"{split}_r2"] = _r2(data[split][1], preds[split])
+    metrics["overfitting_gap"] = metrics["train_r2"] - metrics["val_r2"]
+
+    y_test, lake_test, month_test = data["test"][1], data["test"][2], data["test"][3]
+    p_test = preds["test"]
+    lake_metrics, small_lakes = {}, []
+    for lake_id in np.unique(lake_test):
+        mask = lake_test == lake_id
+        key = str(int(lake_id))
+        lake_metrics[key] = {"lake_name": meta["lake_names"].get(key, key),
+                             **_group_metrics(y_test[mask], p_test[mask], horizon)}
+        if mask.sum() < SMALL_LAKE_MIN_SAMPLES:
+            small_lakes.append(int(lake_id))
+
+    season_names = np.array([get_season_name(int(m)) for m in month_test])
+    seasonal_metrics = {}
+    for season_name, key in SEASONS.items():
+        mask = season_names == season_name
+        if mask.any():
+            metrics_row = _group_metrics(y_test[mask], p_test[mask], horizon)
+            metrics_row.pop("rmse")
+            seasonal_metrics[key] = {"season_name": season_name, **metrics_row}
+
+    metadata = {
+        "horizon": horizon,
+        "training_date": datetime.now().isoformat(),
+        "best_params": best_params,
+        "selected_features": meta["feature_names"],
+        "metrics": metrics,
+        "lake_metrics": lake_metrics,
+        "seasonal_metrics": seasonal_metrics,
+        "small_lake_info": {
+            "small_lakes": small_lakes,
+            "strategies_applied": [],
+            "warnings": {
+                str(lake_id): f"Limited data ({lake_metrics[str(lake_id)]['samples']} samples). "
+                              "Predictions have higher uncertainty."
+                for lake_id in small_lakes
+            },
+        },
+        "n_features": len(meta["feature_names"]),
+        "n_samples": {split: int(len(data[split][1])) for split in SPLITS},
+        "optuna": {
+            "study_name": study.study_name,
+            "best_value": study.best_value,
+            "best_trial": study.best_trial.number,
+            "n_trials": len(study.trials),
+        },
+    }
+
+    os.makedirs(models_dir, exist_ok=True)
+    model_path = os.path.join(models_dir, model_name.format(horizon=horizon))
+    model.save_model(model_path)
+    metadata_path = os.path.join(models_dir, f"metadata_H{horizon}_improved.json")
+    with open(metadata_path, "w", encoding="utf-8") as f:
+        json.dump(metadata, f, indent=2)
+    log_info(f"H{horizon}: model -> {model_path}, metadata -> {metadata_path} "
+             f"(test MAE {metrics['test_mae']:,.0f}, R2 {metrics['test_r2']:.4f})")
+    return metadata
+
+
+def main():
+    parser = argparse.ArgumentParser(description="CatBoost ufuk modelleri için paralel Optuna araması")
+    parser.add_argument("--data-dir", required=True, help="{train,val,test}_combined.parquet klasörü")
+    parser.add_argument("--cache-dir", default=None, help="Veri önbelleği (varsayılan: <data-dir>/tuning_cache)")
+    parser.add_argument("--storage", default=None, help="Optuna storage (varsayılan: sqlite:///<cache-dir>/optuna.db)")
+    parser.add_argument("--models-dir", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "models"))
+    parser.add_argument("--horizons", type=int, nargs="+", default=list(HORIZONS))
+    parser.add_argument("--trials", type=int, default=100, help="Ufuk başına toplam trial (devam edenler dahil)")
+    parser.add_argument("--timeout", type=float, default=None, help="Ufuk başına süre bütçesi (saniye)")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--pruner", choices=["median", "halving"], default="median")
+    parser.add_argument("--rebuild-cache", action="store_true")
+    parser.add_argument("--no-export", action="store_true")
+    args = parser.parse_args()
+
+    cache_dir = args.cache_dir or os.path.join(args.data_dir, "tuning_cache")
+    if args.rebuild_cache or not dataset_exists(cache_dir):
+        export_dataset(args.data_dir, cache_dir)
+    storage_url = args.storage or f"sqlite:///{os.path.abspath(os.path.join(cache_dir, 'optuna.db'))}"
+
+    for horizon in args.horizons:
+        try:
+            study = tune_horizon(cache_dir, horizon, storage_url, n_trials=args.trials, timeout=args.timeout,
+                                 workers=args.workers, pruner=args.pruner)
+            if not args.no_export:
+                export_best(study, cache_dir, horizon, args.models_dir)
+        except Exception as e:
+            log_error(f"H{horizon} araması başarısız: {e}")
+
+
+if __name__ == "__main__":
+    main()
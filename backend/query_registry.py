@@ -0,0 +1,226 @@
+"""
+Sık kullanılan (hot) MongoDB sorgu şekillerinin merkezi kaydı.
+
+Her route/loader sorgusu burada filtre, sıralama ve projeksiyon şekliyle
+tanımlanır. verify_query_shapes() bu sorguları explain() ile çalıştırır ve
+COLLSCAN ya da bellek içi SORT gerektiren planları raporlar;
+ensure_query_indexes() ise sorguları destekleyen index'leri oluşturur.
+"""
+
+from utils import log_info, log_error
+
+# Filtre değerleri yalnızca plan seçimi için örnek değerlerdir
+QUERY_SHAPES = [
+    {
+        "name": "forecast.observations_by_lake",
+        "source": "routes/forecast_routes.get_mongodb_data",
+        "collection": "water_quantity_observations",
+        "op": "find",
+        "filter": {"lake_id": 141},
+        "projection": {"date": 1, "water_area_m2": 1, "_id": 0},
+        "sort": [("date", 1)],
+        # Covering index: projeksiyon index'ten karşılanır, FETCH gerekmez
+        "index": [("lake_id", 1), ("date", 1), ("water_area_m2", 1)],
+    },
+    {
+        "name": "forecast.prediction_history_by_lake_type",
+        "source": "routes/forecast_routes.get_mongodb_data",
+        "collection": "model_prediction_history",
+        "op": "find",
+        "filter": {"lake_id": 141, "prediction_type": "water_quantity"},
+        "projection": {"date": 1, "outputs": 1, "model_id": 1, "_id": 0},
+        "sort": [("date", 1)],
+        "index": [("prediction_type", 1), ("lake_id", 1), ("date", 1)],
+    },
+    {
+        "name": "loader.prediction_history_by_type",
+        "source": "data_loader_mongodb.get_all_predictions",
+        "collection": "model_prediction_history",
+        "op": "find",
+        "filter": {"prediction_type": "water_quantity"},
+        "projection": None,
+        "sort": None,
+        "index": [("prediction_type", 1), ("lake_id", 1), ("date", 1)],
+    },
+    {
+        "name": "lakes.predictions_count_by_type",
+        "source": "routes/system_routes.get_lakes",
+        "collection": "predictions",
+        "op": "count",
+        "filter": {"lake_id": 141, "prediction_type": "water_quantity"},
+        "index": [("prediction_type", 1), ("lake_id", 1), ("date", 1)],
+    },
+    {
+        "name": "lakes.observations_count",
+        "source": "routes/system_routes.get_lakes",
+        "collection": "water_quantity_observations",
+        "op": "count",
+        "filter": {"lake_id": 141},
+        "index": [("lake_id", 1), ("date", 1), ("water_area_m2", 1)],
+    },
+    {
+        "name": "lakes.latest_observation",
+        "source": "routes/system_routes.get_lakes",
+        "collection": "water_quantity_observations",
+        "op": "find",
+        "filter": {"lake_id": 141},
+        "projection": None,
+        "sort": [("date", -1)],
+        "index": [("lake_id", 1), ("date", 1), ("water_area_m2", 1)],
+    },
+    {
+        "name": "loader.training_data_by_lake",
+        "source": "data_loader_mongodb.get_lake_predictions",
+        "collection": "training_data",
+        "op": "find",
+        "filter": {"lake_id": 141, "target_water_area_m2": {"$ne": None}},
+        "projection": None,
+        "sort": None,
+        "index": None,  # init_collections'daki (lake_id, date, horizon, split_type) yeterli
+    },
+    {
+        "name": "loader.active_models",
+        "source": "data_loader_mongodb.get_metrics",
+        "collection": "model_metadata",
+        "op": "find",
+        "filter": {"status": "active"},
+        "projection": None,
+        "sort": None,
+        "index": None,  # init_collections'daki (status) yeterli
+    },
+    {
+        "name": "news.published_latest",
+        "source": "routes/news_routes.get_news",
+        "collection": "news",
+        "op": "find",
+        "filter": {"is_published": True},
+        "projection": None,
+        "sort": [("published_at", -1), ("_id", -1)],
+        "index": [("is_published", 1), ("published_at", -1), ("_id", -1)],
+    },
+    {
+        "name": "news.published_by_category",
+        "source": "routes/news_routes.get_news",
+        "collection": "news",
+        "op": "find",
+        "filter": {"is_published": True, "category": "Su Kalitesi"},
+        "projection": None,
+        "sort": [("published_at", -1), ("_id", -1)],
+        "index": [("is_published", 1), ("category", 1), ("published_at", -1), ("_id", -1)],
+    },
+    {
+        "name": "news.published_by_lake",
+        "source": "routes/news_routes.get_news",
+        "collection": "news",
+        "op": "find",
+        "filter": {"is_published": True, "lake_id": {"$in": ["141", 141]}},
+        "projection": None,
+        "sort": [("published_at", -1), ("_id", -1)],
+        "index": [("is_published", 1), ("lake_id", 1), ("published_at", -1), ("_id", -1)],
+    },
+]
+
+
+def get_query_shape(name):
+    """İsme göre kayıtlı sorgu şeklini döndür"""
+    for shape in QUERY_SHAPES:
+        if shape["name"] == name:
+            return shape
+    raise KeyError(f"Kayıtlı olmayan sorgu şekli: {name}")
+
+
+def _plan_stages(plan):
+    """Explain planındaki tüm stage adlarını (iç içe) topla"""
+    stages = []
+    if isinstance(plan, dict):
+        if "stage" in plan:
+            stages.append(plan["stage"])
+        for value in plan.values():
+            stages.extend(_plan_stages(value))
+    elif isinstance(plan, list):
+        for item in plan:
+            stages.extend(_plan_stages(item))
+    return stages
+
+
+def _explain_stages(result):
+    """Explain çıktısındaki kazanan plan stage'leri
+
+    find/count için queryPlanner.winningPlan okunur. Time-series koleksiyonlar
+    explain'i aggregation şeklinde döndürür: plan stages[0].$cursor.queryPlanner
+    altındadır, bucket açıldıktan sonraki $sort bellekte sıralama (SORT) demektir.
+    Sharded çıktıda her shard ayrıca gezilir.
+    """
+    stages = []
+    winning_plan = result.get("queryPlanner", {}).get("winningPlan")
+    if winning_plan:
+        stages.extend(_plan_stages(winning_plan))
+    for stage in result.get("stages", []):
+        if "$cursor" in stage:
+            stages.extend(_explain_stages(stage["$cursor"]))
+        elif "$sort" in stage:
+            stages.append("SORT")
+    for shard in (result.get("shards") or {}).values():
+        stages.extend(_explain_stages(shard))
+    return stages
+
+
+def explain_query_shape(db, shape):
+    """Sorgu şeklini explain() ile çalıştır, kazanan plandaki stage'leri döndür"""
+    coll = db[shape["collection"]]
+    if shape["op"] == "count":
+        result = db.command(
+            "explain",
+            {"count": shape["collection"], "query": shape["filter"]},
+            verbosity="queryPlanner",
+        )
+    else:
+        cursor = coll.find(shape["filter"], shape.get("projection"))
+        if shape.get("sort"):
+            cursor = cursor.sort(shape["sort"])
+        result = cursor.explain()
+
+    stages = _explain_stages(result)
+    if not stages:
+        raise ValueError("explain çıktısında kazanan plan bulunamadı")
+    return stages
+
+
+def verify_query_shapes(db, shapes=None):
+    """Kayıtlı sorguları doğrula; COLLSCAN/SORT içeren planları döndür"""
+    problems = []
+    for shape in shapes or QUERY_SHAPES:
+        if shape["collection"] not in db.list_collection_names():
+            log_info(f"⏭️  {shape['name']}: {shape['collection']} koleksiyonu yok, atlandı")
+            continue
+        try:
+            stages = explain_query_shape(db, shape)
+        except Exception as e:
+            log_error(f"{shape['name']} explain hatası: {e}")
+            problems.append({"name": shape["name"], "issue": f"explain_error: {e}"})
+            continue
+
+        issues = [s for s in ("COLLSCAN", "SORT") if s in stages]
+        if issues:
+            log_error(f"⚠️  {shape['name']} ({shape['source']}): {', '.join(issues)} -> {stages}")
+            problems.append({"name": shape["name"], "issue": ", ".join(issues), "stages": stages})
+        else:
+            log_info(f"✅ {shape['name']}: {stages}")
+    return problems
+
+
+def ensure_query_indexes(db):
+    """Kayıtlı sorguların ihtiyaç duyduğu index'leri oluştur (idempotent)"""
+    created = []
+    seen = set()
+    for shape in QUERY_SHAPES:
+        keys = shape.get("index")
+        if not keys:
+            continue
+        signature = (shape["collection"], tuple(keys))
+        if signature in seen:
+            continue
+        seen.add(signature)
+        name = db[shape["collection"]].create_index(keys)
+        created.append(f"{shape['collection']}.{name}")
+    return created
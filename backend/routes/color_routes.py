@@ -7,6 +7,7 @@ import pandas as pd
 import numpy as np
 from database_data_loader import get_lake_predictions
 from utils import resolve_lake_id, log_error
+from spectral_indices import compute_index_values, COLOR_INDICES
 from config import LAKE_INFO, KEY_BY_ID
 
 color_bp = Blueprint('color', __name__)
@@ -78,38 +79,21 @@ def calculate_real_color_features(lake_data):
     b5_avg = recent_data['b5_mean'].mean() if 'b5_mean' in recent_data.columns else b4_avg
     b11_avg = recent_data['b11_mean'].mean() if 'b11_mean' in recent_data.columns else b8_avg
     
-    # Gelişmiş renk indeksleri hesapla
-    
-    # 1. Su Berraklığı (Blue/Green ratio)
-    water_clarity = b2_avg / (b3_avg + 0.001) if b3_avg > 0 else 1.0
-    
-    # 2. Bulanıklık (Red/Blue ratio) 
-    turbidity = b4_avg / (b2_avg + 0.001) if b2_avg > 0 else 1.0
-    
-    # 3. Mavi/Yeşil oranı
-    blue_green_ratio = b2_avg / (b3_avg + 0.001) if b3_avg > 0 else 1.0
-    
-    # 4. NDWI (Normalized Difference Water Index)
-    ndwi = (b3_avg - b8_avg) / (b3_avg + b8_avg + 0.001) if (b3_avg + b8_avg) > 0 else 0
-    
-    # 5. True Color Index (genel renk)
-    true_color_index = (b4_avg + b3_avg + b2_avg) / 3
-    
-    # 6. Chlorophyll Index (alg yoğunluğu)
-    chlorophyll_index = (b8_avg - b4_avg) / (b8_avg + b4_avg + 0.001) if (b8_avg + b4_avg) > 0 else 0
-    
-    # 7. YENİ: B5 ve B11 ile gelişmiş indeksler
-    # Sediment indeksi (B11/B4)
-    sediment_index = b11_avg / (b4_avg + 0.001) if b4_avg > 0 else 1.0
-    
-    # Organik madde indeksi (B5/B11)
-    organic_matter_index = b5_avg / (b11_avg + 0.001) if b11_avg > 0 else 1.0
-    
-    # Gelişmiş bulanıklık (B11 tabanlı)
-    enhanced_turbidity = b11_avg / (b3_avg + 0.001) if b3_avg > 0 else 1.0
-    
-    # Klorofil-a indeksi (B5 tabanlı)
-    chlorophyll_a_index = (b5_avg - b4_avg) / (b5_avg + b4_avg + 0.001) if (b5_avg + b4_avg) > 0 else 0
+    # Gelişmiş renk indeksleri (tanımlar: spectral_indices.INDEX_SPECS)
+    indices = compute_index_values(
+        {"b2": b2_avg, "b3": b3_avg, "b4": b4_avg, "b8": b8_avg, "b5": b5_avg, "b11": b11_avg},
+        COLOR_INDICES,
+    )
+    water_clarity = indices["water_clarity"]              # Mavi/Yeşil
+    turbidity = indices["turbidity_ratio"]                # Kırmızı/Mavi
+    blue_green_ratio = indices["blue_green_ratio"]
+    ndwi = indices["ndwi_color"]
+    true_color_index = indices["true_color_index"]
+    chlorophyll_index = indices["chlorophyll_index"]      # (B8-B4)/(B8+B4)
+    sediment_index = indices["sediment_index"]            # B11/B4
+    organic_matter_index = indices["organic_matter_index"]  # B5/B11
+    enhanced_turbidity = indices["enhanced_turbidity"]    # B11/B3
+    chlorophyll_a_index = indices["chlorophyll_a_index"]  # (B5-B4)/(B5+B4)
     
     # Su tipini belirle (gelişmiş spektral analiz)
     if water_clarity > 1.2 and turbidity < 0.8 and enhanced_turbidity < 1.2:
@@ -1,58 +1,168 @@
 from flask import Blueprint, request, jsonify
 from datetime import datetime
+import base64
+import json
+import os
+import time
+from bson import ObjectId
 from database_data_loader import db_loader
 from database.queries import DatabaseQueries
 from database import get_database
+from cache_versions import bump_versions
+from utils import log_error
 
 news_bp = Blueprint('news', __name__)
 
 # Initialize database queries
 queries = DatabaseQueries()
 
+# Liste görünümünde dönen alanlar (content detayda kullanılır)
+NEWS_LIST_PROJECTION = {
+    'news_id': 1, 'id': 1, 'title': 1, 'summary': 1, 'category': 1,
+    'priority': 1, 'source': 1, 'author': 1, 'lake_id': 1, 'image_url': 1,
+    'published_at': 1, 'created_at': 1, 'updated_at': 1, 'date': 1,
+}
+NEWS_SORT = [('published_at', -1), ('_id', -1)]
+MAX_NEWS_LIMIT = 200
+
+# news_stats sonucu için worker içi önbellek
+NEWS_STATS_TTL_SECONDS = int(os.getenv('NEWS_STATS_TTL_SECONDS', '300'))
+_news_stats_cache = {'data': None, 'at': 0.0}
+
+
+def reset_news_stats_cache(dataset=None):
+    """news_stats önbelleğini düşür (bkz. cache_versions 'news')"""
+    _news_stats_cache['data'] = None
+    _news_stats_cache['at'] = 0.0
+
+
+def news_changed():
+    """Yazma sonrası: bu worker'ın stats önbelleğini düşür, diğerlerine 'news' sayacıyla bildir"""
+    reset_news_stats_cache()
+    if os.getenv('MONGODB_URI'):
+        try:
+            bump_versions(get_database(), 'news')
+        except Exception as e:
+            log_error(f"news versiyonu artırılamadı: {e}")
+
+
+# published_at farklı BSON tipleriyle saklanmış olabilir. $lt yalnızca aynı
+# tipteki değerlerle eşleştiği için cursor tipi de taşır; azalan sıralamada
+# (BSON tip sırası) Date > String > Number > Null/eksik.
+CURSOR_TYPE_ORDER = ('null', 'number', 'string', 'date')
+
+
+def _cursor_type(value):
+    if value is None:
+        return 'null'
+    if isinstance(value, datetime):
+        return 'date'
+    if isinstance(value, str):
+        return 'string'
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return 'number'
+    raise ValueError(f'Desteklenmeyen published_at tipi: {type(value).__name__}')
+
+
+def _type_condition(value_type):
+    if value_type == 'null':
+        # null ve eksik alan sıralamada eşittir
+        return {'published_at': None}
+    return {'published_at': {'$type': value_type}}
+
+
+def encode_news_cursor(article):
+    """Son makalenin (published_at, _id) ikilisinden keyset token üret"""
+    published_at = article.get('published_at')
+    value_type = _cursor_type(published_at)
+    payload = {
+        'p': published_at.isoformat() if value_type == 'date' else published_at,
+        't': value_type,
+        'i': str(article['_id']),
+    }
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode()
+
+
+def decode_news_cursor(token):
+    """Keyset token'ı sorgu koşuluna çevir (published_at'in orijinal BSON tipiyle)"""
+    payload = json.loads(base64.urlsafe_b64decode(token.encode()).decode())
+    value_type = payload.get('t', 'date')
+    if value_type not in CURSOR_TYPE_ORDER:
+        raise ValueError(f'Bilinmeyen cursor tipi: {value_type}')
+    published_at = payload['p']
+    if value_type == 'date':
+        published_at = datetime.fromisoformat(published_at)
+    last_id = ObjectId(payload['i'])
+    
+    conditions = [{'published_at': published_at, '_id': {'$lt': last_id}}]
+    if value_type != 'null':
+        conditions.insert(0, {'published_at': {'$lt': published_at}})
+    # Sıralamada daha sonra gelen (daha düşük) tiplerin tamamı
+    for lower_type in CURSOR_TYPE_ORDER[:CURSOR_TYPE_ORDER.index(value_type)]:
+        conditions.append(_type_condition(lower_type))
+    return {'$or': conditions}
+
+
+def build_news_query(category='all', lake_id=None):
+    """Yayınlanmış haberler için filtreyi MongoDB tarafında oluştur"""
+    query = {'is_published': True}
+    if category != 'all':
+        query['category'] = category
+    if lake_id:
+        # lake_id hem string hem sayı olarak saklanmış olabilir
+        query['lake_id'] = {'$in': [lake_id, int(lake_id)]} if lake_id.isdigit() else lake_id
+    return query
+
+
 @news_bp.route('/api/news', methods=['GET'])
 def get_news():
-    """Get all published news"""
+    """Get published news (filter/sort/limit MongoDB'de, keyset sayfalama)"""
     try:
         category = request.args.get('category', 'all')
         lake_id = request.args.get('lake_id')
         limit = request.args.get('limit', 50, type=int)
+        limit = max(1, min(limit, MAX_NEWS_LIMIT))
+        cursor_token = request.args.get('cursor')
+        include_content = request.args.get('include_content', 'false').lower() == 'true'
+        
+        query = build_news_query(category, lake_id)
+        if cursor_token:
+            try:
+                query = {'$and': [query, decode_news_cursor(cursor_token)]}
+            except Exception:
+                return jsonify({
+                    'success': False,
+                    'error': 'Invalid cursor'
+                }), 400
         
-        # Get news from MongoDB
-        news_data = queries.get_all_news(published_only=True)
-        
-        # Filter by category
-        if category != 'all':
-            news_data = [n for n in news_data if n['category'] == category]
-        
-        # Filter by lake_id
-        if lake_id:
-            news_data = [n for n in news_data if n.get('lake_id') == lake_id]
+        projection = dict(NEWS_LIST_PROJECTION)
+        if include_content:
+            projection['content'] = 1
         
-        # Limit results
+        # Bir fazlasını çek: sonraki sayfa var mı?
+        db = get_database()
+        news_data = list(
+            db['news'].find(query, projection).sort(NEWS_SORT).limit(limit + 1)
+        )
+        has_more = len(news_data) > limit
         news_data = news_data[:limit]
+        next_cursor = encode_news_cursor(news_data[-1]) if has_more else None
         
         # Convert ObjectId and datetime objects safely
         for article in news_data:
-            if '_id' in article:
-                del article['_id']
-            
-            # Safe date conversion
-            for date_field in ['published_at', 'created_at', 'updated_at']:
-                if date_field in article and article[date_field] is not None:
-                    try:
-                        if hasattr(article[date_field], 'isoformat'):
-                            article[date_field] = article[date_field].isoformat()
-                        else:
-                            article[date_field] = str(article[date_field])
-                    except Exception:
-                        article[date_field] = str(article[date_field])
-                elif date_field in article:
-                    article[date_field] = None
+            del article['_id']
+            for date_field in ('published_at', 'created_at', 'updated_at'):
+                value = article.get(date_field)
+                if hasattr(value, 'isoformat'):
+                    article[date_field] = value.isoformat()
+                elif value is not None:
+                    article[date_field] = str(value)
         
         return jsonify({
             'success': True,
             'news': news_data,
-            'count': len(news_data)
+            'count': len(news_data),
+            'next_cursor': next_cursor
         })
     
     except Exception as e:
@@ -111,6 +221,7 @@ def create_news():
         news_id = cursor.lastrowid
         conn.commit()
         conn.close()
+        news_changed()
         
         return jsonify({
             'success': True,
@@ -174,6 +285,7 @@ def update_news(news_id):
         
         conn.commit()
         conn.close()
+        news_changed()
         
         return jsonify({
             'success': True,
@@ -197,6 +309,7 @@ def delete_news(news_id):
         
         conn.commit()
         conn.close()
+        news_changed()
         
         return jsonify({
             'success': True,
@@ -211,43 +324,49 @@ def delete_news(news_id):
 
 @news_bp.route('/api/news/stats', methods=['GET'])
 def get_news_stats():
-    """Get news statistics"""
+    """Get news statistics (tek $facet pipeline, önbellekli)"""
     try:
-        # MongoDB'den haber istatistiklerini al
-        db = get_database()
+        now = time.monotonic()
+        cached = _news_stats_cache['data']
+        if cached is not None and now - _news_stats_cache['at'] < NEWS_STATS_TTL_SECONDS:
+            return jsonify({'success': True, 'stats': cached, 'cached': True})
         
-        # Toplam haber sayısı
-        total = db['news'].count_documents({'is_published': True})
-        
-        # Kategori bazında sayım
-        by_category = list(db['news'].aggregate([
-            {'$match': {'is_published': True}},
-            {'$group': {'_id': '$category', 'count': {'$sum': 1}}},
-            {'$sort': {'count': -1}}
-        ]))
-        
-        # Öncelik bazında sayım
-        by_priority = list(db['news'].aggregate([
+        # MongoDB'den haber istatistiklerini tek turda al
+        db = get_database()
+        result = list(db['news'].aggregate([
             {'$match': {'is_published': True}},
-            {'$group': {'_id': '$priority', 'count': {'$sum': 1}}},
-            {'$sort': {'count': -1}}
-        ]))
-        
-        # Göl bazında sayım
-        by_lake = list(db['news'].aggregate([
-            {'$match': {'is_published': True, 'lake_id': {'$ne': None}}},
-            {'$group': {'_id': '$lake_id', 'count': {'$sum': 1}}},
-            {'$sort': {'count': -1}}
+            {'$facet': {
+                'total': [{'$count': 'count'}],
+                'by_category': [
+                    {'$group': {'_id': '$category', 'count': {'$sum': 1}}},
+                    {'$sort': {'count': -1}}
+                ],
+                'by_priority': [
+                    {'$group': {'_id': '$priority', 'count': {'$sum': 1}}},
+                    {'$sort': {'count': -1}}
+                ],
+                'by_lake': [
+                    {'$match': {'lake_id': {'$ne': None}}},
+                    {'$group': {'_id': '$lake_id', 'count': {'$sum': 1}}},
+                    {'$sort': {'count': -1}}
+                ]
+            }}
         ]))
+        facets = result[0] if result else {}
+        total = facets.get('total') or [{'count': 0}]
+        
+        stats = {
+            'total': total[0]['count'],
+            'by_category': [{'category': item['_id'], 'count': item['count']} for item in facets.get('by_category', [])],
+            'by_priority': [{'priority': item['_id'], 'count': item['count']} for item in facets.get('by_priority', [])],
+            'by_lake': [{'lake_id': item['_id'], 'count': item['count']} for item in facets.get('by_lake', [])]
+        }
+        _news_stats_cache['data'] = stats
+        _news_stats_cache['at'] = now
         
         return jsonify({
             'success': True,
-            'stats': {
-                'total': total,
-                'by_category': [{'category': item['_id'], 'count': item['count']} for item in by_category],
-                'by_priority': [{'priority': item['_id'], 'count': item['count']} for item in by_priority],
-                'by_lake': [{'lake_id': item['_id'], 'count': item['count']} for item in by_lake]
-            }
+            'stats': stats
         })
     
     except Exception as e:
@@ -255,4 +374,3 @@ def get_news_stats():
             'success': False,
             'error': str(e)
         }), 500
-
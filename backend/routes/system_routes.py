@@ -6,6 +6,7 @@ from flask import Blueprint, request, jsonify
 import pandas as pd
 import numpy as np
 from datetime import datetime
+import os
 import traceback
 
 from database_data_loader import DatabaseDataLoader
@@ -14,10 +15,16 @@ from models import get_models, is_models_loaded
 from utils import calculate_normalized_metrics, log_error
 from config import LAKE_INFO, KEY_BY_ID
 from database import get_client, get_database
+from data_loader import get_predictions, get_metrics, get_lake_data_points
+from cache_versions import bump_versions, get_version_watcher
+from health_stats import CollectionStatsCache
 import numpy as np
 
 system_bp = Blueprint('system', __name__)
 
+# Sağlık kontrolleri için arka planda yenilenen istatistikler
+health_stats = CollectionStatsCache(get_database)
+
 @system_bp.route("/", methods=["GET"])
 def home():
     return """
@@ -51,6 +58,8 @@ def home():
     <ul>
         <li><b>/api/debug?lake_id=141</b> - Debug bilgileri</li>
         <li><b>/api/health</b> - Sistem sağlığı</li>
+        <li><b>/api/health/live</b> - Liveness (I/O yok)</li>
+        <li><b>/api/health/ready</b> - Readiness (önbellekli istatistikler)</li>
         <li><b>/api/reload</b> - Veri yeniden yükleme (POST)</li>
     </ul>
     
@@ -289,62 +298,91 @@ def debug_data():
             "timestamp": datetime.now().isoformat()
         }), 500
 
+@system_bp.route("/api/health/live", methods=["GET"])
+def health_live():
+    """Liveness: süreç ayakta mı? Hiç I/O yapmaz"""
+    return jsonify({
+        "status": "alive",
+        "timestamp": datetime.now().isoformat(),
+        "version": "1.0.0"
+    }), 200
+
+def readiness_status():
+    """Önbellekli istatistiklerden hazır olma durumunu hesapla (I/O yok)"""
+    health_stats.start()
+    snapshot = health_stats.snapshot()
+    data_loaded = get_predictions() is not None
+    models_loaded = is_models_loaded()
+    
+    checks = {
+        "mongodb": snapshot["breaker"]["state"] == "closed" and not snapshot["stale"],
+        "data_loaded": data_loaded,
+        "models_loaded": models_loaded
+    }
+    return all(checks.values()), checks, snapshot
+
+@system_bp.route("/api/health/ready", methods=["GET"])
+def health_ready():
+    """Readiness: MongoDB, veri ve modeller trafik almaya hazır mı?"""
+    ready, checks, snapshot = readiness_status()
+    return jsonify({
+        "status": "ready" if ready else "not_ready",
+        "timestamp": datetime.now().isoformat(),
+        "checks": checks,
+        "collections": snapshot["collections"],
+        "stats_refreshed_at": snapshot["refreshed_at"],
+        "breaker": snapshot["breaker"],
+        "version": "1.0.0"
+    }), 200 if ready else 503
+
 @system_bp.route("/api/health", methods=["GET"])
 def health_check():
-    """Sağlık kontrolü endpoint'i"""
-    try:
-        # MongoDB bağlantısını test et
-        db = get_database()
-        db.admin.command('ping')
-        
-        # Veri koleksiyonlarını kontrol et
-        collections_status = {}
-        required_collections = ['lakes', 'predictions', 'water_quality_measurements', 'news']
-        
-        for collection_name in required_collections:
-            try:
-                count = db[collection_name].count_documents({})
-                collections_status[collection_name] = f"{count} documents"
-            except Exception as e:
-                collections_status[collection_name] = f"error: {str(e)[:50]}"
-        
-        health_status = {
-            "status": "healthy",
-            "timestamp": datetime.now().isoformat(),
-            "services": {
-                "mongodb": "connected",
-                "database": "operational"
-            },
-            "collections": collections_status,
-            "version": "1.0.0"
-        }
-        
-        return jsonify(health_status), 200
-        
-    except Exception as e:
-        health_status = {
-            "status": "unhealthy",
-            "timestamp": datetime.now().isoformat(),
-            "services": {
-                "mongodb": "disconnected",
-                "database": "error"
-            },
-            "error": str(e)[:100],
-            "version": "1.0.0"
-        }
-        return jsonify(health_status), 503
+    """Sağlık kontrolü endpoint'i (geriye uyumlu, önbellekli sayımlar)"""
+    ready, checks, snapshot = readiness_status()
+    mongodb_ok = checks["mongodb"]
+    
+    collections_status = {
+        name: f"~{count} documents" for name, count in snapshot["collections"].items()
+    }
+    
+    health_status = {
+        "status": "healthy" if mongodb_ok else "unhealthy",
+        "timestamp": datetime.now().isoformat(),
+        "services": {
+            "mongodb": "connected" if mongodb_ok else "disconnected",
+            "database": "operational" if mongodb_ok else "error"
+        },
+        "collections": collections_status,
+        "version": "1.0.0"
+    }
+    if not mongodb_ok and snapshot["breaker"]["last_error"]:
+        health_status["error"] = snapshot["breaker"]["last_error"]
+    
+    return jsonify(health_status), 200 if mongodb_ok else 503
 
 @system_bp.route("/api/reload", methods=["POST"])
 def reload_data():
-    """Verileri yeniden yükle (development/maintenance için)"""
+    """Verileri yeniden yükle (development/maintenance için)
+
+    Bu worker tahmin/model handler'larını (load_data, load_models, ...)
+    doğrudan çalıştırır. MongoDB varsa sayaçlar da artırılır; diğer
+    worker'lar bir sonraki poll'da (veya change stream ile) aynı işi yapar.
+    """
     try:
-        success = load_data()
+        watcher = get_version_watcher()
+        watcher.run_handlers("predictions", "models")
+        changed = ["predictions", "models"]
+        if os.getenv("MONGODB_URI"):
+            bump_versions(get_database(), "predictions", "models")
+            changed = watcher.poll(force=True, handled=("predictions", "models"))
+        success = get_predictions() is not None
         if success:
             predictions = get_predictions()
             return jsonify({
                 "status": "success",
                 "message": "Veriler başarıyla yeniden yüklendi",
                 "timestamp": datetime.now().isoformat(),
+                "invalidated": changed,
                 "data_summary": {
                     "predictions_shape": list(predictions.shape) if predictions is not None else None,
                     "metrics_count": len(get_metrics()),
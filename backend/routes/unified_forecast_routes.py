@@ -47,6 +47,12 @@ def load_unified_data():
         print(f"[ERROR] Error loading unified data: {e}")
         return None
 
+def reset_unified_data(dataset=None):
+    """Önbellekteki birleştirilmiş veriyi düşür; sonraki istek yeniden yükler"""
+    global UNIFIED_DATA, DATA_LOADED
+    UNIFIED_DATA = None
+    DATA_LOADED = False
+
 @unified_forecast_bp.route("/api/unified/forecast", methods=["GET"])
 @rate_limit('forecast')
 @secure_endpoint_wrapper
@@ -14,7 +14,8 @@ try:
 except Exception:
     pass
 
-from database import get_client, get_db
+from database import get_client, get_db, upsert_ops, is_timeseries_collection
+from cache_versions import bump_versions
 
 
 def normalize_date(val):
@@ -86,8 +87,8 @@ def main():
     db = get_db(client, os.getenv('MONGODB_DB_NAME'))
     coll = db['model_prediction_history']
 
-    # Insert with upsert on unique key (lake_id, date, model_id, horizon)
-    from pymongo import UpdateOne
+    # Insert with upsert on key (lake_id, date, model_id, horizon)
+    # Time-series modunda upsert yerine delete+insert çiftleri üretilir
     ops = []
     for d in docs:
         filt = {
@@ -96,11 +97,12 @@ def main():
             'model_id': d['model_id'],
             'horizon': d['horizon']
         }
-        ops.append(UpdateOne(filt, {'$set': d}, upsert=True))
+        ops.extend(upsert_ops(db, 'model_prediction_history', filt, d))
 
     if ops:
-        result = coll.bulk_write(ops, ordered=False)
-        print(f"Upserted: {result.upserted_count}, Modified: {result.modified_count}")
+        result = coll.bulk_write(ops, ordered=is_timeseries_collection(db, 'model_prediction_history'))
+        print(f"Upserted: {result.upserted_count + result.inserted_count}, Modified: {result.modified_count}")
+        bump_versions(db, 'predictions')
     else:
         print("No operations executed.")
 
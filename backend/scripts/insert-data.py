@@ -1,5 +1,6 @@
 from models import Lake
 from database import insert_lake, get_client, get_db
+from cache_versions import bump_versions
 
 # --------------------------
 # Lake info dictionary
@@ -95,4 +96,5 @@ for key, info in LAKE_INFO.items():
     insert_lake(db, lake)
     print(f"✅ Inserted/updated lake: {lake.name} (id={lake.lake_id})")
 
+bump_versions(db, "lakes")
 print("🎉 All lakes inserted successfully")
@@ -1,6 +1,7 @@
 import pandas as pd
 from models import WaterQuantityObservation
 from database import get_client, get_db, insert_water_quantity_observation
+from cache_versions import bump_versions
 
 # --------------------------
 # Load Data
@@ -58,4 +59,7 @@ for _, row in df.iterrows():
         )
 
 
+if inserted_count:
+    bump_versions(db, "observations")
+
 print(f"✅ Inserted {inserted_count} observations into MongoDB")
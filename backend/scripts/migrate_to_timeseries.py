@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+water_quantity_observations ve model_prediction_history koleksiyonlarını
+native MongoDB time-series koleksiyonlarına taşı.
+
+Akış: mevcut koleksiyon <ad>_legacy olarak yeniden adlandırılır, aynı adla
+time-series koleksiyonu açılır ve belgeler batch halinde kopyalanır.
+Sayısal (epoch ms) tarihler datetime'a çevrilir; tarihi olmayan belgeler atlanır.
+Yarıda kesilen taşıma yeniden çalıştırıldığında <ad>_legacy'den kaldığı yerden
+devam eder. --drop-legacy yalnızca atlanan belge yoksa ve sayılar tutuyorsa siler.
+
+Kullanım:
+    python scripts/migrate_to_timeseries.py [--collections ...] [--batch-size N] [--drop-legacy]
+"""
+
+import os
+import sys
+import argparse
+from pathlib import Path
+
+# Ensure backend path for imports
+BASE_DIR = Path(__file__).resolve().parents[1]
+sys.path.append(str(BASE_DIR))
+
+try:
+    from dotenv import load_dotenv  # type: ignore
+    load_dotenv()
+except Exception:
+    pass
+
+from database import (
+    get_client, get_db, init_collections, ensure_timeseries_collection,
+    is_timeseries_collection, to_bson_date, TIMESERIES_COLLECTIONS
+)
+
+
+def _resume_point(target, legacy, batch_size):
+    """Yarım kalmış taşımada kaldığı yer -> (son kopyalanan _id, zaten kopyalanmış _id'ler)
+
+    Belgeler _id sırasıyla batch halinde eklenir; insert_many(ordered=False)
+    yarıda kesilirse son batch eksik kalmış olabilir. Bu yüzden en büyük
+    kopyalanmış _id'ye kadar olan son batch penceresi hedefle karşılaştırılır.
+    """
+    last = next(iter(target.find({}, {"_id": 1}).sort("_id", -1).limit(1)), None)
+    if last is None:
+        return None, set()
+    window = [d["_id"] for d in legacy.find({"_id": {"$lte": last["_id"]}}, {"_id": 1})
+              .sort("_id", -1).limit(batch_size)]
+    present = {d["_id"] for d in target.find({"_id": {"$in": window}}, {"_id": 1})}
+    lower = window[-1] if window else last["_id"]
+    return lower, present
+
+
+def migrate_collection(db, name, batch_size=1000, drop_legacy=False):
+    """Tek bir koleksiyonu time-series şemasına taşı
+
+    <ad>_legacy varsa önceki taşıma yarım kalmış sayılır ve kopyalama
+    kaldığı yerden devam eder.
+    """
+    legacy_name = f"{name}_legacy"
+    collections = db.list_collection_names()
+    resuming = legacy_name in collections and is_timeseries_collection(db, name)
+
+    if not resuming:
+        if is_timeseries_collection(db, name):
+            print(f"⏭️  {name} zaten time-series, atlanıyor")
+            return 0
+        if name in collections:
+            if legacy_name in collections:
+                print(f"❌ {name} ve {legacy_name} birlikte mevcut ve {name} time-series değil; elle kontrol edin")
+                return 0
+            db[name].rename(legacy_name)
+            print(f"📦 {name} -> {legacy_name}")
+
+    target = ensure_timeseries_collection(db, name)
+    if legacy_name not in db.list_collection_names():
+        print(f"ℹ️  {name}: kopyalanacak veri yok")
+        return 0
+
+    legacy = db[legacy_name]
+    query, present = {}, set()
+    if resuming:
+        lower, present = _resume_point(target, legacy, batch_size)
+        if lower is not None:
+            query = {"_id": {"$gte": lower}}
+            print(f"🔁 {name}: yarım kalmış taşıma {lower} _id'sinden devam ediyor")
+
+    copied = skipped = 0
+    batch = []
+    for doc in legacy.find(query, sort=[("_id", 1)]):
+        if doc["_id"] in present:
+            continue
+        date = to_bson_date(doc.get("date"))
+        if date is None or doc.get("lake_id") is None:
+            skipped += 1
+            continue
+        doc["date"] = date
+        batch.append(doc)
+        if len(batch) >= batch_size:
+            target.insert_many(batch, ordered=False)
+            copied += len(batch)
+            batch = []
+    if batch:
+        target.insert_many(batch, ordered=False)
+        copied += len(batch)
+
+    print(f"✅ {name}: {copied} belge kopyalandı, {skipped} belge atlandı")
+
+    if drop_legacy:
+        if skipped:
+            print(f"⚠️  {legacy_name} silinmedi: {skipped} belge taşınamadı")
+            return copied
+        # Taşıma sırasında uygulamanın yazdığı yeni belgeler sayılmasın
+        last = next(iter(legacy.find({}, {"_id": 1}).sort("_id", -1).limit(1)), None)
+        legacy_count = legacy.count_documents({})
+        target_count = target.count_documents({"_id": {"$lte": last["_id"]}}) if last else 0
+        if target_count != legacy_count:
+            print(f"⚠️  {legacy_name} silinmedi: {legacy_count} kaynak belge, {target_count} hedef belge")
+            return copied
+        legacy.drop()
+        print(f"🗑️  {legacy_name} silindi")
+    return copied
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time-series koleksiyon taşıma aracı")
+    parser.add_argument("--collections", nargs="+", default=list(TIMESERIES_COLLECTIONS),
+                        choices=list(TIMESERIES_COLLECTIONS))
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--drop-legacy", action="store_true",
+                        help="Kopyalama sonrası <ad>_legacy koleksiyonunu sil")
+    args = parser.parse_args()
+
+    client = get_client(os.getenv('MONGODB_URI'))
+    db = get_db(client, os.getenv('MONGODB_DB_NAME'))
+
+    print("🚀 Time-series taşıma başlıyor...")
+    for name in args.collections:
+        migrate_collection(db, name, batch_size=args.batch_size, drop_legacy=args.drop_legacy)
+
+    # Time-series üzerindeki ikincil index'leri oluştur
+    init_collections(db, timeseries=True)
+    client.close()
+    print("🎉 Taşıma tamamlandı")
+
+
+if __name__ == '__main__':
+    main()
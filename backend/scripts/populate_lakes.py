@@ -11,6 +11,7 @@ from datetime import datetime
 sys.path.append(os.path.dirname(__file__))
 
 from database import get_client, get_db, insert_lake
+from cache_versions import bump_versions
 from models import Lake
 
 def populate_lakes():
@@ -97,6 +98,7 @@ def populate_lakes():
             print(f"✅ Inserted lake: {lake.name} (ID: {lake.lake_id})")
             inserted_count += 1
         
+        bump_versions(db, "lakes")
         client.close()
         print(f"\n🎉 Successfully inserted {inserted_count} lakes into the database!")
         return True
@@ -21,6 +21,7 @@ from database import (
     insert_training_data_batch, insert_label_encoder
 )
 from models import TrainingData, LabelEncoder as LabelEncoderModel
+from cache_versions import bump_versions
 
 # Configuration
 HORIZONS = [1, 2, 3]  # months ahead to prepare
@@ -349,6 +350,7 @@ def main():
         if val_combined is not None:
             save_training_data_to_db(val_combined, "val", db)
         save_training_data_to_db(test_combined, "test", db)
+        bump_versions(db, "training_data")
 
         print("\n🎉 Database-based preprocessing completed successfully!")
         print(f"📊 Summary:")
@@ -16,6 +16,8 @@ sys.path.append(os.path.dirname(__file__))
 
 from database import get_client, get_db
 from data_loader_mongodb import get_data_loader
+from cache_versions import bump_versions
+from horizon_training import HORIZONS, FeatureMatrix, HorizonPools, train_horizons
 from utils import log_info, log_error
 
 # CatBoost import'u - varsa kullan
@@ -26,6 +28,16 @@ except ImportError:
     CATBOOST_AVAILABLE = False
     log_error("CatBoost kütüphanesi bulunamadı - pip install catboost")
 
+MODEL_PARAMS = dict(
+    iterations=1000,
+    depth=6,
+    learning_rate=0.1,
+    loss_function='RMSE',
+    eval_metric='RMSE',
+    random_seed=42,
+    verbose=100
+)
+
 
 class MongoDBTrainer:
     """MongoDB-based trainer"""
@@ -34,15 +46,17 @@ class MongoDBTrainer:
         self.data_loader = get_data_loader()
         self.models = {}
         self.feature_columns = None
+        self.training_report = None
         
-    def get_training_data(self, split_type: str = "train", horizon: int = 1) -> Optional[pd.DataFrame]:
-        """Get training data from MongoDB"""
-        log_info(f"Loading {split_type} data for horizon {horizon} from MongoDB")
+    def get_training_data(self, split_type: str = "train", horizon: Optional[int] = 1) -> Optional[pd.DataFrame]:
+        """Get training data from MongoDB (horizon=None: all horizons)"""
+        scope = f"horizon {horizon}" if horizon else "all horizons"
+        log_info(f"Loading {split_type} data for {scope} from MongoDB")
         
         df = self.data_loader.get_training_data(split_type=split_type, horizon=horizon)
         
         if df is None or df.empty:
-            log_error(f"No {split_type} data found for horizon {horizon}")
+            log_error(f"No {split_type} data found for {scope}")
             return None
         
         # Convert features dict to columns
@@ -110,15 +124,7 @@ class MongoDBTrainer:
             X_val, y_val = self.prepare_features_and_targets(val_df)
         
         # Train CatBoost model
-        model = CatBoostRegressor(
-            iterations=1000,
-            depth=6,
-            learning_rate=0.1,
-            loss_function='RMSE',
-            eval_metric='RMSE',
-            random_seed=42,
-            verbose=100
-        )
+        model = CatBoostRegressor(**MODEL_PARAMS)
         
         # Fit model
         if X_val is not None and y_val is not None:
@@ -175,8 +181,10 @@ class MongoDBTrainer:
         # Make predictions
         model = self.models[model_name]
         y_pred = model.predict(X_test)
-        
-        # Calculate metrics
+        return self._test_metrics(model_name, y_test, y_pred)
+    
+    def _test_metrics(self, model_name: str, y_test, y_pred) -> Dict[str, float]:
+        """Test metrics (RMSE, MAE, MAPE) with logging"""
         rmse = np.sqrt(np.mean((y_test - y_pred) ** 2))
         mae = np.mean(np.abs(y_test - y_pred))
         mape = np.mean(np.abs((y_test - y_pred) / y_test)) * 100
@@ -216,23 +224,68 @@ class MongoDBTrainer:
             log_error(f"Failed to save model {model_name}: {e}")
             return False
     
-    def train_all_models(self) -> bool:
-        """Train models for all horizons"""
-        horizons = [1, 2, 3]
-        success_count = 0
+    def load_feature_matrices(self) -> Dict[str, FeatureMatrix]:
+        """Load each split once (all horizons) as float32 feature matrices"""
+        matrices = {}
+        for split_type in ("train", "val", "test"):
+            df = self.get_training_data(split_type, horizon=None)
+            if df is None:
+                continue
+            X, y = self.prepare_features_and_targets(df)
+            if split_type == "train":
+                feature_cols = list(X.columns)
+            else:
+                # json_normalize sütunları split'e göre farklı olabilir; train sırasına hizala
+                X = X.reindex(columns=feature_cols, fill_value=0)
+            matrices[split_type] = FeatureMatrix(
+                X=np.ascontiguousarray(X.to_numpy(dtype=np.float32)),
+                y=y.to_numpy(dtype=np.float64),
+                horizon=df.loc[X.index, 'horizon'].to_numpy(),
+                feature_names=feature_cols,
+            )
+        if "train" in matrices:
+            self.feature_columns = matrices["train"].feature_names
+        return matrices
+    
+    def train_all_models(self, horizons=HORIZONS, pool_cache_dir: Optional[str] = None) -> bool:
+        """Train models for all horizons concurrently from shared, cached Pools"""
+        if not CATBOOST_AVAILABLE:
+            log_error("CatBoost not available")
+            return False
+        
+        matrices = self.load_feature_matrices()
+        if "train" not in matrices:
+            return False
+        
+        pools = HorizonPools(matrices, cache_dir=pool_cache_dir)
+        results, report = train_horizons(
+            pools, MODEL_PARAMS, horizons,
+            fit_params={"early_stopping_rounds": 50},
+        )
+        self.training_report = report
         
+        success_count = 0
         for horizon in horizons:
+            result = results.get(horizon)
+            if result is None or "model" not in result:
+                log_error(f"No model trained for horizon {horizon}")
+                continue
+            success_count += 1
             model_name = f"catboost_H{horizon}_mongodb"
-            if self.train_model(horizon, model_name):
-                success_count += 1
-                
-                # Evaluate model
-                metrics = self.evaluate_model(horizon, model_name)
-                
-                # Save model
-                self.save_model(model_name)
-        
-        log_info(f"Trained {success_count}/{len(horizons)} models successfully")
+            model = self.models[model_name] = result["model"]
+            
+            # Evaluate model
+            if pools.has("test", horizon):
+                X_test, y_test = pools.data("test", horizon)
+                self._test_metrics(model_name, y_test, model.predict(X_test))
+            
+            # Save model
+            self.save_model(model_name)
+        
+        log_info(f"Trained {success_count}/{len(horizons)} models successfully "
+                 f"in {report['wall_seconds']:.1f}s")
+        if success_count:
+            bump_versions(self.data_loader.db, "models")
         return success_count == len(horizons)
 
 
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+query_registry'deki hot sorguları explain() ile doğrula.
+
+COLLSCAN veya bellek içi SORT içeren planlar raporlanır; --create-indexes
+ile eksik compound/covering index'ler önce oluşturulur (migration).
+
+Kullanım:
+    python scripts/verify_query_indexes.py [--create-indexes] [--strict]
+"""
+
+import os
+import sys
+import argparse
+from pathlib import Path
+
+# Ensure backend path for imports
+BASE_DIR = Path(__file__).resolve().parents[1]
+sys.path.append(str(BASE_DIR))
+
+try:
+    from dotenv import load_dotenv  # type: ignore
+    load_dotenv()
+except Exception:
+    pass
+
+from database import get_client, get_db
+from query_registry import verify_query_shapes, ensure_query_indexes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sorgu şekli / index doğrulama aracı")
+    parser.add_argument("--create-indexes", action="store_true",
+                        help="Doğrulamadan önce eksik index'leri oluştur")
+    parser.add_argument("--strict", action="store_true",
+                        help="Sorunlu plan varsa çıkış kodu 1 döndür")
+    args = parser.parse_args()
+
+    client = get_client(os.getenv('MONGODB_URI'))
+    db = get_db(client, os.getenv('MONGODB_DB_NAME'))
+
+    if args.create_indexes:
+        created = ensure_query_indexes(db)
+        print(f"🔧 Index'ler hazır: {created}")
+
+    problems = verify_query_shapes(db)
+    client.close()
+
+    if problems:
+        print(f"\n⚠️  {len(problems)} sorgu şekli index ile karşılanmıyor:")
+        for p in problems:
+            print(f"  - {p['name']}: {p['issue']}")
+        if args.strict:
+            sys.exit(1)
+    else:
+        print("\n✅ Tüm kayıtlı sorgular index kullanıyor")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,160 @@
+"""
+Spektral indeks çekirdekleri (NDWI, WRI, Chl-a, bulanıklık, renk indeksleri).
+
+Backend (color_routes) ve raster özellik çıkarıcıları (scripts/,
+training/ - lake_raster.spectral üzerinden) aynı tanımları kullanır.
+Yalnızca numpy'a bağlıdır; backend imajı sadece backend/ klasöründen
+oluşturulduğu için modül burada durur.
+
+compute_indices() bant dizilerini blok blok (float32, önceden ayrılmış
+çıktı ve ara tamponlarla) tek geçişte işler: her blokta bantlar bir kez
+float32'ye çevrilir, nodata/NaN maskelenir ve istenen tüm indeksler
+önbellekte kalan bu blok üzerinden hesaplanır.
+"""
+
+import numpy as np
+
+BLOCK_SIZE = 16384  # piksel / blok (tamponlar L2 önbellekte kalsın)
+
+# name: (kind, bands, eps, guard, default)
+#   nd    -> (a - b) / (a + b + eps)      guard: a + b
+#   ratio -> a / (b + eps)                guard: b
+#   scale -> a * eps
+#   mean  -> mean(bands)
+# guard "positive": taban <= 0 (veya NaN) ise default; "nonzero": taban == 0 ise default
+INDEX_SPECS = {
+    # Su / kalite indeksleri (raster)
+    "ndwi": ("nd", ("b3", "b8"), 0.0, "nonzero", np.nan),
+    "wri": ("ratio", ("b5", "b11"), 0.0, "positive", np.nan),
+    "chl_a": ("scale", ("b5",), 0.01, None, np.nan),
+    "turbidity": ("scale", ("b11",), 0.0001, None, np.nan),
+    # Renk indeksleri (color_routes)
+    "water_clarity": ("ratio", ("b2", "b3"), 0.001, "positive", 1.0),
+    "blue_green_ratio": ("ratio", ("b2", "b3"), 0.001, "positive", 1.0),
+    "turbidity_ratio": ("ratio", ("b4", "b2"), 0.001, "positive", 1.0),
+    "ndwi_color": ("nd", ("b3", "b8"), 0.001, "positive", 0.0),
+    "true_color_index": ("mean", ("b2", "b3", "b4"), 0.0, None, np.nan),
+    "chlorophyll_index": ("nd", ("b8", "b4"), 0.001, "positive", 0.0),
+    "sediment_index": ("ratio", ("b11", "b4"), 0.001, "positive", 1.0),
+    "organic_matter_index": ("ratio", ("b5", "b11"), 0.001, "positive", 1.0),
+    "enhanced_turbidity": ("ratio", ("b11", "b3"), 0.001, "positive", 1.0),
+    "chlorophyll_a_index": ("nd", ("b5", "b4"), 0.001, "positive", 0.0),
+    # Bant ortalaması oranları (create_numerical_dataset)
+    "b3_b2_ratio": ("ratio", ("b3", "b2"), 0.0, "nonzero", np.nan),
+    "b4_b8_ratio": ("ratio", ("b4", "b8"), 0.0, "nonzero", np.nan),
+}
+
+COLOR_INDICES = [
+    "water_clarity", "blue_green_ratio", "turbidity_ratio", "ndwi_color",
+    "true_color_index", "chlorophyll_index", "sediment_index",
+    "organic_matter_index", "enhanced_turbidity", "chlorophyll_a_index",
+]
+
+
+def required_bands(indices):
+    """İndekslerin ihtiyaç duyduğu bantlar"""
+    bands = []
+    for name in indices:
+        for band in INDEX_SPECS[name][1]:
+            if band not in bands:
+                bands.append(band)
+    return bands
+
+
+def _apply(name, src, tmp, tmp2, mask, out):
+    """Tek indeksi bir blok için out'a yaz (src: bant -> float32 blok)"""
+    kind, bands, eps, guard, default = INDEX_SPECS[name]
+    a = src[bands[0]]
+    if kind == "scale":
+        np.multiply(a, np.float32(eps), out=out)
+        return
+    if kind == "mean":
+        np.copyto(out, a)
+        for band in bands[1:]:
+            np.add(out, src[band], out=out)
+        np.divide(out, np.float32(len(bands)), out=out)
+        return
+
+    b = src[bands[1]]
+    if kind == "nd":
+        np.add(a, b, out=tmp2)           # guard tabanı: a + b
+        np.subtract(a, b, out=out)
+        np.add(tmp2, np.float32(eps), out=tmp)
+    else:  # ratio
+        np.copyto(out, a)
+        np.copyto(tmp2, b)               # guard tabanı: b
+        np.add(b, np.float32(eps), out=tmp)
+
+    # Payda 0 olan yerler guard ile default'a çekilir; uyarı üretme.
+    # Eksik (NaN) bantlar aritmetikte kendiliğinden NaN verir.
+    with np.errstate(divide="ignore", invalid="ignore"):
+        np.divide(out, tmp, out=out)
+
+    # Guard (color_routes'taki "if b3_avg > 0 else 1.0" gibi), NaN tabanı da kapsar
+    if guard == "positive":
+        np.greater(tmp2, 0, out=mask)
+        np.logical_not(mask, out=mask)
+        np.copyto(out, default, where=mask)
+    elif guard == "nonzero":
+        np.equal(tmp, 0, out=mask)
+        np.copyto(out, default, where=mask)
+
+
+def compute_indices(bands, indices=None, nodata=None, out=None, block_size=BLOCK_SIZE):
+    """Bant dizilerinden indeksleri tek geçişte hesapla.
+
+    bands: {"b2": dizi, ...} (aynı şekil; skaler de olabilir). nodata
+    değeri ve NaN/inf pikseller maskelenir. out verilirse ({isim: float32
+    dizi}) sonuçlar oraya yazılır. Dönüş: {isim: float32 dizi}.
+    """
+    indices = list(indices or [n for n in INDEX_SPECS if set(INDEX_SPECS[n][1]) <= set(bands)])
+    needed = required_bands(indices)
+    missing = [b for b in needed if b not in bands]
+    if missing:
+        raise ValueError(f"Eksik bantlar: {missing}")
+
+    arrays = {b: np.asarray(bands[b]) for b in needed}
+    shape = np.broadcast_shapes(*(a.shape for a in arrays.values()))
+    flat = {b: np.broadcast_to(a, shape).reshape(-1) for b, a in arrays.items()}
+    size = int(np.prod(shape, dtype=np.int64))
+
+    if out is None:
+        out = {}
+    for name in indices:
+        if name not in out:
+            out[name] = np.empty(shape, dtype=np.float32)
+    out_flat = {name: out[name].reshape(-1) for name in indices}
+
+    # Blok başına ara tamponlar bir kez ayrılır
+    block = max(1, min(block_size, size))
+    scratch = {b: np.empty(block, dtype=np.float32) for b in needed}
+    tmp = np.empty(block, dtype=np.float32)
+    tmp2 = np.empty(block, dtype=np.float32)
+    mask = np.empty(block, dtype=bool)
+
+    for start in range(0, size, block):
+        stop = min(start + block, size)
+        m = stop - start
+        src = {}
+        for b in needed:
+            buf = scratch[b][:m]
+            np.copyto(buf, flat[b][start:stop], casting="unsafe")
+            if nodata is not None:
+                np.equal(buf, np.float32(nodata), out=mask[:m])
+                np.copyto(buf, np.nan, where=mask[:m])
+            if flat[b].dtype.kind == "f":
+                # Kayan noktalı kaynakta inf -> NaN
+                np.isinf(buf, out=mask[:m])
+                np.copyto(buf, np.nan, where=mask[:m])
+            src[b] = buf
+        for name in indices:
+            _apply(name, src, tmp[:m], tmp2[:m], mask[:m], out_flat[name][start:stop])
+
+    return out
+
+
+def compute_index_values(band_values, indices=None):
+    """Skaler bant değerleri (ör. bant ortalamaları) için indeksler -> {isim: float}"""
+    values = {b: np.float32(v) for b, v in band_values.items()}
+    result = compute_indices(values, indices=indices)
+    return {name: float(arr) for name, arr in result.items()}
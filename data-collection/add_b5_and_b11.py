@@ -1,7 +1,22 @@
 import os
+import sys
 import pandas as pd
 import ee  # type: ignore
-import geemap  # type: ignore
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from lake_raster.download_scheduler import (
+    B5_B11_BAND_SET,
+    GeemapExporter,
+    group_images_by_date,
+    plan_jobs,
+    run_downloads,
+)
+from lake_raster.tile_grid import (
+    compute_tile_grid,
+    fetch_lake_polygon,
+    image_dates,
+    to_ee_geometry,
+)
 
 
 def download_b5_b11_only(
@@ -13,39 +28,25 @@ def download_b5_b11_only(
     cloud_pct_threshold=10,
     tile_size_km=10,
     project_id="aquatrack-468214",
+    polygon_path=None,
+    workers=4,
+    requests_per_second=2.0,
+    retries=4,
 ):
     ee.Initialize(project=project_id)
 
-    # Load HydroLAKES Turkey dataset and filter by lake ID
-    hydro_lakes = ee.FeatureCollection(
-        "projects/aquatrack-468214/assets/HydroLAKES_Turkey"
+    # Lake polygon from HydroLAKES Turkey: fetched once, then cached as GeoJSON
+    polygon_path = polygon_path or os.path.join(
+        export_folder, f"lake_{hydro_lakes_id}_polygon.geojson"
     )
-    lake_feature = hydro_lakes.filter(ee.Filter.eq("Hylak_id", hydro_lakes_id)).first()
-    lake_geometry = lake_feature.geometry()
-
-    # Split lake polygon into tiles
-    bounds = lake_geometry.bounds().coordinates().get(0).getInfo()
-    xs = [c[0] for c in bounds]
-    ys = [c[1] for c in bounds]
-    xmin, xmax = min(xs), max(xs)
-    ymin, ymax = min(ys), max(ys)
-    tile_size_deg = tile_size_km / 111.0
-
-    tiles = []
-    tile_index = 0
-    x = xmin
-    while x < xmax:
-        y = ymin
-        while y < ymax:
-            tile_geom = ee.Geometry.Rectangle(
-                [x, y, x + tile_size_deg, y + tile_size_deg]
-            )
-            intersection = lake_geometry.intersection(tile_geom, 1)
-            if intersection.area().getInfo() > 0:
-                tiles.append((tile_index, intersection))
-                tile_index += 1
-            y += tile_size_deg
-        x += tile_size_deg
+    lake_polygon = fetch_lake_polygon(hydro_lakes_id, cache_path=polygon_path)
+    lake_geometry = to_ee_geometry(lake_polygon)
+
+    # Split lake polygon into tiles locally (no per-tile getInfo)
+    tiles = [
+        (t_idx, to_ee_geometry(geom))
+        for t_idx, geom in compute_tile_grid(lake_polygon, tile_size_km)
+    ]
 
     # Ana klasör oluştur
     os.makedirs(export_folder, exist_ok=True)
@@ -61,31 +62,30 @@ def download_b5_b11_only(
 
     download_list = []
 
-    # Get list of image IDs
-    img_ids = collection.aggregate_array("system:index").getInfo()
+    # Görüntü ID'leri ve tarihleri tek request ile
+    images = image_dates(collection)
 
-    print(f"Toplam {len(img_ids)} görüntü bulundu")
+    print(f"Toplam {len(images)} görüntü bulundu")
     print(f"Toplam {len(tiles)} tile var")
 
-    for i, img_id in enumerate(img_ids):
-        img = ee.Image(collection.filter(ee.Filter.eq("system:index", img_id)).first())
-        date_str = img.date().format("YYYY-MM-dd").getInfo()
-
-        print(f"İşleniyor ({i+1}/{len(img_ids)}): {date_str}")
-
+    # Aynı günün görüntüleri tek dosyaya (mozaik) yazılır: tarih başına bir satır
+    for date_str, _ in group_images_by_date(images):
         for t_idx, tile_geom in tiles:
             download_list.append({"date": date_str, "tile": t_idx})
 
-            filename_base = f"{date_str.replace('-', '')}_tile{t_idx}"
-
-            # B5 ve B11'i tek request ile indir
-            geemap.ee_export_image(
-                img.select(["B5", "B11"]),
-                filename=os.path.join(export_folder, f"{filename_base}_B5_B11.tif"),
-                scale=scale,
-                region=tile_geom,
-                file_per_band=True,  # Her bant için ayrı dosya oluştur
-            )
+    # B5 ve B11'i tek request ile indir (her bant için ayrı dosya);
+    # eşzamanlı, hız sınırlı, tekrar denemeli ve manifest ile kaldığı yerden devam eder
+    jobs = plan_jobs(images, tiles, export_folder, [B5_B11_BAND_SET])
+    summary = run_downloads(
+        jobs,
+        GeemapExporter(collection, scale=scale),
+        manifest_path=os.path.join(export_folder, "download_manifest.jsonl"),
+        workers=workers,
+        rate=requests_per_second,
+        retries=retries,
+    )
+    if summary["failed"]:
+        print(f"[UYARI] {summary['failed']} indirme başarısız (tekrar çalıştırınca yeniden denenir)")
 
     # CSV kaydet
     df = pd.DataFrame(download_list)
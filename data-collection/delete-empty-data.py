@@ -1,55 +1,49 @@
 import os
-import rasterio  # type: ignore
-import numpy as np
+import sys
 import pandas as pd
-import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from lake_raster.catalog import TileCatalog  # noqa: E402
+from lake_raster.empty_tiles import delete_empty_tiles, scan_empty_tiles, summarize  # noqa: E402
 
 # Set absolute paths
 images_folder = r"C:\Users\Beyza\Workspace\aquatrack\data\gol_van\images"
 ndwi_folder = r"C:\Users\Beyza\Workspace\aquatrack\data\gol_van\ndwi_masks"
+catalog_path = r"C:\Users\Beyza\Workspace\aquatrack\data\tile_catalog.sqlite"
+# False: only report what would be deleted and how many bytes it frees
+DELETE = True
 
 
-def check_and_delete_empty_tifs(folder):
+def check_and_delete_empty_tifs(folder, catalog=None, delete=DELETE):
     folder = os.path.abspath(folder)  # Make sure it's an absolute path
-    empty_files = []
-    tif_files = [f for f in os.listdir(folder) if f.lower().endswith(".tif")]
+    tif_files = [os.path.join(folder, f) for f in os.listdir(folder) if f.lower().endswith(".tif")]
     total_files = len(tif_files)
 
     print(f"\nChecking {total_files} files in: {folder}\n")
 
-    for idx, file in enumerate(tif_files, 1):
-        file_path = os.path.join(folder, file)
-        try:
-            with rasterio.Env():
-                with rasterio.open(file_path) as src:
-                    data = src.read(1)
-                    is_empty = False
-
-                    if src.nodata is not None:
-                        mask = data == src.nodata
-                        if np.all(mask):
-                            is_empty = True
-                    else:
-                        if np.all(np.isclose(data, 0, atol=1e-6)):
-                            is_empty = True
+    if catalog is not None:
+        # set_empty only updates catalogued rows: index the folder first
+        # (lake key is the lake folder, e.g. gol_van)
+        catalog.update(folder, lake=os.path.basename(os.path.dirname(folder)))
 
-            if is_empty:
-                print(f"[{idx}/{total_files}] Deleting: {file_path}")
-                try:
-                    os.remove(file_path)
-                    time.sleep(0.05)  # small delay
-                    if not os.path.exists(file_path):
-                        print(f"✅ Deleted: {file_path}")
-                        empty_files.append(file_path)
-                    else:
-                        print(f"❌ Failed to delete (still exists): {file_path}")
-                except PermissionError:
-                    print(f"⚠️ Locked (cannot delete right now): {file_path}")
-            else:
-                print(f"[{idx}/{total_files}] OK: {file_path}")
+    # Parallel, resumable scan; results also go to the tile catalog
+    results = scan_empty_tiles(
+        tif_files,
+        checkpoint_path=os.path.join(folder, "empty_tiles.checkpoint.jsonl"),
+        catalog=catalog,
+    )
+    report = summarize(results)
+    print(
+        f"Empty: {report['empty']}/{report['scanned']} (unreadable, kept: {report['errors']}) | "
+        f"reclaimable: {report['reclaimable_bytes'] / 1024 ** 2:.1f} MB"
+    )
+    if not delete:
+        print("Dry run - nothing deleted")
+        return []
 
-        except Exception as e:
-            print(f"[{idx}/{total_files}] ERROR reading {file_path} - {e}")
+    empty_files = delete_empty_tiles(results)
+    if catalog is not None:
+        catalog.remove(empty_files)
 
     before_count = total_files
     after_count = len([f for f in os.listdir(folder) if f.lower().endswith(".tif")])
@@ -60,13 +54,16 @@ def check_and_delete_empty_tifs(folder):
     return empty_files
 
 
-# Run deletion
-deleted_images = check_and_delete_empty_tifs(images_folder)
-deleted_masks = check_and_delete_empty_tifs(ndwi_folder)
+if __name__ == "__main__":
+    with TileCatalog(catalog_path) as catalog:
+        # Run deletion
+        deleted_images = check_and_delete_empty_tifs(images_folder, catalog)
+        deleted_masks = check_and_delete_empty_tifs(ndwi_folder, catalog)
 
-# Save report
-pd.DataFrame(
-    {"deleted_images": deleted_images, "deleted_ndwi_masks": deleted_masks}
-).to_csv("./deleted_tifs_report.csv", index=False)
+    # Save report
+    pd.DataFrame(
+        {"deleted_images": pd.Series(deleted_images, dtype=object),
+         "deleted_ndwi_masks": pd.Series(deleted_masks, dtype=object)}
+    ).to_csv("./deleted_tifs_report.csv", index=False)
 
-print("\n[Done] Deleted empty files and saved report to deleted_tifs_report.csv")
+    print("\n[Done] Deleted empty files and saved report to deleted_tifs_report.csv")
@@ -1,46 +1,68 @@
 import os
-import rasterio  # type: ignore
+import sys
 import numpy as np
-import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from lake_raster.catalog import TileCatalog  # noqa: E402
+from lake_raster.empty_tiles import scan_empty_tiles, summarize  # noqa: E402
 
 # Folders containing downloaded images and NDWI masks
 images_folder = "./data/gol_van/images"
 ndwi_folder = "./data/gol_van/ndwi_masks"
+# Lake datacube (python -m lake_raster.datacube data/gol_van); used when present
+datacube_path = "./data/gol_van.zarr"
+# Scan results are stored in the tile catalog (tiles.empty)
+catalog_path = "./data/tile_catalog.sqlite"
+
+
+def check_empty_tifs_realtime(folder, catalog=None, workers=None):
+    # Parallel scan (stats / decimated read first, full read only if needed);
+    # interrupted runs resume from the checkpoint in the folder
+    tif_files = [os.path.join(folder, f) for f in os.listdir(folder) if f.endswith(".tif")]
+    print(f"Checking {len(tif_files)} files in {folder}...\n")
 
+    results = scan_empty_tiles(
+        tif_files,
+        workers=workers,
+        checkpoint_path=os.path.join(folder, "empty_tiles.checkpoint.jsonl"),
+        catalog=catalog,
+    )
+    report = summarize(results)
+    print(
+        f"\nEmpty: {report['empty']}/{report['scanned']} (errors: {report['errors']}) | "
+        f"reclaimable: {report['reclaimable_bytes'] / 1024 ** 2:.1f} MB"
+    )
+    return [os.path.basename(r["path"]) for r in results.values() if r["empty"]]
 
-def check_empty_tifs_realtime(folder):
+
+def check_empty_tiles_datacube(cube_path, kind="mask", band="NDWI"):
+    # Same check on the datacube: one chunked slice per tile instead of one file open
+    from lake_raster.datacube import Datacube
+
+    cube = Datacube(cube_path)
+    suffix = {"mask": "mask.tif", "image": f"image.{band}.tif", "b5_b11": f"B5_B11.{band}.tif"}[kind]
     empty_files = []
-    total_files = len([f for f in os.listdir(folder) if f.endswith(".tif")])
-    print(f"Checking {total_files} files in {folder}...\n")
-
-    for idx, file in enumerate(os.listdir(folder), 1):
-        if file.endswith(".tif"):
-            file_path = os.path.join(folder, file)
-            try:
-                with rasterio.open(file_path) as src:
-                    data = src.read(1)  # read first band
-                    is_empty = False
-                    if src.nodata is not None:
-                        mask = data == src.nodata
-                        if np.all(mask):
-                            is_empty = True
-                    else:
-                        if np.all(data == 0):
-                            is_empty = True
-
-                    if is_empty:
-                        empty_files.append(file)
-                        print(f"[{idx}/{total_files}] EMPTY: {file}")
-                    else:
-                        print(f"[{idx}/{total_files}] OK: {file}")
-            except Exception as e:
-                print(f"[{idx}/{total_files}] ERROR: {file} - {e}")
-                empty_files.append(file)
+    dates = cube.dates(kind)
+    print(f"Checking {len(dates)} dates in {cube_path} ({kind}/{band})...\n")
+
+    for idx, date in enumerate(dates, 1):
+        for tile in cube.tiles(kind, date):
+            data = cube.read_tile(kind, date, band, tile)
+            valid = data[np.isfinite(data)]
+            name = f"{date}_tile{tile}_{suffix}"
+            if valid.size == 0 or np.all(valid == 0):
+                empty_files.append(name)
+                print(f"[{idx}/{len(dates)}] EMPTY: {name}")
     return empty_files
 
 
-# Check images
-# empty_images = check_empty_tifs_realtime(images_folder)
+if __name__ == "__main__":
+    with TileCatalog(catalog_path) as catalog:
+        # Check images
+        # empty_images = check_empty_tifs_realtime(images_folder, catalog)
 
-# Check NDWI masks
-empty_masks = check_empty_tifs_realtime(ndwi_folder)
+        # Check NDWI masks
+        if os.path.exists(datacube_path):
+            empty_masks = check_empty_tiles_datacube(datacube_path)
+        else:
+            empty_masks = check_empty_tifs_realtime(ndwi_folder, catalog)
@@ -1,7 +1,23 @@
 import os
+import sys
 import pandas as pd
 import ee  # type: ignore
-import geemap  # type: ignore
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from lake_raster.download_scheduler import (
+    IMAGE_BAND_SET,
+    NDWI_BAND_SET,
+    GeemapExporter,
+    group_images_by_date,
+    plan_jobs,
+    run_downloads,
+)
+from lake_raster.tile_grid import (
+    compute_tile_grid,
+    fetch_lake_polygon,
+    image_dates,
+    to_ee_geometry,
+)
 
 
 def download_lake_ndwi_timeseries_all_tiles(
@@ -13,39 +29,25 @@ def download_lake_ndwi_timeseries_all_tiles(
     cloud_pct_threshold=10,
     tile_size_km=10,
     project_id="aquatrack-468214",
+    polygon_path=None,
+    workers=4,
+    requests_per_second=2.0,
+    retries=4,
 ):
     ee.Initialize(project=project_id)
 
-    # Load HydroLAKES Turkey dataset and filter by lake ID
-    hydro_lakes = ee.FeatureCollection(
-        "projects/aquatrack-468214/assets/HydroLAKES_Turkey"
+    # Lake polygon from HydroLAKES Turkey: fetched once, then cached as GeoJSON
+    polygon_path = polygon_path or os.path.join(
+        export_folder, f"lake_{hydro_lakes_id}_polygon.geojson"
     )
-    lake_feature = hydro_lakes.filter(ee.Filter.eq("Hylak_id", hydro_lakes_id)).first()
-    lake_geometry = lake_feature.geometry()
-
-    # Split lake polygon into tiles
-    bounds = lake_geometry.bounds().coordinates().get(0).getInfo()
-    xs = [c[0] for c in bounds]
-    ys = [c[1] for c in bounds]
-    xmin, xmax = min(xs), max(xs)
-    ymin, ymax = min(ys), max(ys)
-    tile_size_deg = tile_size_km / 111.0
-
-    tiles = []
-    tile_index = 0
-    x = xmin
-    while x < xmax:
-        y = ymin
-        while y < ymax:
-            tile_geom = ee.Geometry.Rectangle(
-                [x, y, x + tile_size_deg, y + tile_size_deg]
-            )
-            intersection = lake_geometry.intersection(tile_geom, 1)
-            if intersection.area().getInfo() > 0:
-                tiles.append((tile_index, intersection))
-                tile_index += 1
-            y += tile_size_deg
-        x += tile_size_deg
+    lake_polygon = fetch_lake_polygon(hydro_lakes_id, cache_path=polygon_path)
+    lake_geometry = to_ee_geometry(lake_polygon)
+
+    # Split lake polygon into tiles locally (no per-tile getInfo)
+    tiles = [
+        (t_idx, to_ee_geometry(geom))
+        for t_idx, geom in compute_tile_grid(lake_polygon, tile_size_km)
+    ]
 
     os.makedirs(os.path.join(export_folder, "images"), exist_ok=True)
     os.makedirs(os.path.join(export_folder, "ndwi_masks"), exist_ok=True)
@@ -66,36 +68,27 @@ def download_lake_ndwi_timeseries_all_tiles(
 
     ndwi_list = []
 
-    # Get list of image IDs (client-side call only once)
-    img_ids = collection.aggregate_array("system:index").getInfo()
-
-    for img_id in img_ids:
-        img = ee.Image(collection.filter(ee.Filter.eq("system:index", img_id)).first())
-        date_str = img.date().format("YYYY-MM-dd").getInfo()
+    # Image IDs and dates in a single client-side call
+    images = image_dates(collection)
 
+    # Aynı günün görüntüleri tek dosyaya (mozaik) yazılır: tarih başına bir satır
+    for date_str, _ in group_images_by_date(images):
         for t_idx, tile_geom in tiles:
             ndwi_list.append({"date": date_str, "tile": t_idx})
 
-            filename_base = f"{date_str.replace('-', '')}_tile{t_idx}"
-            # Export image bands
-            geemap.ee_export_image(
-                img.select(["B2", "B3", "B4", "B8"]),
-                filename=os.path.join(
-                    export_folder, "images", f"{filename_base}_image.tif"
-                ),
-                scale=scale,
-                region=tile_geom,
-                file_per_band=True,
-            )
-            # Export NDWI mask
-            geemap.ee_export_image(
-                img.select("NDWI"),
-                filename=os.path.join(
-                    export_folder, "ndwi_masks", f"{filename_base}_mask.tif"
-                ),
-                scale=scale,
-                region=tile_geom,
-            )
+    # Export image bands + NDWI mask for every (image, tile): concurrent,
+    # rate limited, retried, and resumable through the manifest
+    jobs = plan_jobs(images, tiles, export_folder, [IMAGE_BAND_SET, NDWI_BAND_SET])
+    summary = run_downloads(
+        jobs,
+        GeemapExporter(collection, scale=scale),
+        manifest_path=os.path.join(export_folder, "download_manifest.jsonl"),
+        workers=workers,
+        rate=requests_per_second,
+        retries=retries,
+    )
+    if summary["failed"]:
+        print(f"[WARN] {summary['failed']} exports failed (rerun to retry)")
 
     df = pd.DataFrame(ndwi_list)
     csv_path = os.path.join(
@@ -3,14 +3,26 @@ import numpy as np
 import matplotlib.pyplot as plt
 import glob
 import os
+import sys
 from math import ceil
 import random
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
 # Path to your images folder
 IMG_FOLDER = r"C:\Users\Beyza\Workspace\aquatrack\data\gol_tuz\images"
+# Lake datacube (python -m lake_raster.datacube data/gol_tuz); used when present
+DATACUBE_PATH = r"C:\Users\Beyza\Workspace\aquatrack\data\gol_tuz.zarr"
+
+cube = None
+if os.path.exists(DATACUBE_PATH):
+    from lake_raster.datacube import Datacube, KIND_BANDS
 
-# Get all image files for any bands (e.g., B2, B3, B4, B8)
-all_files = glob.glob(os.path.join(IMG_FOLDER, "*_image.*.tif"))
+    cube = Datacube(DATACUBE_PATH)
+    all_files = []
+else:
+    # Get all image files for any bands (e.g., B2, B3, B4, B8)
+    all_files = glob.glob(os.path.join(IMG_FOLDER, "*_image.*.tif"))
 
 # Organize files by date, tile, and band
 # Structure: {date: {tile_index: {band: filepath}}}
@@ -32,6 +44,14 @@ for filepath in all_files:
 
     files_dict[date_str][tile_index][band_part] = filepath
 
+if cube is not None:
+    # Same structure; values are only markers, pixels are read from the cube
+    for date_str in cube.dates("image"):
+        files_dict[date_str] = {
+            tile: {band: None for band in KIND_BANDS["image"]}
+            for tile in cube.tiles("image", date_str)
+        }
+
 # Pick a random date to visualize
 random.seed()
 selected_date = random.choice(list(files_dict.keys()))
@@ -67,16 +87,19 @@ for ax, (tile_idx, bands_dict) in zip(axes, tiles_for_date.items()):
 
     band_arrays = []
     for b in vis_bands:
-        with rasterio.open(bands_dict[b]) as src:
-            arr = src.read(1).astype(np.float32)
-            # Mask no data or zero values (adjust if your data uses another nodata value)
-            arr[arr <= 0] = np.nan
-            # Scale reflectance values if needed (Sentinel-2 Level 2A typically scaled by 10000)
-            arr = arr / 10000.0
-            print(
-                f"Tile {tile_idx} band {b} min={np.nanmin(arr):.4f}, max={np.nanmax(arr):.4f}"
-            )
-            band_arrays.append(arr)
+        if cube is not None:
+            arr = cube.read_tile("image", selected_date, b, tile_idx)
+        else:
+            with rasterio.open(bands_dict[b]) as src:
+                arr = src.read(1).astype(np.float32)
+        # Mask no data or zero values (adjust if your data uses another nodata value)
+        arr[~(arr > 0)] = np.nan
+        # Scale reflectance values if needed (Sentinel-2 Level 2A typically scaled by 10000)
+        arr = arr / 10000.0
+        print(
+            f"Tile {tile_idx} band {b} min={np.nanmin(arr):.4f}, max={np.nanmax(arr):.4f}"
+        )
+        band_arrays.append(arr)
 
     # Stretch each band
     stretched = [stretch(band) for band in band_arrays]
@@ -0,0 +1,6 @@
+"""
+Göl raster verisi (Sentinel-2 tile'ları) için ortak yardımcılar.
+
+data-collection/, training/ ve scripts/ altındaki script'ler bu paketi
+proje kökünü sys.path'e ekleyerek kullanır.
+"""
@@ -0,0 +1,274 @@
+"""
+Persistent tile catalog (SQLite) for the per-tile GeoTIFF exports.
+
+Replaces repeated glob/os.walk scans over directories with tens of
+thousands of files. update() skips directories whose mtime has not changed
+since the last scan (no file is stat'ed there), stats files only in changed
+directories and drops entries for deleted ones; query helpers answer
+"which dates / which tiles" without touching the file system.
+
+File name patterns (see data-collection/lake-data.py, add_b5_and_b11.py):
+    {YYYYMMDD}_tile{N}_mask.tif            kind=mask,   band=NDWI
+    {YYYYMMDD}_tile{N}_image.{band}.tif    kind=image,  band=B2/B3/B4/B8
+    {YYYYMMDD}_tile{N}_B5_B11.{band}.tif   kind=b5_b11, band=B5/B11
+"""
+
+import os
+import re
+import sqlite3
+
+TILE_PATTERN = re.compile(
+    r"^(?P<date>\d{8})_tile(?P<tile>\d+)_"
+    r"(?:(?P<mask>mask)|(?P<kind>image|B5_B11)\.(?P<band>\w+))\.tif$"
+)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tiles (
+    path   TEXT PRIMARY KEY,
+    lake   TEXT NOT NULL,
+    date   TEXT NOT NULL,
+    tile   INTEGER NOT NULL,
+    kind   TEXT NOT NULL,
+    band   TEXT NOT NULL,
+    size   INTEGER NOT NULL,
+    mtime  REAL NOT NULL,
+    empty  INTEGER,
+    crs    TEXT,
+    minx   REAL, miny REAL, maxx REAL, maxy REAL
+);
+CREATE INDEX IF NOT EXISTS idx_tiles_lookup ON tiles (lake, kind, band, date, tile);
+CREATE TABLE IF NOT EXISTS dirs (
+    path   TEXT PRIMARY KEY,
+    mtime  REAL NOT NULL
+);
+"""
+
+
+def parse_tile_name(filename):
+    """Return (date, tile, kind, band) for a tile file name, or None."""
+    m = TILE_PATTERN.match(filename)
+    if not m:
+        return None
+    if m.group("mask"):
+        return m.group("date"), int(m.group("tile")), "mask", "NDWI"
+    kind = "image" if m.group("kind") == "image" else "b5_b11"
+    return m.group("date"), int(m.group("tile")), kind, m.group("band")
+
+
+def _walk_tif_dirs(root):
+    """Yield (directory, mtime, .tif entries) for root and every subdirectory.
+
+    The directory mtime is read before listing, so a change made while
+    listing leaves an older mtime behind and the directory is rescanned.
+    """
+    stack = [root]
+    while stack:
+        current = stack.pop()
+        mtime = os.stat(current).st_mtime
+        files = []
+        with os.scandir(current) as it:
+            for entry in it:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                elif entry.name.endswith(".tif"):
+                    files.append(entry)
+        yield current, mtime, files
+
+
+def read_raster_metadata(path):
+    """CRS string and bounds from the GeoTIFF header (no pixel reads)."""
+    import rasterio  # type: ignore
+
+    with rasterio.open(path) as src:
+        crs = src.crs.to_string() if src.crs else None
+        return crs, tuple(src.bounds)
+
+
+class TileCatalog:
+    """SQLite-backed index of lake tiles."""
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        parent = os.path.dirname(os.path.abspath(db_path))
+        os.makedirs(parent, exist_ok=True)
+        self.conn = sqlite3.connect(db_path)
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # -----------------------
+    # Indexing
+    # -----------------------
+    def update(self, root, lake=None, read_metadata=False, full=False):
+        """Incrementally index every tile under root.
+
+        Directories whose mtime is unchanged since the last scan had no file
+        added, removed or renamed, so their files are not stat'ed. In changed
+        directories only files whose (size, mtime) changed are (re)written.
+        Catalog entries under root whose file disappeared are removed.
+        A file rewritten in place does not touch its directory's mtime; pass
+        full=True to stat every file. Returns (added_or_changed, removed).
+        """
+        root = os.path.abspath(root)
+        lake = lake or os.path.basename(root.rstrip(os.sep))
+        prefix = root.rstrip(os.sep) + os.sep
+
+        known = {
+            path: (size, mtime)
+            for path, size, mtime in self.conn.execute(
+                "SELECT path, size, mtime FROM tiles WHERE substr(path, 1, ?) = ?",
+                (len(prefix), prefix),
+            )
+        }
+        known_dirs = dict(self.conn.execute(
+            "SELECT path, mtime FROM dirs WHERE path = ? OR substr(path, 1, ?) = ?",
+            (root, len(prefix), prefix),
+        ))
+
+        rows = []
+        seen = set()
+        dir_rows = []
+        for directory, dir_mtime, entries in _walk_tif_dirs(root):
+            dir_rows.append((directory, dir_mtime))
+            unchanged = not full and known_dirs.get(directory) == dir_mtime
+            for entry in entries:
+                path = os.path.abspath(entry.path)
+                if unchanged:
+                    if path in known:
+                        seen.add(path)
+                    continue
+                parsed = parse_tile_name(entry.name)
+                if parsed is None:
+                    continue
+                seen.add(path)
+                rows.extend(self._changed_row(path, entry, parsed, known, lake, read_metadata))
+
+        removed = [(p,) for p in known if p not in seen]
+        walked = {d for d, _ in dir_rows}
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO tiles VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?)", rows
+            )
+            self.conn.executemany("DELETE FROM tiles WHERE path = ?", removed)
+            self.conn.executemany("INSERT OR REPLACE INTO dirs VALUES (?, ?)", dir_rows)
+            self.conn.executemany(
+                "DELETE FROM dirs WHERE path = ?", [(d,) for d in known_dirs if d not in walked]
+            )
+        return len(rows), len(removed)
+
+    @staticmethod
+    def _changed_row(path, entry, parsed, known, lake, read_metadata):
+        """[] when the file matches its catalog row, else the row to write."""
+        stat = entry.stat()
+        if known.get(path) == (stat.st_size, stat.st_mtime):
+            return []
+        crs, bounds = None, (None, None, None, None)
+        if read_metadata:
+            try:
+                crs, bounds = read_raster_metadata(path)
+            except Exception as e:
+                print(f"[WARN] Metadata okunamadı: {path} - {e}")
+        date, tile, kind, band = parsed
+        return [(path, lake, date, tile, kind, band, stat.st_size, stat.st_mtime,
+                 None, crs, *bounds)]
+
+    def fill_metadata(self, lake=None):
+        """Read CRS/bounds for rows indexed without read_metadata. Returns count."""
+        sql = "SELECT path FROM tiles WHERE minx IS NULL"
+        params = []
+        if lake:
+            sql += " AND lake = ?"
+            params.append(lake)
+        rows = []
+        for (path,) in self.conn.execute(sql, params).fetchall():
+            try:
+                crs, bounds = read_raster_metadata(path)
+            except Exception as e:
+                print(f"[WARN] Metadata okunamadı: {path} - {e}")
+                continue
+            rows.append((crs, *bounds, path))
+        with self.conn:
+            self.conn.executemany(
+                "UPDATE tiles SET crs = ?, minx = ?, miny = ?, maxx = ?, maxy = ? WHERE path = ?",
+                rows,
+            )
+        return len(rows)
+
+    def set_empty(self, flags):
+        """Record empty-tile scan results: iterable of (path, is_empty)."""
+        with self.conn:
+            self.conn.executemany(
+                "UPDATE tiles SET empty = ? WHERE path = ?",
+                [(int(bool(empty)), os.path.abspath(path)) for path, empty in flags],
+            )
+
+    def remove(self, paths):
+        """Drop catalog rows for deleted files. Returns the number of paths given."""
+        rows = [(os.path.abspath(path),) for path in paths]
+        with self.conn:
+            self.conn.executemany("DELETE FROM tiles WHERE path = ?", rows)
+        return len(rows)
+
+    # -----------------------
+    # Queries
+    # -----------------------
+    def dates(self, lake, kind="mask", band=None, year=None):
+        """Sorted distinct acquisition dates (YYYYMMDD)."""
+        sql = "SELECT DISTINCT date FROM tiles WHERE lake = ? AND kind = ?"
+        params = [lake, kind]
+        if band:
+            sql += " AND band = ?"
+            params.append(band)
+        if year:
+            sql += " AND substr(date, 1, 4) = ?"
+            params.append(str(year))
+        return [r[0] for r in self.conn.execute(sql + " ORDER BY date", params)]
+
+    def tiles(self, lake, date, kind="mask", band=None, skip_empty=False):
+        """Tile paths for one date, ordered by tile index."""
+        sql = "SELECT path FROM tiles WHERE lake = ? AND kind = ? AND date = ?"
+        params = [lake, kind, date]
+        if band:
+            sql += " AND band = ?"
+            params.append(band)
+        if skip_empty:
+            sql += " AND (empty IS NULL OR empty = 0)"
+        return [r[0] for r in self.conn.execute(sql + " ORDER BY tile", params)]
+
+    def tile_counts(self, lake, kind="mask", band=None):
+        """{date: number of tiles} for a lake."""
+        sql = "SELECT date, COUNT(*) FROM tiles WHERE lake = ? AND kind = ?"
+        params = [lake, kind]
+        if band:
+            sql += " AND band = ?"
+            params.append(band)
+        return dict(self.conn.execute(sql + " GROUP BY date", params).fetchall())
+
+    def records(self, lake=None, kind=None, empty=None):
+        """All catalog rows (optionally filtered) as a list of dicts."""
+        sql = "SELECT * FROM tiles WHERE 1 = 1"
+        params = []
+        if lake:
+            sql += " AND lake = ?"
+            params.append(lake)
+        if kind:
+            sql += " AND kind = ?"
+            params.append(kind)
+        if empty is not None:
+            sql += " AND empty = ?"
+            params.append(int(bool(empty)))
+        cur = self.conn.execute(sql + " ORDER BY lake, date, tile", params)
+        columns = [c[0] for c in cur.description]
+        return [dict(zip(columns, row)) for row in cur]
+
+    def to_dataframe(self, lake=None, kind=None):
+        import pandas as pd
+
+        return pd.DataFrame(self.records(lake=lake, kind=kind))
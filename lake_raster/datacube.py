@@ -0,0 +1,317 @@
+"""
+Per-lake chunked datacube (zarr) built from the per-tile GeoTIFF exports.
+
+lake-data.py and add_b5_and_b11.py write one small GeoTIFF per band, tile
+and date, so a single lake ends up with hundreds of thousands of files.
+The converter mosaics every date onto a fixed per-lake grid and stores one
+compressed, chunked array per product (time x band x y x x):
+
+    {lake}.zarr/
+        image    (t, 4, y, x)   B2 B3 B4 B8
+        mask     (t, 1, y, x)   NDWI
+        b5_b11   (t, 2, y, x)   B5 B11
+
+Array attrs hold the dates, bands, CRS, geotransform, the pixel window of
+every tile on the lake grid and which tiles existed on each date, so
+readers can still work per tile (empty-tile scans, visualize-image.py).
+Chunks that are entirely NaN are not written at all.
+
+Conversion is incremental: dates already in the store are skipped, and
+attrs are saved after every date so an interrupted run resumes.
+
+Usage (from the project root, requires zarr):
+    python -m lake_raster.datacube data/gol_van --lake gol_van
+"""
+
+import argparse
+import math
+import os
+from collections import namedtuple
+from datetime import datetime
+
+import numpy as np
+import rasterio  # type: ignore
+import rasterio.warp  # type: ignore
+from rasterio.crs import CRS  # type: ignore
+from rasterio.enums import Resampling  # type: ignore
+from rasterio.transform import Affine, array_bounds, from_origin  # type: ignore
+from rasterio.windows import Window, from_bounds  # type: ignore
+from rasterio.windows import transform as window_transform  # type: ignore
+
+from .catalog import TileCatalog
+from .mosaic import iter_blocks, lake_window, warped_mosaic
+
+KIND_BANDS = {
+    "image": ["B2", "B3", "B4", "B8"],
+    "mask": ["NDWI"],
+    "b5_b11": ["B5", "B11"],
+}
+CHUNK_SIZE = 512
+
+# lake_window() only needs transform/width/height
+Grid = namedtuple("Grid", ["transform", "width", "height"])
+
+
+def _require_zarr():
+    try:
+        import zarr  # type: ignore
+    except ImportError as e:
+        raise ImportError("Datacube için zarr gerekli: pip install zarr") from e
+    return zarr
+
+
+def _tile_bounds(records):
+    """{tile: (minx, miny, maxx, maxy)} unioned over all dates."""
+    bounds = {}
+    for r in records:
+        key = str(r["tile"])
+        b = (r["minx"], r["miny"], r["maxx"], r["maxy"])
+        if key in bounds:
+            old = bounds[key]
+            b = (min(old[0], b[0]), min(old[1], b[1]), max(old[2], b[2]), max(old[3], b[3]))
+        bounds[key] = b
+    return bounds
+
+
+def _pixel_window(transform, bounds):
+    win = from_bounds(*bounds, transform=transform)
+    return [
+        int(round(win.row_off)),
+        int(round(win.col_off)),
+        int(round(win.height)),
+        int(round(win.width)),
+    ]
+
+
+def lake_grid(records):
+    """(crs, transform, (height, width)) covering every tile of one product.
+
+    Resolution is taken from the first tile, like the VRT mosaic.
+    """
+    with rasterio.open(records[0]["path"]) as src:
+        xres, yres = src.res
+    minx = min(r["minx"] for r in records)
+    miny = min(r["miny"] for r in records)
+    maxx = max(r["maxx"] for r in records)
+    maxy = max(r["maxy"] for r in records)
+    width = int(math.ceil(round((maxx - minx) / xres, 6)))
+    height = int(math.ceil(round((maxy - miny) / yres, 6)))
+    return records[0]["crs"], from_origin(minx, maxy, xres, yres), (height, width)
+
+
+def _convert_product(group, kind, records, chunk_size, verbose):
+    bands = KIND_BANDS[kind]
+    if kind in group:
+        arr = group[kind]
+        attrs = dict(arr.attrs)
+    else:
+        crs, transform, shape = lake_grid(records)
+        arr = group.create_dataset(
+            kind,
+            shape=(0, len(bands)) + shape,
+            chunks=(1, 1, chunk_size, chunk_size),
+            dtype="f4",
+            fill_value=np.nan,
+        )
+        attrs = {
+            "bands": bands,
+            "crs": crs,
+            "transform": list(transform)[:6],
+            "dates": [],
+            "tile_windows": {},
+            "tiles_by_date": {},
+        }
+
+    transform = Affine(*attrs["transform"])
+    height, width = arr.shape[2:]
+    for tile, bounds in _tile_bounds(records).items():
+        if tile in attrs["tile_windows"]:
+            continue
+        row, col, h, w = _pixel_window(transform, bounds)
+        if row < 0 or col < 0 or row + h > height or col + w > width:
+            raise ValueError(
+                f"{kind}: tile{tile} mevcut grid dışında, datacube yeniden oluşturulmalı"
+            )
+        attrs["tile_windows"][tile] = [row, col, h, w]
+
+    by_date = {}
+    for r in records:
+        by_date.setdefault(r["date"], []).append(r)
+    done = set(attrs["dates"])
+    new_dates = sorted(d for d in by_date if d not in done)
+
+    for i, date in enumerate(new_dates, 1):
+        t = len(attrs["dates"])
+        if arr.shape[0] < t + 1:
+            arr.resize((t + 1,) + arr.shape[1:])
+        for b, band in enumerate(bands):
+            tiles = [r["path"] for r in by_date[date] if r["band"] == band]
+            if not tiles:
+                continue
+            # Tiles share the lake grid's pixel lattice; nearest is a copy
+            with warped_mosaic(
+                tiles, attrs["crs"], transform, (height, width), Resampling.nearest
+            ) as vrt:
+                for row, col, h, w in iter_blocks(height, width, chunk_size):
+                    block = vrt.read(1, window=Window(col, row, w, h), masked=True)
+                    arr[t, b, row:row + h, col:col + w] = (
+                        block.astype(np.float32).filled(np.nan)
+                    )
+        attrs["dates"].append(date)
+        attrs["tiles_by_date"][date] = sorted({str(r["tile"]) for r in by_date[date]}, key=int)
+        arr.attrs.update(attrs)
+        if verbose:
+            print(f"[CUBE] {kind} {date} ({i}/{len(new_dates)})")
+
+    arr.attrs.update(attrs)
+    return len(new_dates)
+
+
+def build_datacube(catalog, lake, store_path, kinds=None, chunk_size=CHUNK_SIZE, verbose=True):
+    """Append every catalogued date of a lake to its datacube. Returns {kind: new dates}."""
+    zarr = _require_zarr()
+    catalog.fill_metadata(lake)
+    group = zarr.open_group(store_path, mode="a")
+    group.attrs.update({"lake": lake, "updated_at": datetime.now().isoformat()})
+
+    added = {}
+    for kind in kinds or KIND_BANDS:
+        records = catalog.records(lake=lake, kind=kind)
+        if not records:
+            continue
+        added[kind] = _convert_product(group, kind, records, chunk_size, verbose)
+    return added
+
+
+class Datacube:
+    """Reader for a per-lake datacube; arrays come back as float32 with NaN nodata."""
+
+    def __init__(self, store_path):
+        zarr = _require_zarr()
+        self.store_path = store_path
+        self.group = zarr.open_group(store_path, mode="r")
+        self._meta = {}
+
+    def _info(self, kind):
+        if kind not in self._meta:
+            arr = self.group[kind]
+            attrs = dict(arr.attrs)
+            self._meta[kind] = {
+                "array": arr,
+                "bands": attrs["bands"],
+                "crs": CRS.from_user_input(attrs["crs"]),
+                "transform": Affine(*attrs["transform"]),
+                "index": {d: i for i, d in enumerate(attrs["dates"])},
+                "tile_windows": attrs["tile_windows"],
+                "tiles_by_date": attrs["tiles_by_date"],
+            }
+        return self._meta[kind]
+
+    def kinds(self):
+        return [k for k in KIND_BANDS if k in self.group]
+
+    def dates(self, kind="mask", year=None):
+        dates = sorted(self._info(kind)["index"])
+        if year:
+            dates = [d for d in dates if d.startswith(str(year))]
+        return dates
+
+    def tiles(self, kind, date):
+        """Tile indices (as strings) that existed on date."""
+        return list(self._info(kind)["tiles_by_date"].get(date, []))
+
+    def crs(self, kind="mask"):
+        return self._info(kind)["crs"]
+
+    def grid(self, kind="mask"):
+        info = self._info(kind)
+        height, width = info["array"].shape[2:]
+        return Grid(info["transform"], width, height)
+
+    def window_transform(self, kind, window):
+        return window_transform(window, self._info(kind)["transform"])
+
+    def tile_window(self, kind, tile):
+        row, col, h, w = self._info(kind)["tile_windows"][str(tile)]
+        return Window(col, row, w, h)
+
+    def read(self, kind, date, band, window=None):
+        """One band for one date (optionally a pixel window); None if the date is missing."""
+        info = self._info(kind)
+        t = info["index"].get(date)
+        if t is None:
+            return None
+        b = info["bands"].index(band)
+        if window is None:
+            return info["array"][t, b]
+        row, col = int(window.row_off), int(window.col_off)
+        h, w = int(window.height), int(window.width)
+        return info["array"][t, b, row:row + h, col:col + w]
+
+    def read_tile(self, kind, date, band, tile):
+        return self.read(kind, date, band, self.tile_window(kind, tile))
+
+    def read_on_grid(
+        self, kind, date, band, dst_crs, dst_transform, dst_shape,
+        resampling=Resampling.bilinear,
+    ):
+        """Warp one band onto another grid, reading only the covering window."""
+        info = self._info(kind)
+        if date not in info["index"]:
+            return None
+        height, width = dst_shape
+        grid = self.grid(kind)
+        dst_bounds = array_bounds(height, width, dst_transform)
+        src_bounds = rasterio.warp.transform_bounds(dst_crs, info["crs"], *dst_bounds)
+        window = lake_window(grid, src_bounds)
+        # One pixel of padding for bilinear at the window edges
+        col0 = max(0, int(window.col_off) - 1)
+        row0 = max(0, int(window.row_off) - 1)
+        window = Window(
+            col0, row0,
+            min(grid.width, int(window.col_off + window.width) + 1) - col0,
+            min(grid.height, int(window.row_off + window.height) + 1) - row0,
+        )
+        source = self.read(kind, date, band, window)
+        destination = np.full(dst_shape, np.nan, dtype=np.float32)
+        rasterio.warp.reproject(
+            source=source,
+            destination=destination,
+            src_transform=self.window_transform(kind, window),
+            src_crs=info["crs"],
+            src_nodata=np.nan,
+            dst_transform=dst_transform,
+            dst_crs=dst_crs,
+            dst_nodata=np.nan,
+            resampling=resampling,
+        )
+        return destination
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Per-tile GeoTIFF'leri göl başına zarr datacube'üne dönüştür"
+    )
+    parser.add_argument("root", help="Göl klasörü (ör. data/gol_van)")
+    parser.add_argument("--lake", default=None, help="Katalogdaki göl anahtarı (varsayılan: klasör adı)")
+    parser.add_argument("--out", default=None, help="Çıktı (varsayılan: <root>.zarr)")
+    parser.add_argument("--catalog", default="data/tile_catalog.sqlite")
+    parser.add_argument("--kinds", nargs="+", choices=list(KIND_BANDS), default=None)
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    args = parser.parse_args()
+
+    root = args.root.rstrip("/\\")
+    lake = args.lake or os.path.basename(root)
+    out = args.out or f"{root}.zarr"
+
+    with TileCatalog(args.catalog) as catalog:
+        added, removed = catalog.update(root, lake=lake, read_metadata=True)
+        print(f"[CATALOG] {root}: +{added} / -{removed}")
+        result = build_datacube(catalog, lake, out, kinds=args.kinds, chunk_size=args.chunk_size)
+
+    for kind, count in result.items():
+        print(f"[CUBE] {kind}: {count} yeni tarih -> {out}")
+
+
+if __name__ == "__main__":
+    main()
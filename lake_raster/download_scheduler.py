@@ -0,0 +1,343 @@
+"""
+Concurrent download scheduler for the Sentinel-2 tile exports.
+
+The downloaders used to call geemap.ee_export_image for every
+(image, tile, band set) in nested sequential loops, with no retries and
+no way to resume. Here the tile plan becomes a list of DownloadJob's that
+a bounded thread pool works through:
+
+    - a token bucket caps the request rate (Earth Engine quotas),
+    - failed or incomplete downloads are retried with exponential backoff,
+    - finished jobs are appended to a JSON-lines manifest together with the
+      size and sha256 of every output file; a rerun skips jobs whose files
+      are still on disk and match the manifest.
+
+The fetcher is any callable taking a DownloadJob and writing its output
+files. GeemapExporter is the real one; FakeExporter writes local files
+(optionally failing) so the scheduler can be exercised offline:
+
+    python -m lake_raster.download_scheduler --fake-jobs 200 --out /tmp/fake_tiles
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+DownloadJob = namedtuple(
+    "DownloadJob", ["key", "image_ids", "date", "tile", "region", "bands", "path", "file_per_band"]
+)
+
+# (bands, subfolder, file suffix, file_per_band) per export of one tile
+IMAGE_BAND_SET = (("B2", "B3", "B4", "B8"), "images", "image", True)
+NDWI_BAND_SET = (("NDWI",), "ndwi_masks", "mask", False)
+B5_B11_BAND_SET = (("B5", "B11"), "", "B5_B11", True)
+
+
+class IncompleteDownload(Exception):
+    """The fetcher returned but the expected files are missing or empty."""
+
+
+def group_images_by_date(images):
+    """[(image_id, date)] -> [(date, sorted image ids)] in first-seen date order.
+
+    Sentinel-2 often has several granules on the same day; they share one
+    output file per (date, tile), so they are exported as one mosaic.
+    """
+    by_date = {}
+    for image_id, date_str in images:
+        by_date.setdefault(date_str, set()).add(image_id)
+    return [(date_str, tuple(sorted(ids))) for date_str, ids in by_date.items()]
+
+
+def plan_jobs(images, tiles, export_folder, band_sets):
+    """Work queue from the tile plan, in the old loop order (date, tile, band set).
+
+    images: [(image_id, 'YYYY-MM-dd')], tiles: [(tile_index, region)].
+    Output files are named by date and tile, so there is exactly one job
+    per (date, tile, band set); same-day images are mosaicked.
+    """
+    jobs = []
+    for date_str, image_ids in group_images_by_date(images):
+        for t_idx, region in tiles:
+            filename_base = f"{date_str.replace('-', '')}_tile{t_idx}"
+            for bands, subfolder, suffix, file_per_band in band_sets:
+                jobs.append(DownloadJob(
+                    key=f"{filename_base}_{suffix}",
+                    image_ids=image_ids,
+                    date=date_str,
+                    tile=t_idx,
+                    region=region,
+                    bands=tuple(bands),
+                    path=os.path.join(export_folder, subfolder, f"{filename_base}_{suffix}.tif"),
+                    file_per_band=file_per_band,
+                ))
+    return jobs
+
+
+def job_outputs(job):
+    """Files a finished job leaves on disk (geemap writes {stem}.{band}.tif per band)."""
+    if not job.file_per_band:
+        return [job.path]
+    stem = os.path.splitext(job.path)[0]
+    return [f"{stem}.{band}.tif" for band in job.bands]
+
+
+def file_sha256(path, chunk_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _describe_outputs(job):
+    """{path: {size, sha256}}; raises IncompleteDownload for missing/empty files."""
+    described = {}
+    for path in job_outputs(job):
+        size = os.path.getsize(path) if os.path.exists(path) else 0
+        if size == 0:
+            raise IncompleteDownload(f"missing or empty output: {path}")
+        described[path] = {"size": size, "sha256": file_sha256(path)}
+    return described
+
+
+class TokenBucket:
+    """Thread-safe token bucket: `rate` tokens per second, at most `capacity` stored."""
+
+    def __init__(self, rate, capacity=None):
+        self.rate = float(rate)
+        self.capacity = float(capacity or max(1.0, rate))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        if self.rate <= 0:
+            return
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class DownloadManifest:
+    """Append-only JSON-lines record of finished/failed jobs; the last line per key wins."""
+
+    def __init__(self, path):
+        self.path = path
+        self.records = {}
+        self.lock = threading.Lock()
+        if path and os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    line = line.strip()
+                    if line:
+                        record = json.loads(line)
+                        self.records[record["key"]] = record
+
+    def record(self, job, status, outputs=None, attempts=0, error=None, adopted=False):
+        record = {
+            "key": job.key,
+            "status": status,
+            "image_ids": list(job.image_ids),
+            "outputs": outputs or {},
+            "attempts": attempts,
+            "error": error,
+        }
+        if adopted:
+            record["adopted"] = True
+        with self.lock:
+            self.records[job.key] = record
+            if self.path:
+                os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(record) + "\n")
+        return record
+
+    def is_complete(self, job, verify_checksum=True):
+        """True if the job's files are on disk and match the manifest (size, sha256)."""
+        record = self.records.get(job.key)
+        if not record or record["status"] != "done":
+            return False
+        # Older manifests stored a single image_id per key
+        recorded = record.get("image_ids", [record["image_id"]] if "image_id" in record else None)
+        if recorded is not None and sorted(recorded) != sorted(job.image_ids):
+            return False
+        for path in job_outputs(job):
+            expected = record["outputs"].get(path)
+            if expected is None or not os.path.exists(path):
+                return False
+            if os.path.getsize(path) != expected["size"]:
+                return False
+            if verify_checksum and file_sha256(path) != expected["sha256"]:
+                return False
+        return True
+
+
+class GeemapExporter:
+    """Fetcher exporting one job with geemap.ee_export_image (same-day images mosaicked)."""
+
+    def __init__(self, collection, scale=10):
+        self.collection = collection
+        self.scale = scale
+
+    def __call__(self, job):
+        import ee  # type: ignore
+        import geemap  # type: ignore
+
+        if len(job.image_ids) == 1:
+            img = ee.Image(self.collection.filter(ee.Filter.eq("system:index", job.image_ids[0])).first())
+        else:
+            same_day = self.collection.filter(ee.Filter.inList("system:index", list(job.image_ids)))
+            # mosaic() drops the native projection; keep the first granule's
+            first = ee.Image(same_day.first())
+            img = same_day.mosaic().setDefaultProjection(first.select(0).projection())
+        os.makedirs(os.path.dirname(os.path.abspath(job.path)), exist_ok=True)
+        geemap.ee_export_image(
+            img.select(list(job.bands)),
+            filename=job.path,
+            scale=self.scale,
+            region=job.region,
+            file_per_band=job.file_per_band,
+        )
+
+
+class FakeExporter:
+    """Offline fetcher: writes deterministic bytes; fail_rate of calls raise or write nothing."""
+
+    def __init__(self, fail_rate=0.0, size=4096, delay=0.0, seed=0):
+        self.fail_rate = fail_rate
+        self.size = size
+        self.delay = delay
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.calls = 0
+
+    def __call__(self, job):
+        with self.lock:
+            self.calls += 1
+            roll = self.random.random()
+        if self.delay:
+            time.sleep(self.delay)
+        if roll < self.fail_rate / 2:
+            raise ConnectionError(f"fake network error for {job.key}")
+        if roll < self.fail_rate:
+            return  # like geemap: the error is printed, nothing is written
+        for path in job_outputs(job):
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            payload = hashlib.sha256(path.encode("utf-8")).digest()
+            with open(path, "wb") as f:
+                f.write((payload * (self.size // len(payload) + 1))[:self.size])
+
+
+def _remove_outputs(job):
+    for path in job_outputs(job):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def run_downloads(jobs, fetch, manifest_path, workers=4, rate=2.0, burst=None, retries=4,
+                  backoff=2.0, max_backoff=60.0, verify_checksum=True, adopt_existing=True,
+                  verbose=True):
+    """Run jobs on a bounded thread pool; returns a summary dict.
+
+    Jobs already complete on disk are skipped. With adopt_existing, files
+    downloaded before the manifest existed (non-empty, all outputs present)
+    are recorded instead of fetched again.
+    """
+    manifest = DownloadManifest(manifest_path)
+    bucket = TokenBucket(rate, burst)
+    summary = {"done": 0, "skipped": 0, "adopted": 0, "failed": 0, "failed_keys": []}
+
+    pending = []
+    for job in jobs:
+        if manifest.is_complete(job, verify_checksum):
+            summary["skipped"] += 1
+        elif adopt_existing and job.key not in manifest.records and all(
+            os.path.exists(p) and os.path.getsize(p) > 0 for p in job_outputs(job)
+        ):
+            manifest.record(job, "done", _describe_outputs(job), adopted=True)
+            summary["adopted"] += 1
+        else:
+            pending.append(job)
+
+    if verbose:
+        print(f"[PLAN] {len(jobs)} jobs: {summary['skipped']} complete, "
+              f"{summary['adopted']} adopted, {len(pending)} to download")
+
+    def attempt(job):
+        for n in range(1, retries + 2):
+            bucket.acquire()
+            try:
+                fetch(job)
+                outputs = _describe_outputs(job)
+                manifest.record(job, "done", outputs, attempts=n)
+                return job, True, None
+            except Exception as e:
+                _remove_outputs(job)
+                if n > retries:
+                    manifest.record(job, "failed", attempts=n, error=str(e))
+                    return job, False, str(e)
+                # Exponential backoff with jitter so workers do not retry in lockstep
+                delay = min(max_backoff, backoff * 2 ** (n - 1))
+                time.sleep(delay * (0.5 + random.random() / 2))
+
+    total = len(pending)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(attempt, job) for job in pending]
+        for i, future in enumerate(as_completed(futures), 1):
+            job, ok, error = future.result()
+            if ok:
+                summary["done"] += 1
+            else:
+                summary["failed"] += 1
+                summary["failed_keys"].append(job.key)
+                if verbose:
+                    print(f"[FAILED] {job.key}: {error}")
+            if verbose and (i % 100 == 0 or i == total):
+                print(f"[DOWNLOAD] {i}/{total}")
+
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="İndirme zamanlayıcısını sahte exporter ile dene (ağ yok)")
+    parser.add_argument("--fake-jobs", type=int, default=200, help="Sahte tile sayısı")
+    parser.add_argument("--out", required=True, help="Çıktı klasörü")
+    parser.add_argument("--fail-rate", type=float, default=0.2)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--rate", type=float, default=200.0)
+    args = parser.parse_args()
+
+    images = [(f"fake_{i:04d}", f"2024-01-{i % 28 + 1:02d}") for i in range(max(1, args.fake_jobs // 10))]
+    tiles = [(t, None) for t in range(10)]
+    jobs = plan_jobs(images, tiles, args.out, [IMAGE_BAND_SET, NDWI_BAND_SET])[:args.fake_jobs]
+    manifest_path = os.path.join(args.out, "download_manifest.jsonl")
+
+    exporter = FakeExporter(fail_rate=args.fail_rate)
+    summary = run_downloads(jobs, exporter, manifest_path, workers=args.workers, rate=args.rate,
+                            backoff=0.01, verbose=False)
+    print(f"Run 1: {summary['done']} done, {summary['failed']} failed, {exporter.calls} fetch calls")
+
+    exporter = FakeExporter()
+    summary = run_downloads(jobs, exporter, manifest_path, workers=args.workers, rate=args.rate,
+                            verbose=False)
+    print(f"Run 2: {summary['skipped']} skipped, {summary['done']} done, {exporter.calls} fetch calls")
+
+
+if __name__ == "__main__":
+    main()
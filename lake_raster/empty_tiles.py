@@ -0,0 +1,245 @@
+"""
+Parallel, resumable empty-tile detection.
+
+A tile is empty when every pixel is nodata (or NaN), or, for tiles without
+a nodata value, when every pixel is ~0 (same rule as delete-empty-data.py).
+
+Most tiles are decided without reading the full band:
+    1. internal statistics (STATISTICS_* tags written by GDAL) can prove a
+       tile is not empty,
+    2. a decimated read (served from overviews when the file has them);
+       any valid non-zero pixel there proves the tile is not empty.
+Every "empty" verdict is confirmed with a full read; statistics may be
+approximate (computed from overviews), so they never delete a tile alone.
+
+Results are appended to a JSON-lines checkpoint as they arrive and written
+to the tile catalog's empty column. Checkpoint records are keyed by
+(path, size, mtime): a rerun skips unchanged files and rescans re-downloaded ones.
+
+Usage (from the project root):
+    python -m lake_raster.empty_tiles data/gol_van --lake gol_van --workers 8
+    python -m lake_raster.empty_tiles data/gol_van --delete
+"""
+
+import argparse
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import rasterio  # type: ignore
+from rasterio.enums import Resampling  # type: ignore
+
+from .catalog import TileCatalog
+
+DECIMATION = 16   # decimated read is 1/16 of each dimension
+ZERO_ATOL = 1e-6
+
+
+def _has_signal(values, nodata):
+    """True if values contain a pixel that makes the tile non-empty."""
+    valid = values[np.isfinite(values)]
+    if nodata is not None:
+        return valid.size > 0
+    return bool(np.any(np.abs(valid) > ZERO_ATOL))
+
+
+def _from_statistics(src):
+    """Verdict suggested by internal band statistics; None when they are missing."""
+    tags = src.tags(1)
+    if "STATISTICS_VALID_PERCENT" in tags and float(tags["STATISTICS_VALID_PERCENT"]) == 0:
+        return True
+    if "STATISTICS_MINIMUM" not in tags or "STATISTICS_MAXIMUM" not in tags:
+        return None
+    if src.nodata is not None:
+        # Statistics exclude nodata, so their presence means valid pixels exist
+        return False
+    lo, hi = float(tags["STATISTICS_MINIMUM"]), float(tags["STATISTICS_MAXIMUM"])
+    return abs(lo) <= ZERO_ATOL and abs(hi) <= ZERO_ATOL
+
+
+def _read_values(src, out_shape=None):
+    kwargs = {"masked": True}
+    if out_shape is not None:
+        kwargs.update(out_shape=out_shape, resampling=Resampling.nearest)
+    data = src.read(1, **kwargs)
+    return data.astype(np.float64).filled(np.nan)
+
+
+def _decide(path, decimation):
+    with rasterio.open(path) as src:
+        empty = _from_statistics(src)
+        if empty is False:
+            return False, "stats"
+
+        if empty is None:
+            out_shape = (max(1, src.height // decimation), max(1, src.width // decimation))
+            if out_shape != (src.height, src.width):
+                if _has_signal(_read_values(src, out_shape), src.nodata):
+                    return False, "decimated"
+
+        return not _has_signal(_read_values(src), src.nodata), "full"
+
+
+def file_key(path, size, mtime):
+    """Checkpoint key; a rewritten file gets a new key and is scanned again."""
+    return path, size, mtime
+
+
+def _stat_key(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return file_key(path, 0, None)
+    return file_key(path, st.st_size, st.st_mtime_ns)
+
+
+def check_tile(path, decimation=DECIMATION):
+    """Result dict for one tile; unreadable tiles count as empty like in find-empty-data.py."""
+    _, size, mtime = _stat_key(path)
+    record = {"path": path, "size": size, "mtime": mtime, "error": None}
+    try:
+        record["empty"], record["method"] = _decide(path, decimation)
+    except Exception as e:
+        record.update(empty=True, method="error", error=str(e))
+    return record
+
+
+def _check_tile_task(args):
+    return check_tile(*args)
+
+
+def load_checkpoint(checkpoint_path):
+    """{(path, size, mtime): result dict} of already scanned tiles."""
+    done = {}
+    if checkpoint_path and os.path.exists(checkpoint_path):
+        with open(checkpoint_path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    record = json.loads(line)
+                    done[file_key(record["path"], record.get("size"), record.get("mtime"))] = record
+    return done
+
+
+def scan_empty_tiles(paths, workers=None, checkpoint_path=None, decimation=DECIMATION,
+                     catalog=None, verbose=True):
+    """Scan tiles on a process pool; returns {path: result dict} for paths."""
+    paths = [os.path.abspath(p) for p in paths]
+    done = load_checkpoint(checkpoint_path)
+    results = {}
+    for p in paths:
+        record = done.get(_stat_key(p))
+        if record is not None:
+            results[p] = record
+    pending = [p for p in paths if p not in results]
+    if verbose and results:
+        print(f"[RESUME] {len(results)} tiles already scanned")
+
+    workers = workers or os.cpu_count() or 1
+    total = len(pending)
+    checkpoint = open(checkpoint_path, "a", encoding="utf-8") if checkpoint_path else None
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            tasks = ((p, decimation) for p in pending)
+            chunksize = max(1, min(256, total // (workers * 8) or 1))
+            for i, record in enumerate(
+                executor.map(_check_tile_task, tasks, chunksize=chunksize), 1
+            ):
+                results[record["path"]] = record
+                if checkpoint:
+                    checkpoint.write(json.dumps(record) + "\n")
+                    checkpoint.flush()
+                if verbose and (i % 1000 == 0 or i == total):
+                    print(f"[SCAN] {i}/{total}")
+    finally:
+        if checkpoint:
+            checkpoint.close()
+
+    results = {p: results[p] for p in paths if p in results}
+    if catalog is not None:
+        catalog.set_empty((r["path"], r["empty"]) for r in results.values())
+    return results
+
+
+def summarize(results):
+    """Counts, decision methods and reclaimable bytes for a report."""
+    empty = [r for r in results.values() if r["empty"]]
+    methods = {}
+    for r in results.values():
+        methods[r["method"]] = methods.get(r["method"], 0) + 1
+    return {
+        "scanned": len(results),
+        "empty": len(empty),
+        "errors": sum(1 for r in empty if r["method"] == "error"),
+        "methods": methods,
+        "reclaimable_bytes": sum(r["size"] for r in empty),
+    }
+
+
+def delete_empty_tiles(results, include_errors=False):
+    """Delete tiles flagged empty; files changed since the scan are kept."""
+    deleted = []
+    for r in results.values():
+        if not r["empty"] or (r["method"] == "error" and not include_errors):
+            continue
+        if _stat_key(r["path"]) != file_key(r["path"], r["size"], r["mtime"]):
+            continue
+        try:
+            os.remove(r["path"])
+            deleted.append(r["path"])
+        except FileNotFoundError:
+            continue
+        except PermissionError:
+            print(f"⚠️ Locked (cannot delete right now): {r['path']}")
+    return deleted
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Boş tile taraması (paralel, kaldığı yerden devam eder)")
+    parser.add_argument("root", help="Göl klasörü (ör. data/gol_van)")
+    parser.add_argument("--lake", default=None)
+    parser.add_argument("--catalog", default="data/tile_catalog.sqlite")
+    parser.add_argument("--kinds", nargs="+", choices=["mask", "image", "b5_b11"], default=None)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--checkpoint", default=None, help="Varsayılan: <root>/empty_tiles.checkpoint.jsonl")
+    parser.add_argument("--decimation", type=int, default=DECIMATION)
+    parser.add_argument("--rescan", action="store_true", help="Checkpoint'i yok say, hepsini yeniden tara")
+    parser.add_argument("--delete", action="store_true", help="Boş tile'ları sil (varsayılan: dry-run raporu)")
+    args = parser.parse_args()
+
+    root = args.root.rstrip("/\\")
+    lake = args.lake or os.path.basename(root)
+    checkpoint_path = args.checkpoint or os.path.join(root, "empty_tiles.checkpoint.jsonl")
+    if args.rescan and os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+
+    with TileCatalog(args.catalog) as catalog:
+        catalog.update(root, lake=lake)
+        records = []
+        for kind in args.kinds or [None]:
+            records.extend(catalog.records(lake=lake, kind=kind))
+        paths = [r["path"] for r in records]
+        print(f"{len(paths)} tiles in catalog")
+
+        results = scan_empty_tiles(
+            paths, workers=args.workers, checkpoint_path=checkpoint_path,
+            decimation=args.decimation, catalog=catalog,
+        )
+        report = summarize(results)
+        print(
+            f"\nEmpty: {report['empty']}/{report['scanned']} "
+            f"(errors: {report['errors']}, methods: {report['methods']})"
+        )
+        print(f"Reclaimable: {report['reclaimable_bytes'] / 1024 ** 2:.1f} MB")
+
+        if args.delete:
+            deleted = delete_empty_tiles(results)
+            catalog.update(root, lake=lake)
+            print(f"Deleted: {len(deleted)} files")
+        else:
+            print("Dry run - nothing deleted (use --delete)")
+
+
+if __name__ == "__main__":
+    main()
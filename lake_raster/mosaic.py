@@ -0,0 +1,175 @@
+"""
+VRT-based mosaicking with windowed, block-wise reads.
+
+rasterio.merge.merge() builds the full mosaic in memory (and the float32
+cast copies it again). Here the tiles are stitched into a virtual raster
+(VRT, only XML), only the lake bounding-box window is read, block by
+block, and other bands are warped straight onto that window's grid via a
+WarpedVRT. Only source pixels that are actually needed get decoded.
+"""
+
+import contextlib
+import math
+import os
+from xml.sax.saxutils import escape
+
+import numpy as np
+import rasterio  # type: ignore
+from rasterio.enums import Resampling  # type: ignore
+from rasterio.io import MemoryFile  # type: ignore
+from rasterio.vrt import WarpedVRT  # type: ignore
+from rasterio.windows import Window, from_bounds  # type: ignore
+
+BLOCK_SIZE = 1024  # rows/cols per read block
+
+GDAL_TYPES = {
+    "uint8": "Byte",
+    "int8": "Int8",
+    "uint16": "UInt16",
+    "int16": "Int16",
+    "uint32": "UInt32",
+    "int32": "Int32",
+    "float32": "Float32",
+    "float64": "Float64",
+}
+
+
+def _tile_info(path):
+    with rasterio.open(path) as src:
+        return {
+            "path": os.path.abspath(path),
+            "bounds": src.bounds,
+            "res": src.res,
+            "width": src.width,
+            "height": src.height,
+            "dtype": src.dtypes[0],
+            "nodata": src.nodata,
+            "crs": src.crs,
+        }
+
+
+def build_vrt_xml(tiles, band=1):
+    """VRT document mosaicking one band of the given tiles (same CRS).
+
+    Matches merge(): output resolution is the first tile's, and where tiles
+    overlap the first one wins (VRT sources are painted in order, so they
+    are listed in reverse). Nodata pixels never overwrite valid ones.
+    """
+    infos = [_tile_info(p) for p in tiles]
+    first = infos[0]
+    xres, yres = first["res"]
+    minx = min(i["bounds"].left for i in infos)
+    maxx = max(i["bounds"].right for i in infos)
+    miny = min(i["bounds"].bottom for i in infos)
+    maxy = max(i["bounds"].top for i in infos)
+    width = int(round((maxx - minx) / xres))
+    height = int(round((maxy - miny) / yres))
+
+    nodata = first["nodata"]
+    sources = []
+    for info in reversed(infos):
+        b = info["bounds"]
+        dst_rect = (
+            f'<DstRect xOff="{(b.left - minx) / xres}" yOff="{(maxy - b.top) / yres}" '
+            f'xSize="{(b.right - b.left) / xres}" ySize="{(b.top - b.bottom) / yres}"/>'
+        )
+        src_rect = f'<SrcRect xOff="0" yOff="0" xSize="{info["width"]}" ySize="{info["height"]}"/>'
+        tag = "ComplexSource" if info["nodata"] is not None else "SimpleSource"
+        nodata_xml = f"<NODATA>{info['nodata']}</NODATA>" if info["nodata"] is not None else ""
+        sources.append(
+            f"<{tag}>"
+            f'<SourceFilename relativeToVRT="0">{escape(info["path"])}</SourceFilename>'
+            f"<SourceBand>{band}</SourceBand>{src_rect}{dst_rect}{nodata_xml}"
+            f"</{tag}>"
+        )
+
+    crs_xml = f"<SRS>{escape(first['crs'].to_wkt())}</SRS>" if first["crs"] else ""
+    nodata_band_xml = f"<NoDataValue>{nodata}</NoDataValue>" if nodata is not None else ""
+    return (
+        f'<VRTDataset rasterXSize="{width}" rasterYSize="{height}">'
+        f"{crs_xml}<GeoTransform>{minx}, {xres}, 0, {maxy}, 0, {-yres}</GeoTransform>"
+        f'<VRTRasterBand dataType="{GDAL_TYPES.get(first["dtype"], "Float32")}" band="1">'
+        f"{nodata_band_xml}{''.join(sources)}</VRTRasterBand></VRTDataset>"
+    )
+
+
+@contextlib.contextmanager
+def open_mosaic(tiles, band=1):
+    """Open the tiles as a single in-memory VRT dataset (no pixels read)."""
+    xml = build_vrt_xml(tiles, band=band)
+    with MemoryFile(xml.encode("utf-8"), ext=".vrt") as mem:
+        with mem.open() as src:
+            yield src
+
+
+def lake_window(src, bounds):
+    """Pixel window covering bounds (minx, miny, maxx, maxy), clipped to src.
+
+    Returns the full extent when bounds is None or does not overlap.
+    """
+    full = Window(0, 0, src.width, src.height)
+    if bounds is None:
+        return full
+    win = from_bounds(*bounds, transform=src.transform)
+    col0 = max(0, math.floor(win.col_off))
+    row0 = max(0, math.floor(win.row_off))
+    col1 = min(src.width, math.ceil(win.col_off + win.width))
+    row1 = min(src.height, math.ceil(win.row_off + win.height))
+    if col1 <= col0 or row1 <= row0:
+        return full
+    return Window(col0, row0, col1 - col0, row1 - row0)
+
+
+def iter_blocks(height, width, block_size=BLOCK_SIZE):
+    """(row, col, h, w) blocks tiling a height x width array."""
+    for row in range(0, height, block_size):
+        for col in range(0, width, block_size):
+            yield row, col, min(block_size, height - row), min(block_size, width - col)
+
+
+def read_window(src, window, block_size=BLOCK_SIZE):
+    """Band 1 of window as float32 with NaN for nodata, read block by block.
+
+    Only one block of source dtype is in memory at a time besides the
+    float32 output.
+    """
+    height, width = int(window.height), int(window.width)
+    out = np.empty((height, width), dtype=np.float32)
+    for row, col, h, w in iter_blocks(height, width, block_size):
+        block = Window(window.col_off + col, window.row_off + row, w, h)
+        data = src.read(1, window=block, masked=True)
+        out[row:row + h, col:col + w] = data.astype(np.float32).filled(np.nan)
+    return out
+
+
+@contextlib.contextmanager
+def warped_mosaic(tiles, dst_crs, dst_transform, dst_shape, resampling=Resampling.bilinear):
+    """The tiles' mosaic as a WarpedVRT on a target grid (nothing read yet)."""
+    height, width = dst_shape
+    with open_mosaic(tiles) as src:
+        options = dict(
+            crs=dst_crs, transform=dst_transform, width=width, height=height,
+            resampling=resampling,
+        )
+        if src.nodata is not None:
+            options.update(src_nodata=src.nodata, nodata=src.nodata)
+        else:
+            # Without nodata the alpha band marks pixels outside the mosaic
+            options["add_alpha"] = True
+        with WarpedVRT(src, **options) as vrt:
+            yield vrt
+
+
+def reproject_tiles_to_grid(
+    tiles, dst_crs, dst_transform, dst_shape, block_size=BLOCK_SIZE,
+    resampling=Resampling.bilinear,
+):
+    """Warp the tiles' mosaic onto a target grid without a full-size source array.
+
+    Pixels outside the source (or nodata) come back as NaN.
+    """
+    if not tiles:
+        return None
+    height, width = dst_shape
+    with warped_mosaic(tiles, dst_crs, dst_transform, dst_shape, resampling) as vrt:
+        return read_window(vrt, Window(0, 0, width, height), block_size)
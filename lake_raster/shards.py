@@ -0,0 +1,228 @@
+"""
+Memory-mapped, preprocessed sample shards for the phase1/phase2 datasets.
+
+TIFDataset (real_phase1_training.py) and WaterQualityDataset
+(real_phase2_finetuning.py, improved_phase2_finetuning.py) opened, decoded,
+normalized and resized a GeoTIFF in every __getitem__, i.e. once per sample
+per epoch. build_shards() does that work once (in parallel) and stores
+fixed-shape samples in .npy shard files:
+
+    {out}/
+        shard_00000.npy   (n, size, size)  float16/float32
+        shard_00001.npy
+        ...
+        index.json        mode, size, dtype, samples_per_shard, files, ok
+
+Sample i lives in shard i // samples_per_shard at offset i % samples_per_shard.
+Unreadable files are stored as zeros with ok=False, which is what the
+datasets returned for them before. index.json is written last, so a
+half-built directory is never picked up.
+
+Preprocessing modes reproduce the datasets' deterministic steps exactly:
+    phase1  min-max -> uint8 -> PIL bilinear resize (transforms.Resize), /255
+    phase2  /max -> scipy zoom (order=1) or zero pad -> crop
+
+TileShards opens the shards with np.load(mmap_mode="c") and returns views,
+so a sample read is a page-cache hit instead of a GeoTIFF decode.
+
+Usage (from the project root):
+    python -m lake_raster.shards data/phase1_manifest.csv --mode phase1 --out data/shards/phase1_64
+    python -m lake_raster.shards data/complete_train_dataset.csv data/complete_val_dataset.csv \\
+        data/complete_test_dataset.csv --mode phase2 --out data/shards/phase2_64
+"""
+
+import argparse
+import csv
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+SAMPLE_SIZE = 64
+SAMPLES_PER_SHARD = 16384
+INDEX_NAME = "index.json"
+
+
+def preprocess_phase1(band, size=SAMPLE_SIZE):
+    """TIFDataset steps up to (and including) transforms.Resize, scaled to [0, 1]."""
+    from PIL import Image  # type: ignore
+
+    band = np.nan_to_num(band.astype(np.float32))
+    if band.max() > band.min():
+        band = (band - band.min()) / (band.max() - band.min())
+    image = Image.fromarray((band * 255).astype(np.uint8), mode="L")
+    image = image.resize((size, size), Image.BILINEAR)
+    return np.asarray(image, dtype=np.float32) / 255.0
+
+
+def preprocess_phase2(band, size=SAMPLE_SIZE):
+    """WaterQualityDataset steps before augmentation."""
+    from scipy.ndimage import zoom  # type: ignore
+
+    data = band.astype(np.float32)
+    if data.max() > 0:
+        data = data / data.max()
+    if data.shape[0] > size or data.shape[1] > size:
+        zoom_factor = (size / data.shape[0], size / data.shape[1])
+        data = zoom(data, zoom_factor, order=1)
+    elif data.shape[0] < size or data.shape[1] < size:
+        pad_h = max(0, size - data.shape[0])
+        pad_w = max(0, size - data.shape[1])
+        data = np.pad(data, ((0, pad_h), (0, pad_w)), mode="constant")
+    return data[:size, :size]
+
+
+# mode: (preprocess, default dtype)
+MODES = {
+    "phase1": (preprocess_phase1, "float16"),  # uint8 levels survive float16
+    "phase2": (preprocess_phase2, "float32"),
+}
+
+
+def _load_sample(args):
+    path, mode, size = args
+    import rasterio  # type: ignore
+
+    try:
+        with rasterio.open(path) as src:
+            band = src.read(1)
+        data = MODES[mode][0](band, size)
+        if data.shape != (size, size):
+            raise ValueError(f"unexpected sample shape {data.shape}")
+        return data, True
+    except ImportError:
+        raise
+    except Exception:
+        return np.zeros((size, size), dtype=np.float32), False
+
+
+def read_file_paths(csv_paths, column="file_path"):
+    """Unique file paths from one or more manifest CSVs, in first-seen order."""
+    seen = {}
+    for csv_path in csv_paths:
+        with open(csv_path, "r", encoding="utf-8", newline="") as f:
+            for row in csv.DictReader(f):
+                seen.setdefault(row[column], None)
+    return list(seen)
+
+
+def shard_path(out_dir, shard):
+    return os.path.join(out_dir, f"shard_{shard:05d}.npy")
+
+
+def build_shards(paths, out_dir, mode, size=SAMPLE_SIZE, dtype=None,
+                 samples_per_shard=SAMPLES_PER_SHARD, workers=None, verbose=True):
+    """Preprocess every path once into memory-mapped shards; returns the index dict."""
+    dtype = np.dtype(dtype or MODES[mode][1])
+    os.makedirs(out_dir, exist_ok=True)
+    index_path = os.path.join(out_dir, INDEX_NAME)
+    if os.path.exists(index_path):
+        os.remove(index_path)
+
+    total = len(paths)
+    workers = workers or os.cpu_count() or 1
+    chunksize = max(1, min(256, total // (workers * 8) or 1))
+    ok = []
+    shard = None
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        tasks = ((p, mode, size) for p in paths)
+        for i, (data, good) in enumerate(executor.map(_load_sample, tasks, chunksize=chunksize)):
+            offset = i % samples_per_shard
+            if offset == 0:
+                if shard is not None:
+                    shard.flush()
+                n = min(samples_per_shard, total - i)
+                shard = np.lib.format.open_memmap(
+                    shard_path(out_dir, i // samples_per_shard),
+                    mode="w+", dtype=dtype, shape=(n, size, size),
+                )
+            shard[offset] = data
+            ok.append(good)
+            if verbose and ((i + 1) % 10000 == 0 or i + 1 == total):
+                print(f"[SHARDS] {i + 1}/{total}")
+    if shard is not None:
+        shard.flush()
+        del shard
+
+    index = {
+        "mode": mode,
+        "size": size,
+        "dtype": dtype.name,
+        "samples_per_shard": samples_per_shard,
+        "files": list(paths),
+        "ok": ok,
+    }
+    with open(index_path, "w", encoding="utf-8") as f:
+        json.dump(index, f)
+    if verbose:
+        print(f"[SHARDS] {total} samples ({total - sum(ok)} unreadable) -> {out_dir}")
+    return index
+
+
+def shards_exist(out_dir):
+    return os.path.exists(os.path.join(out_dir, INDEX_NAME))
+
+
+class TileShards:
+    """Read-only sample lookup by file path; safe to pass to DataLoader workers."""
+
+    def __init__(self, shard_dir):
+        self.shard_dir = shard_dir
+        with open(os.path.join(shard_dir, INDEX_NAME), "r", encoding="utf-8") as f:
+            index = json.load(f)
+        self.mode = index["mode"]
+        self.size = index["size"]
+        self.dtype = np.dtype(index["dtype"])
+        self.samples_per_shard = index["samples_per_shard"]
+        self.positions = {path: i for i, path in enumerate(index["files"])}
+        self.ok = np.asarray(index["ok"], dtype=bool)
+        self._shards = {}
+
+    def __getstate__(self):
+        # Each worker maps the shards itself instead of pickling their contents
+        state = self.__dict__.copy()
+        state["_shards"] = {}
+        return state
+
+    def __len__(self):
+        return len(self.positions)
+
+    def __contains__(self, path):
+        return path in self.positions
+
+    def _shard(self, shard):
+        array = self._shards.get(shard)
+        if array is None:
+            # Copy-on-write: views are writable (torch.from_numpy) without touching the file
+            array = np.load(shard_path(self.shard_dir, shard), mmap_mode="c")
+            self._shards[shard] = array
+        return array
+
+    def get(self, path):
+        """(size, size) view of a sample, or None if the file was unreadable."""
+        i = self.positions[path]
+        if not self.ok[i]:
+            return None
+        return self._shard(i // self.samples_per_shard)[i % self.samples_per_shard]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="TIF örneklerini bir kez işleyip memmap shard'lara yaz")
+    parser.add_argument("csv", nargs="+", help="file_path sütunlu manifest/dataset CSV'leri")
+    parser.add_argument("--mode", choices=sorted(MODES), required=True)
+    parser.add_argument("--out", required=True, help="Shard klasörü")
+    parser.add_argument("--size", type=int, default=SAMPLE_SIZE)
+    parser.add_argument("--dtype", choices=["float16", "float32"], default=None)
+    parser.add_argument("--samples-per-shard", type=int, default=SAMPLES_PER_SHARD)
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    paths = read_file_paths(args.csv)
+    print(f"{len(paths)} unique files")
+    build_shards(paths, args.out, args.mode, size=args.size, dtype=args.dtype,
+                 samples_per_shard=args.samples_per_shard, workers=args.workers)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,15 @@
+"""
+Spectral index kernels for the raster feature extractors.
+
+The implementation lives in backend/spectral_indices.py (numpy only) so
+the backend image, which is built from backend/ alone, ships the same
+definitions; this module re-exports it for scripts/ and training/.
+"""
+
+from backend.spectral_indices import (  # noqa: F401
+    COLOR_INDICES,
+    INDEX_SPECS,
+    compute_index_values,
+    compute_indices,
+    required_bands,
+)
@@ -0,0 +1,244 @@
+"""
+Single-pass, mergeable band statistics.
+
+StreamingStats is fed chunk by chunk (a tile, a block of rows, ...) and
+never keeps the pixels. Moments are combined with the pairwise update
+formulas (Pébay 2008), so chunks and per-worker accumulators merge
+exactly. mean/std/var/skew/kurtosis match numpy/scipy's defaults
+(population std, biased skew, Fisher kurtosis). Percentiles come from a
+fixed-memory, mergeable log-bucket sketch (DDSketch-style) with ~0.5%
+relative error instead of a full sort.
+"""
+
+import math
+
+import numpy as np
+
+
+class _BucketStore:
+    """Dense counts for contiguous integer bucket keys, capped at max_buckets."""
+
+    def __init__(self, max_buckets):
+        self.max_buckets = max_buckets
+        self.counts = np.zeros(0, dtype=np.int64)
+        self.offset = 0  # key of counts[0]
+
+    @property
+    def total(self):
+        return int(self.counts.sum())
+
+    def _ensure(self, kmin, kmax):
+        if self.counts.size == 0:
+            self.offset = kmin
+            self.counts = np.zeros(kmax - kmin + 1, dtype=np.int64)
+            return
+        lo = min(kmin, self.offset)
+        hi = max(kmax, self.offset + self.counts.size - 1)
+        if lo == self.offset and hi == self.offset + self.counts.size - 1:
+            return
+        counts = np.zeros(hi - lo + 1, dtype=np.int64)
+        start = self.offset - lo
+        counts[start:start + self.counts.size] = self.counts
+        self.counts, self.offset = counts, lo
+
+    def _collapse(self):
+        # Too many buckets: fold the smallest magnitudes into one bucket
+        extra = self.counts.size - self.max_buckets
+        if extra > 0:
+            self.counts[extra] += self.counts[:extra].sum()
+            self.counts = self.counts[extra:].copy()
+            self.offset += extra
+
+    def add_keys(self, keys):
+        if keys.size == 0:
+            return
+        kmin, kmax = int(keys.min()), int(keys.max())
+        self._ensure(kmin, kmax)
+        self.counts += np.bincount(keys - self.offset, minlength=self.counts.size)
+        self._collapse()
+
+    def merge(self, other):
+        if other.counts.size == 0:
+            return
+        self._ensure(other.offset, other.offset + other.counts.size - 1)
+        start = other.offset - self.offset
+        self.counts[start:start + other.counts.size] += other.counts
+        self._collapse()
+
+
+class QuantileSketch:
+    """Relative-error quantile sketch; memory is bounded by max_buckets per sign."""
+
+    def __init__(self, relative_accuracy=0.005, max_buckets=2048, min_value=1e-9):
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.min_value = min_value
+        self.positive = _BucketStore(max_buckets)
+        self.negative = _BucketStore(max_buckets)
+        self.zero_count = 0
+
+    @property
+    def count(self):
+        return self.positive.total + self.negative.total + self.zero_count
+
+    def _keys(self, magnitudes):
+        return np.ceil(np.log(magnitudes) / self._log_gamma).astype(np.int64)
+
+    def _value(self, key):
+        return 2.0 * self.gamma ** key / (self.gamma + 1)
+
+    def update(self, values):
+        """Add finite values (1-D float array)."""
+        pos = values[values > self.min_value]
+        neg = -values[values < -self.min_value]
+        self.zero_count += int(values.size - pos.size - neg.size)
+        self.positive.add_keys(self._keys(pos))
+        self.negative.add_keys(self._keys(neg))
+
+    def merge(self, other):
+        self.positive.merge(other.positive)
+        self.negative.merge(other.negative)
+        self.zero_count += other.zero_count
+        return self
+
+    def quantile(self, q):
+        """Approximate q-quantile (0..1), ranked like np.percentile's default."""
+        n = self.count
+        if n == 0:
+            return np.nan
+        rank = q * (n - 1)
+
+        neg_total = self.negative.total
+        if rank < neg_total:
+            # Most negative values first: walk negative keys from the top
+            cum = np.cumsum(self.negative.counts[::-1])
+            i = int(np.searchsorted(cum, rank, side="right"))
+            key = self.negative.offset + self.negative.counts.size - 1 - i
+            return -self._value(key)
+        rank -= neg_total
+
+        if rank < self.zero_count:
+            return 0.0
+        rank -= self.zero_count
+
+        cum = np.cumsum(self.positive.counts)
+        i = min(int(np.searchsorted(cum, rank, side="right")), cum.size - 1)
+        return self._value(self.positive.offset + i)
+
+
+class StreamingStats:
+    """Count, min/max, moments up to 4th order, threshold counts and quantiles."""
+
+    def __init__(self, thresholds=(), relative_accuracy=0.005, max_buckets=2048):
+        self.n = 0
+        self.n_seen = 0  # including non-finite values
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.m3 = 0.0
+        self.m4 = 0.0
+        self.min = np.inf
+        self.max = -np.inf
+        self.thresholds = tuple(thresholds)
+        self.count_gt = {t: 0 for t in self.thresholds}
+        self.sketch = QuantileSketch(relative_accuracy, max_buckets)
+
+    def _merge_moments(self, n_b, mean_b, m2_b, m3_b, m4_b):
+        n_a = self.n
+        if n_b == 0:
+            return
+        if n_a == 0:
+            self.n, self.mean, self.m2, self.m3, self.m4 = n_b, mean_b, m2_b, m3_b, m4_b
+            return
+        n = n_a + n_b
+        delta = mean_b - self.mean
+        d_n = delta / n
+        self.m4 = (
+            self.m4 + m4_b
+            + delta * d_n ** 3 * n_a * n_b * (n_a * n_a - n_a * n_b + n_b * n_b)
+            + 6.0 * d_n ** 2 * (n_a * n_a * m2_b + n_b * n_b * self.m2)
+            + 4.0 * d_n * (n_a * m3_b - n_b * self.m3)
+        )
+        self.m3 = (
+            self.m3 + m3_b
+            + delta * d_n ** 2 * n_a * n_b * (n_a - n_b)
+            + 3.0 * d_n * (n_a * m2_b - n_b * self.m2)
+        )
+        self.m2 = self.m2 + m2_b + delta * d_n * n_a * n_b
+        self.mean = self.mean + d_n * n_b
+        self.n = n
+
+    def update(self, values):
+        """Add a chunk of values (any shape); NaN/inf are ignored."""
+        values = np.asarray(values, dtype=np.float64).ravel()
+        self.n_seen += values.size
+        values = values[np.isfinite(values)]
+        if values.size == 0:
+            return self
+
+        mean_b = float(values.mean())
+        dev = values - mean_b
+        dev2 = dev * dev
+        self._merge_moments(
+            values.size, mean_b, float(dev2.sum()), float((dev2 * dev).sum()),
+            float((dev2 * dev2).sum()),
+        )
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+        for t in self.thresholds:
+            self.count_gt[t] += int(np.count_nonzero(values > t))
+        self.sketch.update(values)
+        return self
+
+    def merge(self, other):
+        """Fold another accumulator (e.g. from a worker) into this one."""
+        self.n_seen += other.n_seen
+        self._merge_moments(other.n, other.mean, other.m2, other.m3, other.m4)
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        for t in self.thresholds:
+            self.count_gt[t] += other.count_gt.get(t, 0)
+        self.sketch.merge(other.sketch)
+        return self
+
+    @property
+    def var(self):
+        return self.m2 / self.n if self.n else np.nan
+
+    @property
+    def std(self):
+        return math.sqrt(self.var) if self.n else np.nan
+
+    @property
+    def skew(self):
+        if self.n < 3 or self.m2 == 0:
+            return np.nan
+        return math.sqrt(self.n) * self.m3 / self.m2 ** 1.5
+
+    @property
+    def kurtosis(self):
+        if self.n < 3 or self.m2 == 0:
+            return np.nan
+        return self.n * self.m4 / (self.m2 * self.m2) - 3.0
+
+    def percentile(self, p):
+        if self.n == 0:
+            return np.nan
+        # Sketch buckets are approximate; the extremes are known exactly
+        return float(min(max(self.sketch.quantile(p / 100.0), self.min), self.max))
+
+    def summary(self, percentiles=(25, 50, 75)):
+        """Flat dict: count, mean, std, var, min, max, p<N>, skew, kurtosis."""
+        empty = self.n == 0
+        result = {
+            "count": self.n,
+            "mean": np.nan if empty else float(self.mean),
+            "std": self.std,
+            "var": self.var,
+            "min": np.nan if empty else self.min,
+            "max": np.nan if empty else self.max,
+        }
+        for p in percentiles:
+            result[f"p{p}"] = self.percentile(p)
+        result["skew"] = self.skew
+        result["kurtosis"] = self.kurtosis
+        return result
@@ -0,0 +1,135 @@
+"""
+Local lake tile grid (shapely) for the Earth Engine downloaders.
+
+lake-data.py and add_b5_and_b11.py used to ask Earth Engine for
+intersection(tile).area().getInfo() on every candidate tile and for
+img.date().format().getInfo() on every image, one blocking round trip
+each. Here the lake polygon is fetched once (and cached as GeoJSON), the
+grid is intersected locally using an STRtree spatial index, and image
+dates come from a single batched aggregate_array request.
+
+Tile numbering is identical to the old loop (x outer, y inner, same
+float stepping), so existing {date}_tile{N}_* file names stay valid.
+
+Only image_dates(), fetch_lake_polygon() without a cache and
+to_ee_geometry() need the earthengine-api; everything else runs offline.
+"""
+
+import json
+import os
+from datetime import datetime, timezone
+
+from shapely.geometry import box, mapping, shape  # type: ignore
+from shapely.ops import unary_union  # type: ignore
+from shapely.strtree import STRtree  # type: ignore
+
+HYDROLAKES_ASSET = "projects/aquatrack-468214/assets/HydroLAKES_Turkey"
+KM_PER_DEGREE = 111.0
+
+
+def load_lake_polygon(path):
+    """Shapely geometry from a GeoJSON file (geometry, Feature or FeatureCollection).
+
+    Works with the export of water-quantity/download-lake-polygon.py.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    if data.get("type") == "FeatureCollection":
+        return unary_union([shape(feat["geometry"]) for feat in data["features"]])
+    if data.get("type") == "Feature":
+        return shape(data["geometry"])
+    return shape(data)
+
+
+def fetch_lake_polygon(hydro_lakes_id, asset=HYDROLAKES_ASSET, cache_path=None):
+    """Lake polygon from HydroLAKES with one getInfo(); cached at cache_path."""
+    if cache_path and os.path.exists(cache_path):
+        return load_lake_polygon(cache_path)
+
+    import ee  # type: ignore
+
+    lake = ee.FeatureCollection(asset).filter(ee.Filter.eq("Hylak_id", hydro_lakes_id)).first()
+    geojson = lake.geometry().getInfo()
+    if cache_path:
+        os.makedirs(os.path.dirname(os.path.abspath(cache_path)), exist_ok=True)
+        with open(cache_path, "w", encoding="utf-8") as f:
+            json.dump(geojson, f)
+    return shape(geojson)
+
+
+def grid_cells(bounds, tile_size_km=10):
+    """Candidate cells over bounds, in the downloaders' original order."""
+    xmin, ymin, xmax, ymax = bounds
+    tile_size_deg = tile_size_km / KM_PER_DEGREE
+    cells = []
+    x = xmin
+    while x < xmax:
+        y = ymin
+        while y < ymax:
+            cells.append(box(x, y, x + tile_size_deg, y + tile_size_deg))
+            y += tile_size_deg
+        x += tile_size_deg
+    return cells
+
+
+def compute_tile_grid(lake_polygon, tile_size_km=10):
+    """[(tile_index, lake ∩ cell)] for every cell that overlaps the lake."""
+    cells = grid_cells(lake_polygon.bounds, tile_size_km)
+    tree = STRtree(cells)
+    # Only cells whose envelope touches the lake are intersected
+    candidates = sorted(int(i) for i in tree.query(lake_polygon, predicate="intersects"))
+
+    tiles = []
+    for i in candidates:
+        intersection = lake_polygon.intersection(cells[i])
+        if intersection.area > 0:
+            tiles.append((len(tiles), intersection))
+    return tiles
+
+
+def to_ee_geometry(geom):
+    """shapely -> ee.Geometry (planar, like ee.Geometry.Rectangle)."""
+    import ee  # type: ignore
+
+    return ee.Geometry(mapping(geom), None, False)
+
+
+def image_dates(collection):
+    """[(system:index, 'YYYY-MM-dd')] for a collection in one round trip."""
+    import ee  # type: ignore
+
+    ids, times = ee.List([
+        collection.aggregate_array("system:index"),
+        collection.aggregate_array("system:time_start"),
+    ]).getInfo()
+    # ee.Date.format() uses UTC by default
+    return [
+        (img_id, datetime.fromtimestamp(ms / 1000, tz=timezone.utc).strftime("%Y-%m-%d"))
+        for img_id, ms in zip(ids, times)
+    ]
+
+
+def save_tile_grid(tiles, path):
+    """Write the tile grid as a GeoJSON FeatureCollection (for inspection)."""
+    features = [
+        {"type": "Feature", "properties": {"tile": t_idx}, "geometry": mapping(geom)}
+        for t_idx, geom in tiles
+    ]
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"type": "FeatureCollection", "features": features}, f)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Göl poligonundan tile grid'i (offline) hesapla")
+    parser.add_argument("polygon", help="Göl poligonu (GeoJSON)")
+    parser.add_argument("--tile-size-km", type=float, default=10)
+    parser.add_argument("--out", default=None, help="Tile'ları GeoJSON olarak kaydet")
+    args = parser.parse_args()
+
+    tiles = compute_tile_grid(load_lake_polygon(args.polygon), args.tile_size_km)
+    print(f"{len(tiles)} tile")
+    if args.out:
+        save_tile_grid(tiles, args.out)
+        print(f"Kaydedildi: {args.out}")
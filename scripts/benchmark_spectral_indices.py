@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Spektral indeks çekirdeği benchmark'ı
+
+Eski dağınık hesaplamalar (extract_egirdir_features'taki piksel döngüsü
+WRI, ayrı numpy geçişleriyle Chl-a/bulanıklık/NDWI, color_routes
+formüllerinin dizi hali) ile backend/spectral_indices.compute_indices'in
+tek geçişli blok hesabını sentetik Sentinel-2 bantları üzerinde karşılaştırır.
+
+Kullanım:
+    python scripts/benchmark_spectral_indices.py [--pixels 4000000] [--repeat 3]
+"""
+
+import os
+import sys
+import time
+import argparse
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from lake_raster.spectral import COLOR_INDICES, compute_indices
+
+BANDS = ["b2", "b3", "b4", "b5", "b8", "b11"]
+NODATA = 0
+
+
+def make_bands(pixels, seed=42):
+    """uint16 yansıma değerleri, ~%10 nodata"""
+    rng = np.random.default_rng(seed)
+    bands = {}
+    for band in BANDS:
+        data = rng.integers(1, 4000, pixels).astype(np.uint16)
+        data[rng.random(pixels) < 0.1] = NODATA
+        bands[band] = data
+    return bands
+
+
+def legacy_wri_loop(b5, b11):
+    """extract_egirdir_features'taki eski WRI döngüsü"""
+    wri_data = []
+    for i in range(min(len(b5), len(b11))):
+        if np.isfinite(b5[i]) and np.isfinite(b11[i]) and b11[i] > 0:
+            wri_data.append(b5[i] / b11[i])
+    return np.array(wri_data)
+
+
+def legacy_indices(bands):
+    """Eski kod yolları: her indeks ve maske için ayrı float64 geçiş"""
+    f = {}
+    for band, data in bands.items():
+        arr = data.astype(np.float32)
+        arr[arr == NODATA] = np.nan
+        f[band] = arr.astype(np.float64)
+    b2, b3, b4, b5, b8, b11 = (f[b] for b in BANDS)
+
+    out = {}
+    out["ndwi"] = (b3 - b8) / (b3 + b8)
+    ok = np.isfinite(b5) & np.isfinite(b11) & (b11 > 0)
+    out["wri"] = b5[ok] / b11[ok]
+    out["chl_a"] = b5[np.isfinite(b5)] * 0.01
+    out["turbidity"] = b11[np.isfinite(b11)] * 0.0001
+    out["water_clarity"] = np.where(b3 > 0, b2 / (b3 + 0.001), 1.0)
+    out["blue_green_ratio"] = np.where(b3 > 0, b2 / (b3 + 0.001), 1.0)
+    out["turbidity_ratio"] = np.where(b2 > 0, b4 / (b2 + 0.001), 1.0)
+    out["ndwi_color"] = np.where(b3 + b8 > 0, (b3 - b8) / (b3 + b8 + 0.001), 0.0)
+    out["true_color_index"] = (b4 + b3 + b2) / 3
+    out["chlorophyll_index"] = np.where(b8 + b4 > 0, (b8 - b4) / (b8 + b4 + 0.001), 0.0)
+    out["sediment_index"] = np.where(b4 > 0, b11 / (b4 + 0.001), 1.0)
+    out["organic_matter_index"] = np.where(b11 > 0, b5 / (b11 + 0.001), 1.0)
+    out["enhanced_turbidity"] = np.where(b3 > 0, b11 / (b3 + 0.001), 1.0)
+    out["chlorophyll_a_index"] = np.where(b5 + b4 > 0, (b5 - b4) / (b5 + b4 + 0.001), 0.0)
+    return out
+
+
+def best_of(fn, repeat):
+    times = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - start)
+    return min(times), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Spektral indeks çekirdeği benchmark'ı")
+    parser.add_argument("--pixels", type=int, default=4_000_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--loop-pixels", type=int, default=200_000,
+                        help="Eski Python WRI döngüsü için piksel sayısı (yavaş)")
+    args = parser.parse_args()
+
+    bands = make_bands(args.pixels)
+    indices = ["ndwi", "wri", "chl_a", "turbidity"] + COLOR_INDICES
+    out = {name: np.empty(args.pixels, dtype=np.float32) for name in indices}
+
+    print("=" * 70)
+    print(f"SPEKTRAL İNDEKS BENCHMARK ({args.pixels:,} piksel, {len(indices)} indeks)")
+    print("=" * 70)
+
+    t_legacy, legacy = best_of(lambda: legacy_indices(bands), args.repeat)
+    t_kernel, kernel = best_of(
+        lambda: compute_indices(bands, indices, nodata=NODATA, out=out), args.repeat
+    )
+
+    n = args.loop_pixels
+    b5 = bands["b5"][:n].astype(np.float64)
+    b11 = bands["b11"][:n].astype(np.float64)
+    t_loop, _ = best_of(lambda: legacy_wri_loop(b5, b11), 1)
+    t_loop_full = t_loop * args.pixels / n
+
+    print(f"{'Yol':<40}{'Süre (s)':>12}{'Mpiksel/s':>12}")
+    print(f"{'Eski WRI döngüsü (tahmini, tam boyut)':<40}{t_loop_full:>12.3f}{args.pixels / t_loop_full / 1e6:>12.2f}")
+    print(f"{'Eski numpy geçişleri (float64)':<40}{t_legacy:>12.3f}{args.pixels / t_legacy / 1e6:>12.2f}")
+    print(f"{'compute_indices (float32, bloklu)':<40}{t_kernel:>12.3f}{args.pixels / t_kernel / 1e6:>12.2f}")
+    print(f"\nHızlanma: numpy geçişlerine göre {t_legacy / t_kernel:.1f}x, "
+          f"WRI döngüsüne göre {t_loop_full / t_kernel:.0f}x")
+
+    # Doğruluk kontrolü (maskelenmiş pikseller hariç)
+    for name in ["ndwi", "water_clarity", "chlorophyll_a_index"]:
+        ref = legacy[name]
+        diff = np.nanmax(np.abs(kernel[name].astype(np.float64) - ref))
+        print(f"  max |fark| {name}: {diff:.2e}")
+    wri = kernel["wri"]
+    print(f"  WRI geçerli piksel: eski {legacy['wri'].size:,} / yeni {int(np.isfinite(wri).sum()):,}")
+
+
+if __name__ == "__main__":
+    main()
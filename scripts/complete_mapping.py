@@ -5,9 +5,15 @@ Tüm gölleri TIF dosyaları ile eşleştirme - Geliştirilmiş versiyon
 
 import pandas as pd
 import os
+import sys
 from pathlib import Path
 import numpy as np
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from lake_raster.catalog import TileCatalog
+
+CATALOG_PATH = 'data/tile_catalog.sqlite'
+
 def find_all_tif_files():
     """Tüm TIF dosyalarını bul"""
     print("Tum TIF dosyalari bulunuyor...")
@@ -15,21 +21,21 @@ def find_all_tif_files():
     tif_files = []
     lake_dirs = ['gol_van', 'gol_tuz', 'gol_burdur', 'gol_egridir', 'gol_ulubat', 'gol_sapanca', 'gol_salda']
     
-    for lake_dir in lake_dirs:
-        lake_path = Path(f'data/{lake_dir}')
-        if lake_path.exists():
-            print(f"{lake_dir} klasoru taranıyor...")
-            
-            # Tüm alt klasörleri tara
-            for root, dirs, files in os.walk(lake_path):
-                for file in files:
-                    if file.endswith('.tif'):
-                        tif_files.append({
-                            'file_path': os.path.join(root, file),
-                            'lake_dir': lake_dir,
-                            'filename': file,
-                            'file_size': os.path.getsize(os.path.join(root, file))
-                        })
+    # Katalog sadece yeni/değişen dosyaları tarar; tam os.walk + getsize yok
+    with TileCatalog(CATALOG_PATH) as catalog:
+        for lake_dir in lake_dirs:
+            lake_path = Path(f'data/{lake_dir}')
+            if lake_path.exists():
+                print(f"{lake_dir} klasoru taranıyor...")
+                catalog.update(str(lake_path), lake=lake_dir)
+                
+                for row in catalog.records(lake=lake_dir):
+                    tif_files.append({
+                        'file_path': row['path'],
+                        'lake_dir': lake_dir,
+                        'filename': os.path.basename(row['path']),
+                        'file_size': row['size']
+                    })
     
     tif_df = pd.DataFrame(tif_files)
     print(f"Toplam TIF dosyasi: {len(tif_df)}")
@@ -5,23 +5,34 @@ Ham TIF dosyalarından su kalitesi özelliklerini çıkar
 """
 
 import os
+import sys
 import glob
 import numpy as np
 import pandas as pd
 import rasterio
 from datetime import datetime
-from scipy.stats import skew, kurtosis
 import warnings
 warnings.filterwarnings('ignore')
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from lake_raster.catalog import TileCatalog
+from lake_raster.stats import StreamingStats
+from lake_raster.spectral import INDEX_SPECS, compute_indices
+
 # Eğirdir Lake ID
 LAKE_ID = 1340
 LAKE_NAME = "Eğirdir Gölü"
 DATA_DIR = "data/gol_egridir"
 OUTPUT_FILE = "data/water_quality/egirdir_b5_b11_features.csv"
+CATALOG_PATH = "data/tile_catalog.sqlite"
+LAKE_KEY = "gol_egridir"
 
-def load_band_tiles(date_str, band_name, year):
+def load_band_tiles(date_str, band_name, year, catalog=None):
     """Load all tiles for a specific band and date"""
+    if catalog is not None:
+        files = catalog.tiles(LAKE_KEY, date_str, kind="b5_b11", band=band_name)
+        return files or catalog.tiles(LAKE_KEY, date_str, kind="image", band=band_name)
+    
     pattern = os.path.join(DATA_DIR, str(year), "images", f"{date_str}_tile*_B5_B11.{band_name}.tif")
     files = sorted(glob.glob(pattern))
     
@@ -32,168 +43,142 @@ def load_band_tiles(date_str, band_name, year):
     
     return files
 
-def load_ndwi_mask_tiles(date_str, year):
+def load_ndwi_mask_tiles(date_str, year, catalog=None):
     """Load NDWI mask tiles"""
+    if catalog is not None:
+        return catalog.tiles(LAKE_KEY, date_str, kind="mask")
     pattern = os.path.join(DATA_DIR, str(year), "ndwi_masks", f"{date_str}_tile*_mask.tif")
     return sorted(glob.glob(pattern))
 
-def read_and_merge_tiles(tile_files):
-    """Read and merge multiple tiles into one array"""
-    if not tile_files:
+def read_tile(tile_file):
+    """Read one tile as a flat float32 array (nodata -> NaN)"""
+    try:
+        with rasterio.open(tile_file) as src:
+            data = src.read(1).astype(np.float32)
+            # Replace nodata with NaN
+            if src.nodata is not None:
+                data[data == src.nodata] = np.nan
+            return data.ravel()
+    except Exception as e:
+        print(f"  Warning: Could not read {tile_file}: {e}")
         return None
+
+def tile_key(tile_file):
+    """'20200101_tile3_B5_B11.B5.tif' -> 'tile3'"""
+    return os.path.basename(tile_file).split('_')[1]
+
+def accumulate_tiles(b5_files, b11_files, ndwi_files):
+    """Single pass over the tiles into streaming accumulators (B5, B11, WRI, NDWI).
+    
+    Tiles are read one at a time and never concatenated; WRI is computed
+    pixelwise on the B5/B11 tiles with the same tile index.
+    """
+    stats = {
+        'b5': StreamingStats(),
+        'b11': StreamingStats(),
+        'wri': StreamingStats(),
+        'ndwi': StreamingStats(thresholds=(0,)),
+    }
     
-    all_data = []
-    for tile_file in tile_files:
-        try:
-            with rasterio.open(tile_file) as src:
-                data = src.read(1).astype(np.float32)
-                # Replace nodata with NaN
-                if src.nodata is not None:
-                    data[data == src.nodata] = np.nan
-                all_data.append(data.flatten())
-        except Exception as e:
-            print(f"  Warning: Could not read {tile_file}: {e}")
+    b11_by_tile = {tile_key(f): f for f in b11_files}
+    for b5_file in b5_files:
+        b5 = read_tile(b5_file)
+        if b5 is not None:
+            stats['b5'].update(b5)
+        
+        b11_file = b11_by_tile.pop(tile_key(b5_file), None)
+        b11 = read_tile(b11_file) if b11_file else None
+        if b11 is None:
             continue
+        stats['b11'].update(b11)
+        
+        # WRI (Water Ratio Index) = B5 / B11; NaN where B11 <= 0 or a band is missing
+        if b5 is not None and b5.size == b11.size:
+            stats['wri'].update(compute_indices({'b5': b5, 'b11': b11}, ['wri'])['wri'])
     
-    if not all_data:
-        return None
+    # B11 tiles without a matching B5 tile
+    for b11_file in b11_by_tile.values():
+        b11 = read_tile(b11_file)
+        if b11 is not None:
+            stats['b11'].update(b11)
     
-    # Concatenate all tile data
-    merged = np.concatenate(all_data)
-    return merged
-
-def calculate_band_stats(data):
-    """Calculate statistics for a band"""
-    if data is None or len(data) == 0:
-        return {
-            'mean': np.nan, 'std': np.nan, 'min': np.nan, 'max': np.nan,
-            'p25': np.nan, 'p50': np.nan, 'p75': np.nan,
-            'skew': np.nan, 'kurtosis': np.nan
-        }
+    for ndwi_file in ndwi_files:
+        ndwi = read_tile(ndwi_file)
+        if ndwi is not None:
+            stats['ndwi'].update(ndwi)
     
-    # Remove NaN and inf values
-    valid_data = data[np.isfinite(data)]
-    
-    if len(valid_data) == 0:
+    return stats
+
+def calculate_band_stats(stats):
+    """Calculate statistics for a band from its streaming accumulator"""
+    if stats is None or stats.n == 0:
         return {
             'mean': np.nan, 'std': np.nan, 'min': np.nan, 'max': np.nan,
             'p25': np.nan, 'p50': np.nan, 'p75': np.nan,
             'skew': np.nan, 'kurtosis': np.nan
         }
     
+    summary = stats.summary(percentiles=(25, 50, 75))
+    return {key: summary[key] for key in
+            ('mean', 'std', 'min', 'max', 'p25', 'p50', 'p75', 'skew', 'kurtosis')}
+
+def scaled_stats(stats, factor, prefix):
+    """mean/std/min/max of factor * band, derived from the band's accumulator"""
+    if stats is None or stats.n == 0:
+        return {f'{prefix}_{key}': np.nan for key in ('mean', 'std', 'min', 'max')}
     return {
-        'mean': float(np.mean(valid_data)),
-        'std': float(np.std(valid_data)),
-        'min': float(np.min(valid_data)),
-        'max': float(np.max(valid_data)),
-        'p25': float(np.percentile(valid_data, 25)),
-        'p50': float(np.percentile(valid_data, 50)),
-        'p75': float(np.percentile(valid_data, 75)),
-        'skew': float(skew(valid_data)) if len(valid_data) > 2 else np.nan,
-        'kurtosis': float(kurtosis(valid_data)) if len(valid_data) > 2 else np.nan
+        f'{prefix}_mean': stats.mean * factor,
+        f'{prefix}_std': stats.std * factor,
+        f'{prefix}_min': stats.min * factor,
+        f'{prefix}_max': stats.max * factor,
     }
 
-def calculate_water_quality_indices(b5, b11, ndwi):
+def calculate_water_quality_indices(stats):
     """Calculate WRI, Chl-a, and Turbidity"""
     results = {}
     
     # WRI (Water Ratio Index) = B5 / B11
-    if b5 is not None and b11 is not None:
-        b5_valid = b5[np.isfinite(b5) & (b5 > 0)]
-        b11_valid = b11[np.isfinite(b11) & (b11 > 0)]
-        
-        if len(b5_valid) > 0 and len(b11_valid) > 0:
-            # Calculate WRI for all pixels
-            wri_data = []
-            for i in range(min(len(b5), len(b11))):
-                if np.isfinite(b5[i]) and np.isfinite(b11[i]) and b11[i] > 0:
-                    wri_data.append(b5[i] / b11[i])
-            
-            if wri_data:
-                wri_stats = calculate_band_stats(np.array(wri_data))
-                results['wri_mean'] = wri_stats['mean']
-                results['wri_std'] = wri_stats['std']
-                results['wri_min'] = wri_stats['min']
-                results['wri_max'] = wri_stats['max']
-            else:
-                results.update({'wri_mean': np.nan, 'wri_std': np.nan, 'wri_min': np.nan, 'wri_max': np.nan})
-        else:
-            results.update({'wri_mean': np.nan, 'wri_std': np.nan, 'wri_min': np.nan, 'wri_max': np.nan})
-    else:
-        results.update({'wri_mean': np.nan, 'wri_std': np.nan, 'wri_min': np.nan, 'wri_max': np.nan})
+    results.update(scaled_stats(stats['wri'], 1.0, 'wri'))
     
-    # Chlorophyll-a (simplified from B5)
-    if b5 is not None:
-        b5_valid = b5[np.isfinite(b5)]
-        if len(b5_valid) > 0:
-            # Simplified Chl-a estimation: proportional to B5
-            chl_a = b5_valid * 0.01  # Scaling factor
-            chl_stats = calculate_band_stats(chl_a)
-            results['chl_a_mean'] = chl_stats['mean']
-            results['chl_a_std'] = chl_stats['std']
-            results['chl_a_min'] = chl_stats['min']
-            results['chl_a_max'] = chl_stats['max']
-        else:
-            results.update({'chl_a_mean': np.nan, 'chl_a_std': np.nan, 'chl_a_min': np.nan, 'chl_a_max': np.nan})
-    else:
-        results.update({'chl_a_mean': np.nan, 'chl_a_std': np.nan, 'chl_a_min': np.nan, 'chl_a_max': np.nan})
+    # Chlorophyll-a (simplified from B5): proportional to B5
+    results.update(scaled_stats(stats['b5'], INDEX_SPECS['chl_a'][2], 'chl_a'))
     
-    # Turbidity (from B11)
-    if b11 is not None:
-        b11_valid = b11[np.isfinite(b11)]
-        if len(b11_valid) > 0:
-            # Turbidity proportional to B11
-            turbidity = b11_valid * 0.0001  # Scaling factor
-            turb_stats = calculate_band_stats(turbidity)
-            results['turbidity_mean'] = turb_stats['mean']
-            results['turbidity_std'] = turb_stats['std']
-            results['turbidity_min'] = turb_stats['min']
-            results['turbidity_max'] = turb_stats['max']
-        else:
-            results.update({'turbidity_mean': np.nan, 'turbidity_std': np.nan, 'turbidity_min': np.nan, 'turbidity_max': np.nan})
-    else:
-        results.update({'turbidity_mean': np.nan, 'turbidity_std': np.nan, 'turbidity_min': np.nan, 'turbidity_max': np.nan})
+    # Turbidity (from B11): proportional to B11
+    results.update(scaled_stats(stats['b11'], INDEX_SPECS['turbidity'][2], 'turbidity'))
     
     # Water pixels count (from NDWI mask)
-    if ndwi is not None:
-        water_pixels = int(np.sum(ndwi > 0))
-        total_pixels = int(len(ndwi))
-        water_ratio = water_pixels / total_pixels if total_pixels > 0 else 0.0
-        results['water_pixels'] = water_pixels
-        results['total_pixels'] = total_pixels
-        results['water_ratio'] = water_ratio
-    else:
-        results.update({'water_pixels': 0, 'total_pixels': 0, 'water_ratio': 0.0})
+    ndwi = stats['ndwi']
+    water_pixels = ndwi.count_gt[0]
+    total_pixels = ndwi.n_seen
+    results['water_pixels'] = water_pixels
+    results['total_pixels'] = total_pixels
+    results['water_ratio'] = water_pixels / total_pixels if total_pixels > 0 else 0.0
     
     return results
 
-def process_date(date_str, year):
+def process_date(date_str, year, catalog=None):
     """Process a single date"""
     print(f"  Processing {date_str}...")
     
-    # Load B5 tiles
-    b5_files = load_band_tiles(date_str, "B5", year)
-    b5_data = read_and_merge_tiles(b5_files)
-    
-    # Load B11 tiles  
-    b11_files = load_band_tiles(date_str, "B11", year)
-    b11_data = read_and_merge_tiles(b11_files)
+    # Tile lists
+    b5_files = load_band_tiles(date_str, "B5", year, catalog)
+    b11_files = load_band_tiles(date_str, "B11", year, catalog)
+    ndwi_files = load_ndwi_mask_tiles(date_str, year, catalog)
     
-    # Load NDWI mask
-    ndwi_files = load_ndwi_mask_tiles(date_str, year)
-    ndwi_data = read_and_merge_tiles(ndwi_files)
+    # One pass over the tiles
+    stats = accumulate_tiles(b5_files, b11_files, ndwi_files)
     
-    if b5_data is None and b11_data is None:
+    if stats['b5'].n_seen == 0 and stats['b11'].n_seen == 0:
         print(f"    No data for {date_str}")
         return None
     
     # Calculate statistics
-    b5_stats = calculate_band_stats(b5_data)
-    b11_stats = calculate_band_stats(b11_data)
-    ndwi_stats = calculate_band_stats(ndwi_data)
+    b5_stats = calculate_band_stats(stats['b5'])
+    b11_stats = calculate_band_stats(stats['b11'])
+    ndwi_stats = calculate_band_stats(stats['ndwi'])
     
     # Calculate water quality indices
-    wq_indices = calculate_water_quality_indices(b5_data, b11_data, ndwi_data)
+    wq_indices = calculate_water_quality_indices(stats)
     
     # Parse date
     date_obj = datetime.strptime(date_str, "%Y%m%d")
@@ -249,6 +234,11 @@ def main():
     print(f"Data Directory: {DATA_DIR}")
     print()
     
+    # Tile kataloğunu güncelle (sadece yeni/değişen dosyalar taranır)
+    catalog = TileCatalog(CATALOG_PATH)
+    added, removed = catalog.update(DATA_DIR, lake=LAKE_KEY)
+    print(f"Tile catalog: +{added} / -{removed}")
+    
     # Find all unique dates across all years
     all_records = []
     
@@ -259,26 +249,17 @@ def main():
         
         print(f"\n📅 Processing year {year}...")
         
-        # Find all B5 files to get dates
-        pattern = os.path.join(year_dir, "*_tile*_B5_B11.B5.tif")
-        files = glob.glob(pattern)
-        
-        # Extract unique dates
-        dates = set()
-        for f in files:
-            basename = os.path.basename(f)
-            date_str = basename.split('_')[0]
-            dates.add(date_str)
-        
-        dates = sorted(dates)
+        # B5 tile'ı olan tarihler (katalogdan)
+        dates = catalog.dates(LAKE_KEY, kind="b5_b11", band="B5", year=year)
         print(f"  Found {len(dates)} dates")
         
         # Process each date
         for date_str in dates:
-            record = process_date(date_str, year)
+            record = process_date(date_str, year, catalog)
             if record:
                 all_records.append(record)
     
+    catalog.close()
     print(f"\n✅ Total records processed: {len(all_records)}")
     
     if not all_records:
@@ -0,0 +1,45 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from lake_raster.download_scheduler import (  # noqa: E402
+    IMAGE_BAND_SET,
+    NDWI_BAND_SET,
+    FakeExporter,
+    job_outputs,
+    plan_jobs,
+    run_downloads,
+)
+
+
+def test_same_day_images_share_one_job_per_tile(tmp_path):
+    # Two Sentinel-2 granules on the same date plus one on another date
+    images = [
+        ("20240105T084211_B", "2024-01-05"),
+        ("20240105T084211_A", "2024-01-05"),
+        ("20240110T084159_A", "2024-01-10"),
+    ]
+    tiles = [(0, None), (1, None)]
+    jobs = plan_jobs(images, tiles, str(tmp_path), [IMAGE_BAND_SET, NDWI_BAND_SET])
+
+    keys = [job.key for job in jobs]
+    assert len(keys) == len(set(keys)) == 2 * 2 * 2
+    outputs = [path for job in jobs for path in job_outputs(job)]
+    assert len(outputs) == len(set(outputs))
+
+    same_day = [job for job in jobs if job.date == "2024-01-05"]
+    assert all(job.image_ids == ("20240105T084211_A", "20240105T084211_B") for job in same_day)
+
+    manifest_path = str(tmp_path / "download_manifest.jsonl")
+    exporter = FakeExporter()
+    summary = run_downloads(jobs, exporter, manifest_path, workers=4, rate=0, verbose=False)
+    assert summary["done"] == len(jobs)
+    assert summary["failed"] == 0
+    assert exporter.calls == len(jobs)
+    assert all(os.path.getsize(path) > 0 for path in outputs)
+
+    # Rerun: every job is complete according to the manifest
+    exporter = FakeExporter()
+    summary = run_downloads(jobs, exporter, manifest_path, workers=4, rate=0, verbose=False)
+    assert summary["skipped"] == len(jobs)
+    assert exporter.calls == 0
@@ -0,0 +1,46 @@
+import os
+import sys
+
+import pytest
+
+pd = pytest.importorskip("pandas")
+pytest.importorskip("pyarrow")
+
+BACKEND = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "backend")
+sys.path.insert(0, BACKEND)
+from grouped_metrics import GroupedMetricsState, grouped_normalized_metrics, predictions_frame  # noqa: E402
+from utils import calculate_normalized_metrics  # noqa: E402
+
+PREDICTIONS = os.path.join(BACKEND, "models", "all_predictions_final.parquet")
+
+
+def test_predictions_frame_reads_shipped_parquet_test_split():
+    raw = pd.read_parquet(PREDICTIONS)
+    df = predictions_frame(PREDICTIONS)
+    assert list(df.columns) == ["lake_id", "horizon", "y_true", "y_pred"]
+    assert len(df) == (raw["split_type"] == "test").sum()
+    assert len(predictions_frame(PREDICTIONS, split=None)) == len(raw)
+
+    metrics = grouped_normalized_metrics(df)
+    row = metrics[(metrics["lake_id"] == 140) & (metrics["horizon"] == 1)].iloc[0]
+    assert row["sample_count"] == 68
+    assert row["WMAPE"] == pytest.approx(3.756, abs=1e-3)
+
+
+def test_grouped_matches_per_group_reference_and_incremental():
+    df = predictions_frame(PREDICTIONS)
+    metrics = grouped_normalized_metrics(df)
+    for (lake_id, horizon), group in df.groupby(["lake_id", "horizon"]):
+        row = metrics[(metrics["lake_id"] == lake_id) & (metrics["horizon"] == horizon)].iloc[0]
+        ref = calculate_normalized_metrics(group["y_true"].to_numpy(), group["y_pred"].to_numpy())
+        assert row["sample_count"] == ref["sample_count"]
+        assert row["WMAPE"] == pytest.approx(ref["WMAPE"], abs=0.006)
+        assert row["MAPE"] == pytest.approx(ref["MAPE"], abs=0.006)
+        assert row["R2"] == pytest.approx(ref["R2"], abs=1e-4)
+
+    state = GroupedMetricsState()
+    for start in range(0, len(df), 250):
+        state.update(df.iloc[start:start + 250])
+    incremental = state.metrics()
+    for col in ("sample_count", "WMAPE", "MAPE", "R2", "RMSE"):
+        assert incremental[col].to_numpy() == pytest.approx(metrics[col].to_numpy(), rel=1e-9, nan_ok=True)
@@ -0,0 +1,382 @@
+#!/usr/bin/env python3
+"""
+WALK-FORWARD BACKTEST MOTORU
+Göl farkında, tarihe göre genişleyen/kayan fold'lar ve paralel fold eğitimi
+
+overfitting_analysis.py, overfitting_fix.py ve data_leakage_investigation.py
+kendi train/val/test ayrımlarını kurup modelleri sırayla yeniden eğitiyordu;
+cross_val_score(cv=5) zaman sırasını gözetmeden karıştırıyordu. Burada:
+
+- walk_forward_folds(): benzersiz tarihler n_folds + 1 bloğa bölünür, her
+  fold bir sonraki bloğu test eder. expanding: train baştan test başına
+  kadar; sliding: son `window` tarih. gap ile test öncesi tarihler atlanır,
+  target_dates verilirse hedefi test dönemine düşen train satırları atılır
+  (ufuk kaçağı). Train'de görülmemiş göllerin test satırları fold dışı kalır.
+- fold_matrices(): fold başına ölçeklenmiş matrisler (scaler sadece train'e
+  fit edilir) bir kez kurulur; bellekte ve isteğe bağlı diskte (.npz)
+  önbelleklenir. Tek-feature kaçak testleri aynı matrislerin sütunlarını
+  kullanır.
+- run_backtest(): (model, fold) işleri joblib ile paralel.
+- metrics_table(): fold / göl / ufuk / göl+ufuk / genel seviyelerde tek
+  bir düzenli (tidy) tablo.
+
+Komut satırı (proje kökünden):
+    python training/backtest.py unified --data-dir water_quantity/output \\
+        --out backend/models/unified_normalized_metrics.json
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+from joblib import Parallel, delayed
+from sklearn.base import clone
+
+# unified_normalized_metrics.json kaydı backend ile ortak
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'backend'))
+from grouped_metrics import unified_entry  # noqa: E402
+
+Fold = namedtuple('Fold', ['fold', 'train_idx', 'test_idx', 'train_start', 'test_start', 'test_end'])
+
+TARGET_COL = 'target_water_area_m2'
+LEVELS = {
+    'fold': ('fold',),
+    'lake': ('lake_id',),
+    'horizon': ('horizon',),
+    'lake_horizon': ('lake_id', 'horizon'),
+    'overall': (),
+}
+
+_MATRIX_CACHE = {}
+
+
+# ---------------------------------------------------------------------------
+# Fold'lar
+# ---------------------------------------------------------------------------
+
+def walk_forward_folds(dates, lakes=None, n_folds=5, mode='expanding', window=None, gap=0,
+                       target_dates=None, min_train_rows=1):
+    """Tarihe göre walk-forward fold'lar -> [Fold]
+
+    dates/lakes/target_dates satır başınadır; indeksler bu sıraya göredir.
+    window ve gap benzersiz tarih sayısı cinsindendir.
+    """
+    dates = pd.to_datetime(pd.Series(dates)).to_numpy()
+    periods = np.unique(dates)
+    blocks = np.array_split(np.arange(len(periods)), n_folds + 1)
+    if any(len(b) == 0 for b in blocks):
+        raise ValueError(f'{len(periods)} benzersiz tarih {n_folds} fold için yetersiz')
+    window = window or len(blocks[0])
+    lakes = None if lakes is None else np.asarray(lakes)
+    if target_dates is not None:
+        target_dates = pd.to_datetime(pd.Series(target_dates)).to_numpy()
+
+    folds = []
+    for k in range(1, n_folds + 1):
+        first, last = blocks[k][0], blocks[k][-1]
+        train_stop = first - gap
+        if train_stop <= 0:
+            continue
+        train_first = 0 if mode == 'expanding' else max(0, train_stop - window)
+        train_mask = (dates >= periods[train_first]) & (dates < periods[train_stop])
+        test_mask = (dates >= periods[first]) & (dates <= periods[last])
+        if target_dates is not None:
+            # Hedefi test dönemine düşen satırlar train'de kalırsa ufuk kadar kaçak olur
+            train_mask &= target_dates < periods[first]
+        if lakes is not None:
+            seen, counts = np.unique(lakes[train_mask], return_counts=True)
+            test_mask &= np.isin(lakes, seen[counts >= min_train_rows])
+        if not train_mask.any() or not test_mask.any():
+            continue
+        folds.append(Fold(k, np.flatnonzero(train_mask), np.flatnonzero(test_mask),
+                          periods[train_first], periods[first], periods[last]))
+    return folds
+
+
+def describe_folds(folds):
+    return pd.DataFrame([{
+        'fold': f.fold,
+        'train_start': pd.Timestamp(f.train_start).date(),
+        'test_start': pd.Timestamp(f.test_start).date(),
+        'test_end': pd.Timestamp(f.test_end).date(),
+        'train_rows': len(f.train_idx),
+        'test_rows': len(f.test_idx),
+    } for f in folds])
+
+
+# ---------------------------------------------------------------------------
+# Fold matrisleri (önbellekli)
+# ---------------------------------------------------------------------------
+
+def _matrix_key(X, y, fold, scaler):
+    digest = hashlib.sha1()
+    for array in (X, y, fold.train_idx, fold.test_idx):
+        digest.update(np.ascontiguousarray(array).tobytes())
+    digest.update(repr(scaler).encode())
+    return digest.hexdigest()[:20]
+
+
+def fold_matrices(X, y, folds, scaler=None, cache_dir=None):
+    """Fold başına (X_train, y_train, X_test, y_test); scaler yalnızca train'e fit edilir
+
+    Sonuçlar süreç içinde ve cache_dir verilirse diskte önbelleklenir.
+    """
+    X = np.asarray(X, dtype=np.float64)
+    y = np.asarray(y)
+    matrices = []
+    for fold in folds:
+        key = _matrix_key(X, y, fold, scaler)
+        if key in _MATRIX_CACHE:
+            matrices.append(_MATRIX_CACHE[key])
+            continue
+        path = os.path.join(cache_dir, f'fold{fold.fold}_{key}.npz') if cache_dir else None
+        if path and os.path.exists(path):
+            with np.load(path) as data:
+                entry = (data['X_train'], data['y_train'], data['X_test'], data['y_test'])
+        else:
+            X_train, X_test = X[fold.train_idx], X[fold.test_idx]
+            if scaler is not None:
+                fitted = clone(scaler).fit(X_train)
+                X_train, X_test = fitted.transform(X_train), fitted.transform(X_test)
+            entry = (np.ascontiguousarray(X_train), y[fold.train_idx],
+                     np.ascontiguousarray(X_test), y[fold.test_idx])
+            if path:
+                os.makedirs(cache_dir, exist_ok=True)
+                np.savez(path, X_train=entry[0], y_train=entry[1], X_test=entry[2], y_test=entry[3])
+        _MATRIX_CACHE[key] = entry
+        matrices.append(entry)
+    return matrices
+
+
+# ---------------------------------------------------------------------------
+# Paralel eğitim
+# ---------------------------------------------------------------------------
+
+def _fit_predict(name, estimator, fold, matrices, cols, include_train):
+    X_train, y_train, X_test, y_test = matrices
+    if cols is not None:
+        X_train, X_test = X_train[:, cols], X_test[:, cols]
+    start = time.perf_counter()
+    model = clone(estimator).fit(X_train, y_train)
+    out = [(name, fold.fold, 'test', fold.test_idx, y_test, model.predict(X_test))]
+    if include_train:
+        out.append((name, fold.fold, 'train', fold.train_idx, y_train, model.predict(X_train)))
+    return out, time.perf_counter() - start
+
+
+def _predictions_frame(outputs, meta):
+    frames = []
+    for name, fold, split, rows, y_true, y_pred in outputs:
+        frames.append(pd.DataFrame({
+            'model': name, 'fold': fold, 'split': split, 'row': rows,
+            'y_true': y_true, 'y_pred': y_pred,
+        }))
+    predictions = pd.concat(frames, ignore_index=True)
+    if meta is not None:
+        meta = pd.DataFrame(meta).reset_index(drop=True)
+        predictions = predictions.join(meta, on='row')
+    return predictions
+
+
+def run_backtest(estimators, X, y, folds, meta=None, scaler=None, n_jobs=-1, cache_dir=None,
+                 include_train=True, columns=None):
+    """Her (model, fold) çiftini paralel eğit -> (tahmin tablosu, süreler)
+
+    estimators: {ad: estimator}; columns: {ad: sütun indeksleri} (isteğe bağlı).
+    meta: satır başına lake_id / horizon vb. (tahminlere eklenir).
+    """
+    matrices = fold_matrices(X, y, folds, scaler, cache_dir)
+    columns = columns or {}
+    jobs = [(name, est, fold, m) for name, est in estimators.items() for fold, m in zip(folds, matrices)]
+    results = Parallel(n_jobs=n_jobs)(
+        delayed(_fit_predict)(name, est, fold, m, columns.get(name), include_train)
+        for name, est, fold, m in jobs
+    )
+    outputs, timings = [], {}
+    for (name, _, fold, _), (out, seconds) in zip(jobs, results):
+        outputs.extend(out)
+        timings[(name, fold.fold)] = seconds
+    return _predictions_frame(outputs, meta), timings
+
+
+# ---------------------------------------------------------------------------
+# Metrikler
+# ---------------------------------------------------------------------------
+
+def regression_metrics(y_true, y_pred):
+    y_true = np.asarray(y_true, dtype=np.float64)
+    y_pred = np.asarray(y_pred, dtype=np.float64)
+    err = y_true - y_pred
+    ss_tot = np.sum((y_true - y_true.mean()) ** 2)
+    denom = np.sum(np.abs(y_true))
+    return {
+        'n': len(y_true),
+        'mae': np.mean(np.abs(err)),
+        'rmse': np.sqrt(np.mean(err ** 2)),
+        'wmape': np.sum(np.abs(err)) / denom * 100 if denom else np.nan,
+        'r2': 1 - np.sum(err ** 2) / ss_tot if ss_tot > 0 else np.nan,
+    }
+
+
+def classification_metrics(y_true, y_pred):
+    return {'n': len(y_true), 'accuracy': float(np.mean(np.asarray(y_true) == np.asarray(y_pred)))}
+
+
+def metrics_table(predictions, task='regression', levels=None):
+    """Tahminlerden tek düzenli tablo: model, split, level, fold, lake_id, horizon, metrikler"""
+    metric_fn = regression_metrics if task == 'regression' else classification_metrics
+    levels = levels or [lvl for lvl, keys in LEVELS.items() if all(k in predictions for k in keys)]
+    rows = []
+    for level in levels:
+        keys = ['model', 'split', *LEVELS[level]]
+        for group, df in predictions.groupby(keys, sort=True):
+            row = dict(zip(keys, group))
+            row['level'] = level
+            row.update(metric_fn(df['y_true'].to_numpy(), df['y_pred'].to_numpy()))
+            rows.append(row)
+    columns = ['model', 'split', 'level', 'fold', 'lake_id', 'horizon']
+    table = pd.DataFrame(rows)
+    for col in columns:
+        if col not in table:
+            table[col] = pd.NA
+    return table[columns + [c for c in table.columns if c not in columns]]
+
+
+def summarize(table, split='test', level='fold'):
+    """model başına fold ortalaması / std (overfitting raporları için)"""
+    df = table[(table['split'] == split) & (table['level'] == level)]
+    metric_cols = [c for c in df.columns if c not in ('model', 'split', 'level', 'fold', 'lake_id', 'horizon', 'n')]
+    return df.groupby('model')[metric_cols].agg(['mean', 'std'])
+
+
+# ---------------------------------------------------------------------------
+# Kaçak (leakage) kontrolü
+# ---------------------------------------------------------------------------
+
+def leakage_check(estimator, X, y, folds, feature_names, task='classification', scaler=None,
+                  threshold=0.95, n_jobs=-1, cache_dir=None):
+    """Her feature tek başına walk-forward ile -> feature başına skor tablosu
+
+    Tek bir feature'ın zaman içinde ileriye taşınan (out-of-fold) skoru
+    eşiği geçiyorsa feature hedefi sızdırıyor olabilir.
+    """
+    estimators = {f: estimator for f in feature_names}
+    columns = {f: [i] for i, f in enumerate(feature_names)}
+    predictions, timings = run_backtest(estimators, X, y, folds, scaler=scaler, n_jobs=n_jobs,
+                                        cache_dir=cache_dir, columns=columns)
+    table = metrics_table(predictions, task, levels=['fold'])
+    score = 'accuracy' if task == 'classification' else 'r2'
+    pivot = table.pivot_table(index='model', columns='split', values=score, aggfunc='mean')
+    last_fold = table[(table['split'] == 'test') & (table['fold'] == table['fold'].max())]
+    result = pd.DataFrame({
+        'feature': feature_names,
+        'train_score': [pivot.loc[f, 'train'] for f in feature_names],
+        'oof_score': [pivot.loc[f, 'test'] for f in feature_names],
+        'last_fold_score': [last_fold.set_index('model')[score].get(f, np.nan) for f in feature_names],
+    })
+    result['suspicious'] = (result['train_score'] > threshold) & (result['oof_score'] > threshold)
+    result['seconds'] = [sum(s for (name, _), s in timings.items() if name == f) for f in feature_names]
+    return result
+
+
+# ---------------------------------------------------------------------------
+# unified_normalized_metrics.json
+# ---------------------------------------------------------------------------
+
+def unified_metrics(table, lake_names, model=None):
+    """metrics_table (test, lake_horizon) -> {'H1': {lake_id: kayıt}}"""
+    df = table[(table['split'] == 'test') & (table['level'] == 'lake_horizon')]
+    if model is not None:
+        df = df[df['model'] == model]
+    result = {}
+    for row in df.sort_values(['horizon', 'lake_id']).itertuples(index=False):
+        lake_key = str(int(row.lake_id))
+        result.setdefault(f'H{int(row.horizon)}', {})[lake_key] = unified_entry(
+            lake_names.get(lake_key, lake_key), row.wmape, row.r2, row.n
+        )
+    return result
+
+
+def regenerate_unified_metrics(data_dir, out_path, models_dir=None, n_folds=5, mode='expanding',
+                               n_jobs=-1, cache_dir=None):
+    """Su miktarı verisinde ufuk başına walk-forward CatBoost backtest -> unified metrics JSON
+
+    models_dir'de metadata_H{H}_improved.json varsa best_params ve
+    selected_features kullanılır.
+    """
+    from catboost import CatBoostRegressor
+
+    frames = [pd.read_parquet(os.path.join(data_dir, f'{s}_combined.parquet')) for s in ('train', 'val', 'test')]
+    df = pd.concat(frames, ignore_index=True)
+    df['date'] = pd.to_datetime(df['date'])
+    df = df.sort_values(['H', 'lake_id', 'date'], kind='stable').reset_index(drop=True)
+    lake_names = {}
+    if 'lake_name' in df:
+        lake_names = {str(int(k)): v for k, v in df.groupby('lake_id')['lake_name'].first().items()}
+    numeric = [c for c in df.select_dtypes(include=[np.number]).columns if c not in ('lake_id', TARGET_COL)]
+
+    predictions = []
+    for horizon, hdf in df.groupby('H', sort=True):
+        hdf = hdf[hdf[TARGET_COL].notna()].reset_index(drop=True)
+        params, features = {}, numeric
+        metadata_path = os.path.join(models_dir, f'metadata_H{int(horizon)}_improved.json') if models_dir else None
+        if metadata_path and os.path.exists(metadata_path):
+            with open(metadata_path, 'r', encoding='utf-8') as f:
+                metadata = json.load(f)
+            params = metadata.get('best_params', {})
+            selected = [c for c in metadata.get('selected_features', []) if c in numeric]
+            if selected:
+                features = selected
+        X = hdf[features].fillna(hdf[features].median()).fillna(0).to_numpy(dtype=np.float64)
+        y = hdf[TARGET_COL].to_numpy(dtype=np.float64)
+
+        target_dates = hdf['date'] + pd.DateOffset(months=int(horizon))
+        folds = walk_forward_folds(hdf['date'], hdf['lake_id'], n_folds=n_folds, mode=mode,
+                                   target_dates=target_dates)
+        print(f"H{int(horizon)}: {len(features)} feature, {len(folds)} fold")
+        print(describe_folds(folds).to_string(index=False))
+        model = CatBoostRegressor(**params, random_seed=42, verbose=False, thread_count=1,
+                                  allow_writing_files=False)
+        preds, _ = run_backtest({'catboost': model}, X, y, folds,
+                                meta=pd.DataFrame({'lake_id': hdf['lake_id'], 'horizon': int(horizon)}),
+                                n_jobs=n_jobs, include_train=False,
+                                cache_dir=os.path.join(cache_dir, f'H{int(horizon)}') if cache_dir else None)
+        predictions.append(preds)
+
+    table = metrics_table(pd.concat(predictions, ignore_index=True))
+    unified = unified_metrics(table, lake_names, model='catboost')
+    os.makedirs(os.path.dirname(os.path.abspath(out_path)), exist_ok=True)
+    with open(out_path, 'w', encoding='utf-8') as f:
+        json.dump(unified, f, indent=2, ensure_ascii=False)
+    table_path = os.path.splitext(out_path)[0] + '_backtest.csv'
+    table.to_csv(table_path, index=False)
+    print(f"✅ {out_path} ve {table_path} yazıldı")
+    return unified, table
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Walk-forward backtest')
+    sub = parser.add_subparsers(dest='command', required=True)
+    unified = sub.add_parser('unified', help='unified_normalized_metrics.json yeniden üret')
+    unified.add_argument('--data-dir', default='water_quantity/output')
+    unified.add_argument('--out', default='backend/models/unified_normalized_metrics.json')
+    unified.add_argument('--models-dir', default='backend/models')
+    unified.add_argument('--folds', type=int, default=5)
+    unified.add_argument('--mode', choices=['expanding', 'sliding'], default='expanding')
+    unified.add_argument('--jobs', type=int, default=-1)
+    unified.add_argument('--cache-dir', default=None)
+    args = parser.parse_args()
+
+    if args.command == 'unified':
+        regenerate_unified_metrics(args.data_dir, args.out, args.models_dir, n_folds=args.folds,
+                                   mode=args.mode, n_jobs=args.jobs, cache_dir=args.cache_dir)
+
+
+if __name__ == '__main__':
+    main()
@@ -11,6 +11,9 @@ TÜM ÖNLEMLERİ ALAN, DENGELI VE ETKİLİ BİR ENSEMBLE MODEL
 - Voting & Stacking ensemble
 - Cross-validation
 - Hyperparameter tuning
+
+Temel modeller ve OOF fold'ları ensemble_engine ile paralel eğitilir;
+SMOTE çıktısı data/smote_cache altında önbelleğe alınır.
 """
 
 import pandas as pd
@@ -27,14 +30,21 @@ warnings.filterwarnings('ignore')
 from sklearn.model_selection import train_test_split, StratifiedKFold, cross_val_score
 from sklearn.preprocessing import StandardScaler, LabelEncoder
 from sklearn.metrics import accuracy_score, classification_report, confusion_matrix, f1_score
-from sklearn.ensemble import RandomForestClassifier, VotingClassifier, StackingClassifier, GradientBoostingClassifier
+from sklearn.ensemble import RandomForestClassifier, GradientBoostingClassifier
 from sklearn.linear_model import LogisticRegression
 from sklearn.svm import SVC
 
+from ensemble_engine import (
+    SMOTE_CACHE_DIR, cached_resample, shared_matrix, fit_base_models, build_ensembles, export_model
+)
+
 # Imbalance handling
 from imblearn.over_sampling import SMOTE, ADASYN
 from imblearn.combine import SMOTETomek
 
+# Voting/Stacking'e girmeyen modeller (sadece RF ve GB)
+ENSEMBLE_EXCLUDE = ['Logistic Regression', 'XGBoost', 'LightGBM']
+
 # Advanced models
 try:
     from xgboost import XGBClassifier
@@ -177,8 +187,8 @@ def prepare_dataset(csv_file, max_samples=None, feature_engineer=True):
     
     return df
 
-def balance_dataset(X, y, method='smote'):
-    """Dataset'i dengele - SMOTE veya ADASYN"""
+def balance_dataset(X, y, method='smote', cache_dir=SMOTE_CACHE_DIR):
+    """Dataset'i dengele - SMOTE veya ADASYN (girdi özetiyle önbellekli)"""
     logging.info(f"Dataset dengeleniyor - Method: {method}")
     
     original_dist = pd.Series(y).value_counts()
@@ -195,7 +205,9 @@ def balance_dataset(X, y, method='smote'):
             logging.warning(f"Bilinmeyen method: {method}, SMOTE kullaniliyor")
             sampler = SMOTE(random_state=42, k_neighbors=3)
         
-        X_balanced, y_balanced = sampler.fit_resample(X, y)
+        X_balanced, y_balanced, cached = cached_resample(sampler, X, y, repr(sampler), cache_dir)
+        if cached:
+            logging.info("Dengelenmis dataset onbellekten yuklendi")
         
         balanced_dist = pd.Series(y_balanced).value_counts()
         logging.info(f"Dengelenmiş dagilim: {balanced_dist.to_dict()}")
@@ -208,18 +220,12 @@ def balance_dataset(X, y, method='smote'):
         logging.info("Dengeleme yapilamadi, orijinal dataset kullaniliyor")
         return X, y
 
-def train_individual_models(X_train, y_train, X_val, y_val, class_weights=None):
-    """Bireysel modelleri eğit"""
-    logging.info("=" * 60)
-    logging.info("BİREYSEL MODELLER EĞİTİLİYOR")
-    logging.info("=" * 60)
-    
-    models = {}
-    results = {}
+def base_estimators(y_train):
+    """Bireysel model tanımları (fit edilmemiş)"""
+    estimators = {}
     
     # 1. Random Forest (Makul parametreler)
-    logging.info("1. Random Forest egitiliyor...")
-    rf = RandomForestClassifier(
+    estimators['Random Forest'] = RandomForestClassifier(
         n_estimators=200,
         max_depth=15,
         min_samples_split=10,
@@ -228,18 +234,9 @@ def train_individual_models(X_train, y_train, X_val, y_val, class_weights=None):
         random_state=42,
         n_jobs=-1
     )
-    rf.fit(X_train, y_train)
-    rf_pred = rf.predict(X_val)
-    rf_acc = accuracy_score(y_val, rf_pred)
-    rf_f1 = f1_score(y_val, rf_pred, average='weighted')
-    
-    models['Random Forest'] = rf
-    results['Random Forest'] = {'accuracy': rf_acc, 'f1_score': rf_f1}
-    logging.info(f"   Random Forest - Acc: {rf_acc:.4f}, F1: {rf_f1:.4f}")
     
     # 2. Gradient Boosting
-    logging.info("2. Gradient Boosting egitiliyor...")
-    gb = GradientBoostingClassifier(
+    estimators['Gradient Boosting'] = GradientBoostingClassifier(
         n_estimators=150,
         learning_rate=0.1,
         max_depth=7,
@@ -247,23 +244,13 @@ def train_individual_models(X_train, y_train, X_val, y_val, class_weights=None):
         min_samples_leaf=4,
         random_state=42
     )
-    gb.fit(X_train, y_train)
-    gb_pred = gb.predict(X_val)
-    gb_acc = accuracy_score(y_val, gb_pred)
-    gb_f1 = f1_score(y_val, gb_pred, average='weighted')
-    
-    models['Gradient Boosting'] = gb
-    results['Gradient Boosting'] = {'accuracy': gb_acc, 'f1_score': gb_f1}
-    logging.info(f"   Gradient Boosting - Acc: {gb_acc:.4f}, F1: {gb_f1:.4f}")
     
     # 3. XGBoost (eğer varsa)
     if XGBOOST_AVAILABLE:
-        logging.info("3. XGBoost egitiliyor...")
-        
         # Class weights hesapla
         scale_pos_weight = len(y_train[y_train == 0]) / len(y_train[y_train == 1]) if len(y_train[y_train == 1]) > 0 else 1
         
-        xgb = XGBClassifier(
+        estimators['XGBoost'] = XGBClassifier(
             n_estimators=150,
             learning_rate=0.1,
             max_depth=7,
@@ -275,19 +262,10 @@ def train_individual_models(X_train, y_train, X_val, y_val, class_weights=None):
             random_state=42,
             eval_metric='mlogloss'
         )
-        xgb.fit(X_train, y_train)
-        xgb_pred = xgb.predict(X_val)
-        xgb_acc = accuracy_score(y_val, xgb_pred)
-        xgb_f1 = f1_score(y_val, xgb_pred, average='weighted')
-        
-        models['XGBoost'] = xgb
-        results['XGBoost'] = {'accuracy': xgb_acc, 'f1_score': xgb_f1}
-        logging.info(f"   XGBoost - Acc: {xgb_acc:.4f}, F1: {xgb_f1:.4f}")
     
     # 4. LightGBM (eğer varsa)
     if LIGHTGBM_AVAILABLE:
-        logging.info("4. LightGBM egitiliyor...")
-        lgbm = LGBMClassifier(
+        estimators['LightGBM'] = LGBMClassifier(
             n_estimators=150,
             learning_rate=0.1,
             max_depth=7,
@@ -297,82 +275,55 @@ def train_individual_models(X_train, y_train, X_val, y_val, class_weights=None):
             random_state=42,
             verbose=-1
         )
-        lgbm.fit(X_train, y_train)
-        lgbm_pred = lgbm.predict(X_val)
-        lgbm_acc = accuracy_score(y_val, lgbm_pred)
-        lgbm_f1 = f1_score(y_val, lgbm_pred, average='weighted')
-        
-        models['LightGBM'] = lgbm
-        results['LightGBM'] = {'accuracy': lgbm_acc, 'f1_score': lgbm_f1}
-        logging.info(f"   LightGBM - Acc: {lgbm_acc:.4f}, F1: {lgbm_f1:.4f}")
     
     # 5. Logistic Regression (baseline)
-    logging.info("5. Logistic Regression egitiliyor...")
-    lr = LogisticRegression(
+    estimators['Logistic Regression'] = LogisticRegression(
         max_iter=1000,
         class_weight='balanced',
         random_state=42
     )
-    lr.fit(X_train, y_train)
-    lr_pred = lr.predict(X_val)
-    lr_acc = accuracy_score(y_val, lr_pred)
-    lr_f1 = f1_score(y_val, lr_pred, average='weighted')
     
-    models['Logistic Regression'] = lr
-    results['Logistic Regression'] = {'accuracy': lr_acc, 'f1_score': lr_f1}
-    logging.info(f"   Logistic Regression - Acc: {lr_acc:.4f}, F1: {lr_f1:.4f}")
-    
-    return models, results
+    return estimators
 
-def create_ensemble(models, X_train, y_train, X_val, y_val):
-    """Ensemble modeller oluştur"""
+def train_individual_models(X_train, y_train, X_val, y_val, class_weights=None, n_jobs=-1):
+    """Bireysel modelleri eşzamanlı eğit"""
     logging.info("=" * 60)
-    logging.info("ENSEMBLE MODELLER OLUŞTURULUYOR")
+    logging.info("BİREYSEL MODELLER EĞİTİLİYOR")
     logging.info("=" * 60)
     
-    ensemble_models = {}
-    ensemble_results = {}
-    
-    # 1. Voting Classifier (Soft Voting) - XGBoost hariç
-    logging.info("1. Voting Ensemble (Soft) olusturuluyor...")
-    
-    voting_estimators = [(name, model) for name, model in models.items() 
-                         if name not in ['Logistic Regression', 'XGBoost', 'LightGBM']]  # Sadece RF ve GB
+    estimators = base_estimators(y_train)
+    logging.info(f"{len(estimators)} model paralel egitiliyor: {', '.join(estimators)}")
+    models, timings = fit_base_models(estimators, X_train, y_train, n_jobs=n_jobs)
     
-    voting_clf = VotingClassifier(
-        estimators=voting_estimators,
-        voting='soft',
-        n_jobs=-1
-    )
-    voting_clf.fit(X_train, y_train)
-    voting_pred = voting_clf.predict(X_val)
-    voting_acc = accuracy_score(y_val, voting_pred)
-    voting_f1 = f1_score(y_val, voting_pred, average='weighted')
-    
-    ensemble_models['Voting Ensemble'] = voting_clf
-    ensemble_results['Voting Ensemble'] = {'accuracy': voting_acc, 'f1_score': voting_f1}
-    logging.info(f"   Voting Ensemble - Acc: {voting_acc:.4f}, F1: {voting_f1:.4f}")
+    results = {}
+    for name, model in models.items():
+        pred = model.predict(X_val)
+        acc = accuracy_score(y_val, pred)
+        f1 = f1_score(y_val, pred, average='weighted')
+        results[name] = {'accuracy': acc, 'f1_score': f1, 'fit_seconds': timings[name]}
+        logging.info(f"   {name} - Acc: {acc:.4f}, F1: {f1:.4f} ({timings[name]:.1f}s)")
     
-    # 2. Stacking Classifier - XGBoost hariç
-    logging.info("2. Stacking Ensemble olusturuluyor...")
+    return models, results
+
+def create_ensemble(models, X_train, y_train, X_val, y_val, n_jobs=-1):
+    """Ensemble modeller oluştur (eğitilmiş modeller + paralel OOF olasılıkları)"""
+    logging.info("=" * 60)
+    logging.info("ENSEMBLE MODELLER OLUŞTURULUYOR")
+    logging.info("=" * 60)
     
-    stacking_estimators = [(name, model) for name, model in models.items() 
-                          if name not in ['Logistic Regression', 'XGBoost', 'LightGBM']]  # Sadece RF ve GB
+    # Voting ve Stacking - XGBoost hariç, sadece RF ve GB
+    members = {name: model for name, model in models.items() if name not in ENSEMBLE_EXCLUDE}
+    logging.info(f"Voting (soft) ve Stacking olusturuluyor: {', '.join(members)}")
     
-    stacking_clf = StackingClassifier(
-        estimators=stacking_estimators,
-        final_estimator=LogisticRegression(class_weight='balanced', max_iter=1000),
-        cv=3,  # 5'ten 3'e düşürdük - daha hızlı
-        n_jobs=-1
-    )
-    stacking_clf.fit(X_train, y_train)
-    stacking_pred = stacking_clf.predict(X_val)
-    stacking_acc = accuracy_score(y_val, stacking_pred)
-    stacking_f1 = f1_score(y_val, stacking_pred, average='weighted')
+    ensemble_models, timings = build_ensembles(members, X_train, y_train, cv=3, n_jobs=n_jobs)
     
-    ensemble_models['Stacking Ensemble'] = stacking_clf
-    ensemble_results['Stacking Ensemble'] = {'accuracy': stacking_acc, 'f1_score': stacking_f1}
-    logging.info(f"   Stacking Ensemble - Acc: {stacking_acc:.4f}, F1: {stacking_f1:.4f}")
+    ensemble_results = {}
+    for name, model in ensemble_models.items():
+        pred = model.predict(X_val)
+        acc = accuracy_score(y_val, pred)
+        f1 = f1_score(y_val, pred, average='weighted')
+        ensemble_results[name] = {'accuracy': acc, 'f1_score': f1, 'fit_seconds': timings[name]}
+        logging.info(f"   {name} - Acc: {acc:.4f}, F1: {f1:.4f} ({timings[name]:.1f}s)")
     
     return ensemble_models, ensemble_results
 
@@ -464,16 +415,19 @@ def main():
     # 3. SMOTE ile dengeleme
     logging.info("\n3. ADIM: SMOTE ile Dataset Dengeleme")
     X_train_balanced, y_train_balanced = balance_dataset(X_train_scaled, y_train, method='smote')
-    
-    # 4. Bireysel modelleri eğit
-    logging.info("\n4. ADIM: Bireysel Modelleri Egitme")
-    models, individual_results = train_individual_models(X_train_balanced, y_train_balanced, 
-                                                         X_val_scaled, y_val)
-    
-    # 5. Ensemble modeller oluştur
-    logging.info("\n5. ADIM: Ensemble Modeller Olusturma")
-    ensemble_models, ensemble_results = create_ensemble(models, X_train_balanced, y_train_balanced,
-                                                        X_val_scaled, y_val)
+    y_train_balanced = np.asarray(y_train_balanced)
+    
+    # Tüm worker'lar aynı mmap matrisini okur (kopya yok); geçici dosya blok sonunda silinir
+    with shared_matrix(X_train_balanced, name='X_train_balanced') as X_shared:
+        # 4. Bireysel modelleri eğit
+        logging.info("\n4. ADIM: Bireysel Modelleri Egitme")
+        models, individual_results = train_individual_models(X_shared, y_train_balanced,
+                                                             X_val_scaled, y_val)
+        
+        # 5. Ensemble modeller oluştur
+        logging.info("\n5. ADIM: Ensemble Modeller Olusturma")
+        ensemble_models, ensemble_results = create_ensemble(models, X_shared, y_train_balanced,
+                                                            X_val_scaled, y_val)
     
     # 6. Tüm modelleri birleştir
     all_models = {**models, **ensemble_models}
@@ -547,7 +501,8 @@ def main():
     # Model'i kaydet
     import pickle
     with open('models/phase3_best_ensemble_model.pkl', 'wb') as f:
-        pickle.dump(best_model, f)
+        # Ensemble ise yalnızca sklearn/xgboost bileşenleri (bkz. ensemble_engine.export_model)
+        pickle.dump(export_model(best_model), f)
     
     with open('models/phase3_scaler.pkl', 'wb') as f:
         pickle.dump(scaler, f)
@@ -1,84 +1,185 @@
 import os
+import sys
 import glob
+import json
+import time
+import hashlib
+from functools import lru_cache
 import numpy as np
 import pandas as pd
 import rasterio  # type: ignore
-from rasterio.merge import merge  # type: ignore
 from rasterio.features import geometry_mask  # type: ignore
-import rasterio.warp  # type: ignore
-from rasterio.enums import Resampling  # type: ignore
 import geopandas as gpd  # type: ignore
 from datetime import datetime
-from scipy.stats import zscore, skew, kurtosis
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from scipy.stats import zscore
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from lake_raster.catalog import TileCatalog  # noqa: E402
+from lake_raster.datacube import Datacube  # noqa: E402
+from lake_raster.stats import StreamingStats  # noqa: E402
+from lake_raster.spectral import compute_index_values  # noqa: E402
+from lake_raster.mosaic import (  # noqa: E402
+    BLOCK_SIZE,
+    lake_window,
+    open_mosaic,
+    read_window,
+    reproject_tiles_to_grid,
+)
 
 NDWI_THRESHOLD = 0.0
 ROLLING_WINDOW = 3
 FORECAST_HORIZONS = [1, 2, 3]  # months ahead
+GDAL_CACHE_MB = 256  # per-worker GDAL block cache
+MASK_CACHE_SIZE = 32  # lake masks kept in memory per process
+STATS_BLOCK_ROWS = 512  # rows per block in calculate_metrics
+BANDS = ["B2", "B3", "B4", "B8"]
 
 
 # -----------------------
 # Functions
 # -----------------------
-def gather_dates(ndwi_dir):
+# With a TileCatalog (lake_raster.catalog) the gather_* helpers query the
+# index instead of globbing directories with tens of thousands of files.
+def gather_dates(ndwi_dir, catalog=None, lake_key=None):
+    if catalog is not None:
+        return catalog.dates(lake_key, kind="mask")
     all_files = glob.glob(os.path.join(ndwi_dir, "*_mask.tif"))
     return sorted(set(f.split(os.sep)[-1].split("_")[0] for f in all_files))
 
 
-def gather_ndwi_tiles(ndwi_dir, date_str):
+def gather_ndwi_tiles(ndwi_dir, date_str, catalog=None, lake_key=None):
+    if catalog is not None:
+        return catalog.tiles(lake_key, date_str, kind="mask")
     pattern = os.path.join(ndwi_dir, f"{date_str}_tile*_mask.tif")
     return sorted(glob.glob(pattern))
 
 
-def mosaic_raster_tiles(tiles):
-    if not tiles:
-        return None, None, None
-    srcs = [rasterio.open(fp) for fp in tiles]
-    mosaic, transform = merge(srcs)
-    crs = srcs[0].meta["crs"]
-    nodata = srcs[0].nodata
-    for s in srcs:
-        s.close()
-    arr = mosaic[0].astype(np.float32)
-    if nodata is not None:
-        arr[arr == nodata] = np.nan
-    return arr, transform, crs
-
-
-def mosaic_band_tiles(band_dir, date_str, band_name):
+def gather_band_tiles(band_dir, date_str, band_name, catalog=None, lake_key=None):
+    if catalog is not None:
+        return catalog.tiles(lake_key, date_str, kind="image", band=band_name)
     pattern = os.path.join(band_dir, f"{date_str}_tile*_image.{band_name}.tif")
-    tiles = sorted(glob.glob(pattern))
-    return mosaic_raster_tiles(tiles)
+    return sorted(glob.glob(pattern))
 
 
-def resample_band_to_ndwi(
-    band_array, band_transform, band_crs, ndwi_shape, ndwi_transform, ndwi_crs
-):
-    if band_array is None:
-        return None
-    dst_array = np.empty(ndwi_shape, dtype=np.float32)
-    rasterio.warp.reproject(
-        source=band_array,
-        destination=dst_array,
-        src_transform=band_transform,
-        src_crs=band_crs,
-        dst_transform=ndwi_transform,
-        dst_crs=ndwi_crs,
-        resampling=Resampling.bilinear,
-        dst_nodata=np.nan,
+def mosaic_raster_tiles(tiles, lake_poly=None, block_size=BLOCK_SIZE):
+    """Mosaic tiles through a VRT; with lake_poly only its bounding box is read.
+
+    Returns (float32 array with NaN nodata, window transform, crs).
+    """
+    if not tiles:
+        return None, None, None
+    with open_mosaic(tiles) as src:
+        bounds = None
+        if lake_poly is not None:
+            bounds = load_lake_geometry(lake_poly, src.crs.to_wkt()).bounds
+        window = lake_window(src, bounds)
+        arr = read_window(src, window, block_size)
+        return arr, src.window_transform(window), src.crs
+
+
+def mosaic_band_tiles(band_dir, date_str, band_name, lake_poly=None):
+    return mosaic_raster_tiles(
+        gather_band_tiles(band_dir, date_str, band_name), lake_poly=lake_poly
     )
-    return dst_array
 
 
-def rasterize_lake_mask(lake_poly_path, transform, crs, shape):
+def resample_band_to_ndwi(band_tiles, ndwi_shape, ndwi_transform, ndwi_crs):
+    # Band tiles are warped directly onto the NDWI (lake window) grid
+    return reproject_tiles_to_grid(band_tiles, ndwi_crs, ndwi_transform, ndwi_shape)
+
+
+@lru_cache(maxsize=2)
+def open_datacube(cube_path):
+    # One reader per process; zarr metadata is parsed once
+    return Datacube(cube_path)
+
+
+def read_date_from_cube(cube, date_str, lake_poly):
+    """NDWI over the lake bounding box plus B2/B3/B4/B8 on the same grid."""
+    crs = cube.crs("mask")
+    grid = cube.grid("mask")
+    bounds = load_lake_geometry(lake_poly, crs.to_wkt()).bounds
+    window = lake_window(grid, bounds)
+    ndwi = cube.read("mask", date_str, "NDWI", window)
+    transform = cube.window_transform("mask", window)
+    bands = [
+        cube.read_on_grid("image", date_str, band, crs, transform, ndwi.shape)
+        if "image" in cube.kinds() else None
+        for band in BANDS
+    ]
+    return ndwi, transform, crs, bands
+
+
+def polygon_source_signature(lake_poly_path):
+    """(name, mtime_ns, size) of the polygon file and its sidecars (.dbf, .prj, ...)"""
+    stem, _ = os.path.splitext(os.path.abspath(lake_poly_path))
+    paths = sorted(set(glob.glob(glob.escape(stem) + ".*")) | {os.path.abspath(lake_poly_path)})
+    signature = []
+    for path in paths:
+        if os.path.isfile(path):
+            st = os.stat(path)
+            signature.append((os.path.basename(path), st.st_mtime_ns, st.st_size))
+    return tuple(signature)
+
+
+def load_lake_geometry(lake_poly_path, crs_wkt):
+    return _load_lake_geometry(lake_poly_path, crs_wkt, polygon_source_signature(lake_poly_path))
+
+
+@lru_cache(maxsize=8)
+def _load_lake_geometry(lake_poly_path, crs_wkt, source_signature):
+    # Polygon is read, reprojected and unioned once per (file version, CRS)
     lake = gpd.read_file(lake_poly_path)
-    if lake.crs != crs:
-        lake = lake.to_crs(crs)
-    geom = lake.geometry.union_all()
+    if lake.crs is None or lake.crs.to_wkt() != crs_wkt:
+        lake = lake.to_crs(crs_wkt)
+    return lake.geometry.union_all()
+
+
+def _mask_cache_path(cache_dir, key):
+    digest = hashlib.sha1(repr(key).encode("utf-8")).hexdigest()[:16]
+    return os.path.join(cache_dir, f"lake_mask_{digest}.npy")
+
+
+@lru_cache(maxsize=MASK_CACHE_SIZE)
+def _cached_lake_mask(lake_poly_path, source_signature, crs_wkt, transform_coeffs, shape, cache_dir):
     H, W = shape
-    mask = ~geometry_mask([geom], transform=transform, invert=False, out_shape=(H, W))
+    # Editing the polygon changes the signature, so stale masks are not reused
+    key = (os.path.abspath(lake_poly_path), source_signature, crs_wkt, transform_coeffs, shape)
+    cache_path = _mask_cache_path(cache_dir, key) if cache_dir else None
+
+    if cache_path and os.path.exists(cache_path):
+        packed = np.load(cache_path)
+        mask = np.unpackbits(packed, count=H * W).reshape(H, W).astype(bool)
+    else:
+        geom = _load_lake_geometry(lake_poly_path, crs_wkt, source_signature)
+        transform = rasterio.Affine(*transform_coeffs)
+        mask = ~geometry_mask([geom], transform=transform, invert=False, out_shape=(H, W))
+        if cache_path:
+            os.makedirs(cache_dir, exist_ok=True)
+            # Bit-packed: 1 bit per pixel instead of 1 byte
+            tmp_path = cache_path + ".tmp.npy"
+            np.save(tmp_path, np.packbits(mask, axis=None))
+            os.replace(tmp_path, cache_path)
+
+    # Shared between dates; callers must not modify it
+    mask.setflags(write=False)
     return mask
 
 
+def rasterize_lake_mask(lake_poly_path, transform, crs, shape, cache_dir=None):
+    """Boolean lake mask on the given grid, memoized by (polygon, CRS, transform, shape).
+
+    The mosaic grid rarely changes between dates, so the mask is computed
+    once and reused. With cache_dir it is also persisted as a bit-packed
+    .npy, shared by worker processes and later runs.
+    """
+    crs_wkt = crs.to_wkt() if hasattr(crs, "to_wkt") else str(crs)
+    return _cached_lake_mask(
+        lake_poly_path, polygon_source_signature(lake_poly_path), crs_wkt, tuple(transform)[:6], tuple(shape), cache_dir
+    )
+
+
 def get_season(month):
     if month in [12, 1, 2]:
         return "Winter"
@@ -106,12 +207,27 @@ def calculate_metrics(
 ):
     if ndwi is None:
         return None
-    valid = lake_mask & np.isfinite(ndwi)
-    water = valid & (ndwi > ndwi_threshold)
+
+    # Single pass over row blocks into streaming accumulators; no per-statistic
+    # copies of the masked pixels
+    H, W = ndwi.shape
+    ndwi_stats = StreamingStats(thresholds=(0.1, 0.2, 0.3))
+    bands = {"b2": b2, "b3": b3, "b4": b4, "b8": b8}
+    band_stats = {name: StreamingStats() for name, arr in bands.items() if arr is not None}
+    water_pixels = 0
+    for row in range(0, H, STATS_BLOCK_ROWS):
+        rows = slice(row, row + STATS_BLOCK_ROWS)
+        valid = lake_mask[rows] & np.isfinite(ndwi[rows])
+        ndwi_vals = ndwi[rows][valid]
+        ndwi_stats.update(ndwi_vals)
+        water_pixels += int(np.count_nonzero(ndwi_vals > ndwi_threshold))
+        for name, stats in band_stats.items():
+            # Non-finite band pixels are skipped by the accumulator
+            stats.update(bands[name][:H, :W][rows][valid])
+
     pixel_area_m2 = abs(transform.a * -transform.e)
     total_lake_pixels = int(lake_mask.sum())
-    valid_pixels = int(valid.sum())
-    water_pixels = int(water.sum())
+    valid_pixels = ndwi_stats.n
 
     valid_ratio = valid_pixels / total_lake_pixels if total_lake_pixels > 0 else 0.0
     cloud_pct = max(0.0, 1.0 - valid_ratio) * 100.0
@@ -138,21 +254,22 @@ def calculate_metrics(
     }
 
     if valid_pixels:
+        summary = ndwi_stats.summary(percentiles=(25, 50, 75))
         metrics.update(
             {
-                "ndwi_mean": float(np.nanmean(ndwi[valid])),
-                "ndwi_std": float(np.nanstd(ndwi[valid])),
-                "ndwi_var": float(np.nanvar(ndwi[valid])),
-                "ndwi_min": float(np.nanmin(ndwi[valid])),
-                "ndwi_max": float(np.nanmax(ndwi[valid])),
-                "ndwi_p25": float(np.nanpercentile(ndwi[valid], 25)),
-                "ndwi_p50": float(np.nanpercentile(ndwi[valid], 50)),
-                "ndwi_p75": float(np.nanpercentile(ndwi[valid], 75)),
-                "ndwi_skew": float(skew(ndwi[valid])),
-                "ndwi_kurtosis": float(kurtosis(ndwi[valid])),
-                "ndwi_gt_0.1": int((ndwi[valid] > 0.1).sum()),
-                "ndwi_gt_0.2": int((ndwi[valid] > 0.2).sum()),
-                "ndwi_gt_0.3": int((ndwi[valid] > 0.3).sum()),
+                "ndwi_mean": summary["mean"],
+                "ndwi_std": summary["std"],
+                "ndwi_var": summary["var"],
+                "ndwi_min": summary["min"],
+                "ndwi_max": summary["max"],
+                "ndwi_p25": summary["p25"],
+                "ndwi_p50": summary["p50"],
+                "ndwi_p75": summary["p75"],
+                "ndwi_skew": summary["skew"],
+                "ndwi_kurtosis": summary["kurtosis"],
+                "ndwi_gt_0.1": ndwi_stats.count_gt[0.1],
+                "ndwi_gt_0.2": ndwi_stats.count_gt[0.2],
+                "ndwi_gt_0.3": ndwi_stats.count_gt[0.3],
             }
         )
     else:
@@ -174,29 +291,23 @@ def calculate_metrics(
             metrics[key] = np.nan
 
     # Band stats and ratios
-    for band_name, band_array in zip(["b2", "b3", "b4", "b8"], [b2, b3, b4, b8]):
-        if band_array is not None:
-            band_array = band_array[: ndwi.shape[0], : ndwi.shape[1]]
-            band_valid_mask = valid & np.isfinite(band_array)
-            if np.any(band_valid_mask):
-                band_vals = band_array[band_valid_mask]
-                metrics[f"{band_name}_mean"] = float(np.nanmean(band_vals))
-                metrics[f"{band_name}_std"] = float(np.nanstd(band_vals))
-                metrics[f"{band_name}_min"] = float(np.nanmin(band_vals))
-                metrics[f"{band_name}_max"] = float(np.nanmax(band_vals))
-            else:
-                for stat in ["mean", "std", "min", "max"]:
-                    metrics[f"{band_name}_{stat}"] = np.nan
+    for band_name in ["b2", "b3", "b4", "b8"]:
+        stats = band_stats.get(band_name)
+        if stats is not None and stats.n:
+            metrics[f"{band_name}_mean"] = float(stats.mean)
+            metrics[f"{band_name}_std"] = stats.std
+            metrics[f"{band_name}_min"] = stats.min
+            metrics[f"{band_name}_max"] = stats.max
         else:
             for stat in ["mean", "std", "min", "max"]:
                 metrics[f"{band_name}_{stat}"] = np.nan
 
     # Band ratios
-    metrics["b3_b2_ratio"] = (
-        metrics["b3_mean"] / metrics["b2_mean"] if metrics["b2_mean"] else np.nan
-    )
-    metrics["b4_b8_ratio"] = (
-        metrics["b4_mean"] / metrics["b8_mean"] if metrics["b8_mean"] else np.nan
+    metrics.update(
+        compute_index_values(
+            {b: metrics[f"{b}_mean"] for b in ["b2", "b3", "b4", "b8"]},
+            ["b3_b2_ratio", "b4_b8_ratio"],
+        )
     )
 
     return metrics
@@ -217,50 +328,222 @@ def add_date_aware_forecast_targets(df, horizons=[1, 2, 3]):
     return df
 
 
-def process_all_dates(ndwi_dir, band_dir, lake_poly, lake_id):
-    dates = gather_dates(ndwi_dir)
-    max_tiles = max(
-        len(gather_ndwi_tiles(ndwi_dir, d))
-        for d in dates
-        if gather_ndwi_tiles(ndwi_dir, d)
+def process_single_date(
+    date_str, ndwi_tiles, band_tiles, lake_poly, lake_id, max_tiles, mask_cache_dir=None,
+    cube_path=None,
+):
+    # band_tiles: {"B2": [paths], ...}, resolved by the caller
+    if cube_path:
+        ndwi, transform, crs, (b2, b3, b4, b8) = read_date_from_cube(
+            open_datacube(cube_path), date_str, lake_poly
+        )
+    else:
+        # Only the lake bounding box of the NDWI mosaic is read; pixels outside
+        # it are never inside the lake mask, so the metrics are unchanged
+        ndwi, transform, crs = mosaic_raster_tiles(ndwi_tiles, lake_poly=lake_poly)
+        b2, b3, b4, b8 = (
+            resample_band_to_ndwi(band_tiles.get(band), ndwi.shape, transform, crs)
+            for band in BANDS
+        )
+
+    lake_mask = rasterize_lake_mask(
+        lake_poly, transform, crs, ndwi.shape, cache_dir=mask_cache_dir
+    )
+
+    return calculate_metrics(
+        ndwi,
+        lake_mask,
+        lake_id,
+        date_str,
+        transform,
+        len(ndwi_tiles),
+        max_tiles,
+        b2,
+        b3,
+        b4,
+        b8,
     )
-    all_records = []
 
+
+def _process_date_task(
+    date_str, ndwi_tiles, band_tiles, lake_poly, lake_id, max_tiles, gdal_cache_mb,
+    mask_cache_dir=None, cube_path=None,
+):
+    # Worker entry point: GDAL cache is capped per process so N workers
+    # don't each grab GDAL's default (5% of RAM)
+    start = time.perf_counter()
+    with rasterio.Env(GDAL_CACHEMAX=gdal_cache_mb):
+        metrics = process_single_date(
+            date_str, ndwi_tiles, band_tiles, lake_poly, lake_id, max_tiles,
+            mask_cache_dir=mask_cache_dir, cube_path=cube_path,
+        )
+    return date_str, metrics, time.perf_counter() - start
+
+
+def load_checkpoint(checkpoint_path):
+    """Read already processed per-date metrics (JSON lines) keyed by date string."""
+    done = {}
+    if checkpoint_path and os.path.exists(checkpoint_path):
+        with open(checkpoint_path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                record = json.loads(line)
+                record["date"] = datetime.fromisoformat(record["date"])
+                done[record["date"].strftime("%Y%m%d")] = record
+    return done
+
+
+def append_checkpoint(checkpoint_path, metrics):
+    if not checkpoint_path:
+        return
+    record = dict(metrics, date=metrics["date"].isoformat())
+    with open(checkpoint_path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(record, default=float) + "\n")
+
+
+def append_failure(checkpoint_path, date_str, error):
+    """Log a failed date next to the checkpoint; it is retried on the next run."""
+    if not checkpoint_path:
+        return
+    record = {"date": date_str, "error": f"{type(error).__name__}: {error}",
+              "failed_at": datetime.now().isoformat()}
+    with open(checkpoint_path + ".failed", "a", encoding="utf-8") as f:
+        f.write(json.dumps(record) + "\n")
+
+
+def compute_date_records(
+    ndwi_dir,
+    band_dir,
+    lake_poly,
+    lake_id,
+    workers=None,
+    checkpoint_path=None,
+    gdal_cache_mb=GDAL_CACHE_MB,
+    mask_cache_dir=None,
+    catalog=None,
+    lake_key=None,
+    cube_path=None,
+):
+    """Per-date raster metrics, spread over a process pool.
+
+    Dates are independent, so each one is a separate task. Results are
+    returned in date order regardless of completion order. With a
+    checkpoint_path every finished date is appended to a JSON-lines file
+    and skipped on the next run. A date that raises is logged (and written
+    to <checkpoint_path>.failed) without stopping the others; it is left
+    out of the result and retried on the next run. Tile lists are resolved here (from the
+    catalog when given) so workers never scan directories. With cube_path
+    everything is read from the lake datacube instead of per-tile files.
+    """
+    if cube_path:
+        cube = open_datacube(cube_path)
+        dates = cube.dates("mask")
+        tiles_by_date = {d: cube.tiles("mask", d) for d in dates}
+    else:
+        dates = gather_dates(ndwi_dir, catalog, lake_key)
+        tiles_by_date = {d: gather_ndwi_tiles(ndwi_dir, d, catalog, lake_key) for d in dates}
+    max_tiles = max((len(t) for t in tiles_by_date.values() if t), default=0)
+
+    records = load_checkpoint(checkpoint_path)
+    if records:
+        print(f"[RESUME] {len(records)} dates loaded from {checkpoint_path}")
+
+    pending = []
     for date_str in dates:
-        ndwi_tiles = gather_ndwi_tiles(ndwi_dir, date_str)
-        num_tiles = len(ndwi_tiles)
-        if num_tiles == 0:
+        if not tiles_by_date[date_str]:
             print(f"[SKIP] No tiles for date {date_str}")
-            continue
-
-        ndwi, transform, crs = mosaic_raster_tiles(ndwi_tiles)
-        lake_mask = rasterize_lake_mask(lake_poly, transform, crs, ndwi.shape)
-
-        b2, b2_t, b2_crs = mosaic_band_tiles(band_dir, date_str, "B2")
-        b3, b3_t, b3_crs = mosaic_band_tiles(band_dir, date_str, "B3")
-        b4, b4_t, b4_crs = mosaic_band_tiles(band_dir, date_str, "B4")
-        b8, b8_t, b8_crs = mosaic_band_tiles(band_dir, date_str, "B8")
-
-        b2 = resample_band_to_ndwi(b2, b2_t, b2_crs, ndwi.shape, transform, crs)
-        b3 = resample_band_to_ndwi(b3, b3_t, b3_crs, ndwi.shape, transform, crs)
-        b4 = resample_band_to_ndwi(b4, b4_t, b4_crs, ndwi.shape, transform, crs)
-        b8 = resample_band_to_ndwi(b8, b8_t, b8_crs, ndwi.shape, transform, crs)
-
-        metrics = calculate_metrics(
-            ndwi,
-            lake_mask,
-            lake_id,
-            date_str,
-            transform,
-            num_tiles,
-            max_tiles,
-            b2,
-            b3,
-            b4,
-            b8,
+        elif date_str not in records:
+            pending.append(date_str)
+
+    workers = workers or os.cpu_count() or 1
+    total = len(pending)
+    start = time.perf_counter()
+
+    def report(done, date_str, elapsed):
+        rate = done / max(time.perf_counter() - start, 1e-9)
+        eta = (total - done) / rate if rate > 0 else float("nan")
+        print(
+            f"[DONE] {date_str} ({done}/{total}) {elapsed:.1f}s | "
+            f"{rate * 60:.1f} dates/min | ETA {eta / 60:.1f} min"
         )
-        all_records.append(metrics)
-        print(f"[DONE] {date_str}")
+
+    def task_args(date_str):
+        band_tiles = {} if cube_path else {
+            band: gather_band_tiles(band_dir, date_str, band, catalog, lake_key)
+            for band in BANDS
+        }
+        return (date_str, tiles_by_date[date_str], band_tiles, lake_poly, lake_id,
+                max_tiles, gdal_cache_mb, mask_cache_dir, cube_path)
+
+    failed = {}
+
+    def fail(done, date_str, error):
+        failed[date_str] = error
+        append_failure(checkpoint_path, date_str, error)
+        print(f"[ERROR] {date_str} ({done}/{total}): {type(error).__name__}: {error}")
+
+    if workers == 1 or total <= 1:
+        for i, date_str in enumerate(pending, 1):
+            try:
+                _, metrics, elapsed = _process_date_task(*task_args(date_str))
+            except Exception as e:
+                fail(i, date_str, e)
+                continue
+            records[date_str] = metrics
+            append_checkpoint(checkpoint_path, metrics)
+            report(i, date_str, elapsed)
+    else:
+        print(f"[INFO] {total} dates on {workers} worker processes")
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(_process_date_task, *task_args(d)): d for d in pending}
+            for i, future in enumerate(as_completed(futures), 1):
+                try:
+                    date_str, metrics, elapsed = future.result()
+                except Exception as e:
+                    fail(i, futures[future], e)
+                    continue
+                records[date_str] = metrics
+                append_checkpoint(checkpoint_path, metrics)
+                report(i, date_str, elapsed)
+
+    if total:
+        wall = time.perf_counter() - start
+        print(f"[INFO] {total} dates in {wall:.1f}s ({total / wall:.2f} dates/s)")
+    if failed:
+        print(f"[WARN] {len(failed)} dates failed and will be retried on the next run: "
+              f"{', '.join(sorted(failed))}")
+
+    return [records[d] for d in dates if d in records]
+
+
+def process_all_dates(
+    ndwi_dir,
+    band_dir,
+    lake_poly,
+    lake_id,
+    workers=None,
+    checkpoint_path=None,
+    gdal_cache_mb=GDAL_CACHE_MB,
+    mask_cache_dir=None,
+    catalog=None,
+    lake_key=None,
+    cube_path=None,
+):
+    all_records = compute_date_records(
+        ndwi_dir,
+        band_dir,
+        lake_poly,
+        lake_id,
+        workers=workers,
+        checkpoint_path=checkpoint_path,
+        gdal_cache_mb=gdal_cache_mb,
+        mask_cache_dir=mask_cache_dir,
+        catalog=catalog,
+        lake_key=lake_key,
+        cube_path=cube_path,
+    )
 
     df = pd.DataFrame(all_records).sort_values("date").reset_index(drop=True)
     df["gap_days_since_last_obs"] = df["date"].diff().dt.days.fillna(0)
@@ -300,10 +583,39 @@ if __name__ == "__main__":
     BAND_DIR = r"C:\Users\glylm\Desktop\proje_aqua\van\data\gol_van\images"
     LAKE_POLY = r"C:\Users\glylm\Desktop\proje_aqua\water_quantity\lake_van_export.geojson"
     OUT_PATH = r"C:\Users\glylm\Desktop\proje_aqua\water_quantity\output"
+    WORKERS = int(os.getenv("NUM_WORKERS", os.cpu_count() or 1))
+    CHECKPOINT = os.path.join(OUT_PATH, f"lake_{LAKE_ID}_dates.checkpoint.jsonl")
+    MASK_CACHE_DIR = os.path.join(OUT_PATH, "mask_cache")
+    CATALOG_PATH = os.path.join(OUT_PATH, "tile_catalog.sqlite")
+    LAKE_KEY = "gol_van"
+    # Built with: python -m lake_raster.datacube <lake dir> --lake gol_van --out ...
+    DATACUBE_PATH = os.path.join(OUT_PATH, f"{LAKE_KEY}.zarr")
 
     os.makedirs(OUT_PATH, exist_ok=True)
 
-    df = process_all_dates(NDWI_DIR, BAND_DIR, LAKE_POLY, LAKE_ID)
+    # Incremental: only files added/changed since the last run are stat'ed
+    catalog = TileCatalog(CATALOG_PATH)
+    cube_path = DATACUBE_PATH if os.path.exists(DATACUBE_PATH) else None
+    if cube_path:
+        print(f"[CUBE] Reading rasters from {cube_path}")
+    else:
+        for root in (NDWI_DIR, BAND_DIR):
+            added, removed = catalog.update(root, lake=LAKE_KEY)
+            print(f"[CATALOG] {root}: +{added} / -{removed}")
+
+    df = process_all_dates(
+        NDWI_DIR,
+        BAND_DIR,
+        LAKE_POLY,
+        LAKE_ID,
+        workers=WORKERS,
+        checkpoint_path=CHECKPOINT,
+        mask_cache_dir=MASK_CACHE_DIR,
+        catalog=catalog,
+        lake_key=LAKE_KEY,
+        cube_path=cube_path,
+    )
+    catalog.close()
     df["lake_name"] = "Van Gölü"
 
     # Eksik veri özeti
@@ -12,6 +12,7 @@ from sklearn.ensemble import RandomForestClassifier
 from sklearn.metrics import classification_report, confusion_matrix
 from sklearn.preprocessing import StandardScaler, LabelEncoder
 from sklearn.model_selection import cross_val_score
+from backtest import walk_forward_folds, describe_folds, leakage_check
 import warnings
 warnings.filterwarnings('ignore')
 
@@ -105,39 +106,31 @@ def investigate_data_leakage():
     
     # 5. SINGLE FEATURE PERFORMANCE
     print("\n" + "=" * 60)
-    print("5. SINGLE FEATURE PERFORMANCE")
+    print("5. SINGLE FEATURE PERFORMANCE (walk-forward)")
     print("=" * 60)
     
-    single_feature_results = {}
+    # Tüm veri tarih sırasıyla göl farkında fold'lara bölünür; her feature
+    # tek başına, fold'lar paralel eğitilir (fold matrisleri bir kez ölçeklenir).
+    # train_acc: fold içi, val_acc: fold dışı ortalama, test_acc: en son fold
+    all_df = pd.concat([train_df, val_df, test_df], ignore_index=True)
+    folds = walk_forward_folds(all_df['date'], all_df['lake_name'], n_folds=5)
+    print(describe_folds(folds).to_string(index=False))
     
-    for feature in feature_cols:
-        # Sadece bu feature ile model eğit
-        X_single = train_df[[feature]]
-        X_val_single = val_df[[feature]]
-        X_test_single = test_df[[feature]]
-        
-        # Normalize
-        scaler = StandardScaler()
-        X_single_scaled = scaler.fit_transform(X_single)
-        X_val_single_scaled = scaler.transform(X_val_single)
-        X_test_single_scaled = scaler.transform(X_test_single)
-        
-        # Model eğit
-        rf_single = RandomForestClassifier(n_estimators=50, random_state=42)
-        rf_single.fit(X_single_scaled, y_train)
-        
-        # Performance
-        train_acc = rf_single.score(X_single_scaled, y_train)
-        val_acc = rf_single.score(X_val_single_scaled, val_df['quality_label'])
-        test_acc = rf_single.score(X_test_single_scaled, test_df['quality_label'])
-        
-        single_feature_results[feature] = {
-            'train_acc': train_acc,
-            'val_acc': val_acc,
-            'test_acc': test_acc
+    checks = leakage_check(
+        RandomForestClassifier(n_estimators=50, random_state=42),
+        all_df[feature_cols].to_numpy(dtype=np.float64), all_df['quality_label'].to_numpy(),
+        folds, feature_cols, task='classification', scaler=StandardScaler()
+    )
+    
+    single_feature_results = {}
+    for row in checks.itertuples(index=False):
+        single_feature_results[row.feature] = {
+            'train_acc': row.train_score,
+            'val_acc': row.oof_score,
+            'test_acc': row.last_fold_score
         }
-        
-        print(f"{feature:20s}: Train={train_acc:.4f}, Val={val_acc:.4f}, Test={test_acc:.4f}")
+        print(f"{row.feature:20s}: Train={row.train_score:.4f}, Val={row.oof_score:.4f}, "
+              f"Test={row.last_fold_score:.4f} ({row.seconds:.1f}s)")
     
     # 6. SUSPICIOUS FEATURES
     print("\n" + "=" * 60)
@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+"""
+PARALEL ENSEMBLE MOTORU
+comprehensive_phase3_ensemble.py için paylaşımlı matrisler, SMOTE önbelleği,
+paralel temel modeller ve out-of-fold tabanlı voting/stacking
+
+comprehensive_phase3_ensemble.py temel modelleri (RF, GB, XGBoost, ...) sırayla
+eğitiyor, ardından VotingClassifier ve StackingClassifier aynı modelleri
+yeniden fit ediyordu; SMOTE her çalıştırmada baştan hesaplanıyordu. Burada:
+
+- Dengelenmiş train matrisi bir kez geçici klasöre (.npy) yazılıp mmap ile
+  açılır; joblib worker'ları matrisi kopyalamadan aynı sayfalardan okur.
+  Klasör shared_matrix bloğundan çıkınca silinir.
+- SMOTE çıktısı girdinin (X, y, yöntem) parmak iziyle önbelleğe alınır.
+- Temel modeller joblib ile eşzamanlı eğitilir; CPU thread'leri modeller
+  arasında bölünür.
+- Out-of-fold olasılıkları (model x fold) paralel hesaplanır. Stacking meta
+  modeli bu OOF olasılıklarıyla eğitilir (StackingClassifier ile aynı
+  şema); soft voting zaten eğitilmiş modellerin olasılık ortalamasıdır,
+  yeniden fit yoktur.
+- Ensemble'lar export_model ile yalnızca sklearn/xgboost bileşenlerinden
+  oluşan bir sözlük olarak kaydedilir; pickle'ı açmak için bu modül
+  gerekmez (load_model ile yeniden ensemble nesnesine çevrilebilir).
+"""
+
+import hashlib
+import os
+import shutil
+import tempfile
+import time
+from contextlib import contextmanager
+
+import numpy as np
+from joblib import Parallel, delayed
+from sklearn.base import clone
+from sklearn.linear_model import LogisticRegression
+from sklearn.model_selection import StratifiedKFold
+
+SMOTE_CACHE_DIR = 'data/smote_cache'
+
+
+def fingerprint(*arrays, extra=''):
+    """Dizilerin içerik özeti (önbellek anahtarı)"""
+    digest = hashlib.sha1()
+    for arr in arrays:
+        arr = np.ascontiguousarray(arr)
+        digest.update(str((arr.dtype.str, arr.shape)).encode('utf-8'))
+        digest.update(arr.tobytes())
+    digest.update(str(extra).encode('utf-8'))
+    return digest.hexdigest()[:16]
+
+
+def cached_resample(sampler, X, y, key, cache_dir=SMOTE_CACHE_DIR):
+    """sampler.fit_resample sonucunu parmak iziyle önbelleğe al -> (X, y, önbellekten mi)"""
+    path = None
+    if cache_dir:
+        path = os.path.join(cache_dir, f'{fingerprint(X, y, extra=key)}.npz')
+        if os.path.exists(path):
+            with np.load(path) as data:
+                return data['X'], data['y'], True
+    X_res, y_res = sampler.fit_resample(X, y)
+    if path:
+        os.makedirs(cache_dir, exist_ok=True)
+        np.savez(path, X=X_res, y=y_res)
+    return X_res, y_res, False
+
+
+@contextmanager
+def shared_matrix(arr, name='X'):
+    """Diziyi geçici .npy olarak yaz, blok boyunca salt okunur mmap ver
+
+    joblib np.memmap'i worker'lara dosya referansı olarak geçirir; tüm
+    worker'lar aynı sayfa önbelleğini paylaşır. Çıkışta dosya silinir.
+    """
+    folder = tempfile.mkdtemp(prefix='ensemble_')
+    try:
+        path = os.path.join(folder, f'{name}.npy')
+        np.save(path, np.ascontiguousarray(arr))
+        yield np.load(path, mmap_mode='r')
+    finally:
+        shutil.rmtree(folder, ignore_errors=True)
+
+
+def split_threads(n_jobs, total_threads=None):
+    """Toplam CPU thread'lerini eşzamanlı modellere böl"""
+    total_threads = total_threads or os.cpu_count() or 1
+    return max(1, total_threads // max(1, n_jobs))
+
+
+def _with_threads(estimator, threads):
+    if 'n_jobs' in estimator.get_params():
+        estimator = clone(estimator).set_params(n_jobs=threads)
+    return estimator
+
+
+def _n_workers(n_tasks, n_jobs):
+    return min(n_tasks, n_jobs if n_jobs > 0 else n_tasks) or 1
+
+
+# ---------------------------------------------------------------------------
+# Temel modeller
+# ---------------------------------------------------------------------------
+
+def _fit(name, estimator, X, y):
+    start = time.perf_counter()
+    model = clone(estimator).fit(X, y)
+    return name, model, time.perf_counter() - start
+
+
+def fit_base_models(estimators, X, y, n_jobs=-1, total_threads=None):
+    """Modelleri eşzamanlı eğit -> ({ad: model}, {ad: saniye})"""
+    workers = _n_workers(len(estimators), n_jobs)
+    threads = split_threads(workers, total_threads)
+    outputs = Parallel(n_jobs=workers)(
+        delayed(_fit)(name, _with_threads(est, threads), X, y) for name, est in estimators.items()
+    )
+    models = {name: model for name, model, _ in outputs}
+    timings = {name: seconds for name, _, seconds in outputs}
+    return models, timings
+
+
+# ---------------------------------------------------------------------------
+# Out-of-fold olasılıklar
+# ---------------------------------------------------------------------------
+
+def _fold_proba(name, estimator, X, y, train_idx, test_idx):
+    start = time.perf_counter()
+    model = clone(estimator).fit(X[train_idx], y[train_idx])
+    return name, test_idx, model.classes_, model.predict_proba(X[test_idx]), time.perf_counter() - start
+
+
+def out_of_fold_proba(estimators, X, y, cv=3, n_jobs=-1, total_threads=None):
+    """Model x fold işlerini paralel çalıştır -> ({ad: OOF olasılıkları}, {ad: saniye})
+
+    Fold'lar StackingClassifier(cv=3) ile aynıdır: karıştırmasız StratifiedKFold.
+    """
+    folds = list(StratifiedKFold(n_splits=cv).split(X, y))
+    classes = np.unique(y)
+    tasks = [(name, est, tr, te) for name, est in estimators.items() for tr, te in folds]
+    workers = _n_workers(len(tasks), n_jobs)
+    threads = split_threads(workers, total_threads)
+    outputs = Parallel(n_jobs=workers)(
+        delayed(_fold_proba)(name, _with_threads(est, threads), X, y, tr, te) for name, est, tr, te in tasks
+    )
+    oof = {name: np.zeros((len(y), len(classes))) for name in estimators}
+    timings = dict.fromkeys(estimators, 0.0)
+    for name, test_idx, fold_classes, proba, seconds in outputs:
+        # Fold'da eksik sınıf varsa sütunları genel sınıf sırasına hizala
+        oof[name][np.ix_(test_idx, np.searchsorted(classes, fold_classes))] = proba
+        timings[name] += seconds
+    return oof, timings
+
+
+# ---------------------------------------------------------------------------
+# Ensemble'lar
+# ---------------------------------------------------------------------------
+
+class SoftVotingEnsemble:
+    """Eğitilmiş modellerin olasılık ortalaması (VotingClassifier(voting='soft'))"""
+
+    def __init__(self, models):
+        self.models = dict(models)
+        self.classes_ = next(iter(self.models.values())).classes_
+
+    def predict_proba(self, X):
+        return np.mean([m.predict_proba(X) for m in self.models.values()], axis=0)
+
+    def predict(self, X):
+        return self.classes_[np.argmax(self.predict_proba(X), axis=1)]
+
+
+class StackingEnsemble:
+    """OOF olasılıklarıyla eğitilmiş meta model (StackingClassifier ile aynı şema)"""
+
+    def __init__(self, models, final_estimator=None):
+        self.models = dict(models)
+        self.final_estimator = final_estimator or LogisticRegression(class_weight='balanced', max_iter=1000)
+        self.classes_ = next(iter(self.models.values())).classes_
+
+    def fit_meta(self, oof, y):
+        meta_X = np.hstack([oof[name] for name in self.models])
+        self.final_estimator.fit(meta_X, y)
+        return self
+
+    def predict_proba(self, X):
+        meta_X = np.hstack([m.predict_proba(X) for m in self.models.values()])
+        return self.final_estimator.predict_proba(meta_X)
+
+    def predict(self, X):
+        meta_X = np.hstack([m.predict_proba(X) for m in self.models.values()])
+        return self.final_estimator.predict(meta_X)
+
+
+def build_ensembles(models, X, y, cv=3, n_jobs=-1, final_estimator=None):
+    """Tüm train üzerinde eğitilmiş modellerden voting ve stacking -> ({ad: ensemble}, {ad: saniye})
+
+    OOF fold'ları modellerin fit edilmemiş kopyalarıyla (clone) eğitilir.
+    """
+    start = time.perf_counter()
+    oof, oof_timings = out_of_fold_proba(models, X, y, cv=cv, n_jobs=n_jobs)
+    stacking = StackingEnsemble(models, final_estimator).fit_meta(oof, y)
+    timings = {f'oof_{name}': seconds for name, seconds in oof_timings.items()}
+    timings['Stacking Ensemble'] = time.perf_counter() - start
+    timings['Voting Ensemble'] = 0.0
+    return {'Voting Ensemble': SoftVotingEnsemble(models), 'Stacking Ensemble': stacking}, timings
+
+
+# ---------------------------------------------------------------------------
+# Kaydetme
+# ---------------------------------------------------------------------------
+
+def export_model(model):
+    """Pickle'lanacak nesne: ensemble ise yalnızca kütüphane bileşenlerinden sözlük
+
+    {'ensemble': 'soft_voting' | 'stacking', 'classes': [...],
+     'models': {ad: eğitilmiş model}, 'final_estimator': meta model (stacking)}
+
+    Tahmin: soft_voting için models'in predict_proba ortalamasının argmax'ı;
+    stacking için models'in predict_proba'ları (sırayla) yan yana birleştirilip
+    final_estimator.predict. Diğer modeller olduğu gibi döner.
+    """
+    if isinstance(model, SoftVotingEnsemble):
+        return {'ensemble': 'soft_voting', 'classes': model.classes_, 'models': model.models}
+    if isinstance(model, StackingEnsemble):
+        return {'ensemble': 'stacking', 'classes': model.classes_, 'models': model.models,
+                'final_estimator': model.final_estimator}
+    return model
+
+
+def load_model(path):
+    """export_model ile kaydedilmiş pickle'ı tahmin yapabilen nesneye çevir"""
+    import pickle
+
+    with open(path, 'rb') as f:
+        obj = pickle.load(f)
+    if not isinstance(obj, dict) or 'ensemble' not in obj:
+        return obj
+    if obj['ensemble'] == 'soft_voting':
+        return SoftVotingEnsemble(obj['models'])
+    return StackingEnsemble(obj['models'], obj['final_estimator'])
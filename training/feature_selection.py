@@ -8,17 +8,32 @@ import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
 import seaborn as sns
-from sklearn.ensemble import RandomForestClassifier, RandomForestRegressor
-from sklearn.feature_selection import (
-    SelectKBest, f_classif, f_regression, mutual_info_classif, mutual_info_regression,
-    RFE, SelectFromModel
-)
-from sklearn.preprocessing import StandardScaler, LabelEncoder
-from sklearn.metrics import classification_report, mean_squared_error, r2_score
-from sklearn.model_selection import cross_val_score
+import json
+import time
+from sklearn.preprocessing import LabelEncoder
+from selection_engine import ScaledMatrices, run_selectors, evaluate_feature_sets, print_timings
 import warnings
 warnings.filterwarnings('ignore')
 
+# RFE: her turda fazlalığın %30'u elenir; train'den ayrılan %20'lik dilimdeki
+# skor 3 tur iyileşmezse durur (sonuç 5'ten fazla feature içerebilir)
+RFE_FRACTION = 0.3
+RFE_PATIENCE = 3
+RFE_HOLDOUT = 0.2
+TIMINGS_PATH = 'data/feature_selection_timings.json'
+
+
+def save_timings(name, timings):
+    """Yöntem/aday sürelerini data/feature_selection_timings.json'a ekle"""
+    try:
+        with open(TIMINGS_PATH, 'r', encoding='utf-8') as f:
+            all_timings = json.load(f)
+    except (OSError, ValueError):
+        all_timings = {}
+    all_timings[name] = timings
+    with open(TIMINGS_PATH, 'w', encoding='utf-8') as f:
+        json.dump(all_timings, f, indent=2)
+
 def feature_selection_water_quality():
     """Su kalitesi için feature selection"""
     print("=" * 60)
@@ -56,29 +71,27 @@ def feature_selection_water_quality():
     y_val_encoded = le.transform(y_val)
     y_test_encoded = le.transform(y_test)
     
-    # Normalize
-    scaler = StandardScaler()
-    X_train_scaled = scaler.fit_transform(X_train)
-    X_val_scaled = scaler.transform(X_val)
-    X_test_scaled = scaler.transform(X_test)
+    # Normalize (bir kez, tüm yöntemler paylaşır)
+    total_start = time.perf_counter()
+    data = ScaledMatrices(X_train, y_train_encoded, X_val, y_val_encoded, X_test, y_test_encoded,
+                          feature_cols, 'classification')
     
     print(f"Original features: {len(feature_cols)}")
     print(f"Features: {feature_cols}")
     
+    # Tüm seçiciler paralel
+    selector_results, timings = run_selectors(
+        data, ('f_score', 'mi_score', 'rf_importance', 'rfe', 'select_from_model'),
+        n_select=5, fraction=RFE_FRACTION, patience=RFE_PATIENCE, holdout=RFE_HOLDOUT
+    )
+    
     # 1. UNIVARIATE FEATURE SELECTION
     print("\n" + "=" * 60)
     print("1. UNIVARIATE FEATURE SELECTION")
     print("=" * 60)
     
-    # F-score
-    f_selector = SelectKBest(score_func=f_classif, k='all')
-    f_selector.fit(X_train_scaled, y_train_encoded)
-    f_scores = f_selector.scores_
-    
-    # Mutual Information
-    mi_selector = SelectKBest(score_func=mutual_info_classif, k='all')
-    mi_selector.fit(X_train_scaled, y_train_encoded)
-    mi_scores = mi_selector.scores_
+    f_scores = selector_results['f_score']
+    mi_scores = selector_results['mi_score']
     
     # Feature importance DataFrame
     feature_importance_df = pd.DataFrame({
@@ -102,13 +115,9 @@ def feature_selection_water_quality():
     print("2. RECURSIVE FEATURE ELIMINATION")
     print("=" * 60)
     
-    # RFE with Random Forest
-    rf_rfe = RandomForestClassifier(n_estimators=100, random_state=42)
-    rfe_selector = RFE(estimator=rf_rfe, n_features_to_select=5, step=1)
-    rfe_selector.fit(X_train_scaled, y_train_encoded)
-    
-    rfe_features = [feature_cols[i] for i in range(len(feature_cols)) if rfe_selector.support_[i]]
-    print(f"RFE selected features: {rfe_features}")
+    # RFE with Random Forest (kademeli adım + erken durdurma)
+    rfe_features = selector_results['rfe']
+    print(f"RFE selected features ({len(rfe_features)}): {rfe_features}")
     
     # 3. MODEL-BASED FEATURE SELECTION
     print("\n" + "=" * 60)
@@ -116,21 +125,16 @@ def feature_selection_water_quality():
     print("=" * 60)
     
     # Random Forest Feature Importance
-    rf_selector = RandomForestClassifier(n_estimators=100, random_state=42)
-    rf_selector.fit(X_train_scaled, y_train_encoded)
-    
     rf_importance_df = pd.DataFrame({
         'feature': feature_cols,
-        'importance': rf_selector.feature_importances_
+        'importance': selector_results['rf_importance']
     }).sort_values('importance', ascending=False)
     
     print("Random Forest Feature Importance:")
     print(rf_importance_df)
     
-    # SelectFromModel
-    sfm_selector = SelectFromModel(rf_selector, threshold='median')
-    sfm_selector.fit(X_train_scaled, y_train_encoded)
-    sfm_features = [feature_cols[i] for i in range(len(feature_cols)) if sfm_selector.get_support()[i]]
+    # SelectFromModel (aynı RF önemleri, median eşiği)
+    sfm_features = selector_results['select_from_model']
     print(f"SelectFromModel selected features: {sfm_features}")
     
     # 4. FEATURE SELECTION PERFORMANCE TEST
@@ -148,54 +152,20 @@ def feature_selection_water_quality():
         'Top 2 RF': rf_importance_df.head(2)['feature'].tolist()
     }
     
-    performance_results = {}
+    # Adaylar paralel eğitilir (aynı feature listesi bir kez)
+    eval_start = time.perf_counter()
+    performance_results = evaluate_feature_sets(data, feature_sets)
+    timings['candidate_evaluation'] = time.perf_counter() - eval_start
     
-    for set_name, features in feature_sets.items():
-        if len(features) == 0:
-            continue
-            
-        print(f"\n{set_name} ({len(features)} features):")
+    for set_name, results in performance_results.items():
+        features = results['features']
+        overfitting_gap = results['overfitting_gap']
+        print(f"\n{set_name} ({len(features)} features, {results['seconds']:.1f}s):")
         print(f"Features: {features}")
-        
-        # Feature indices
-        feature_indices = [feature_cols.index(f) for f in features]
-        
-        # Subset data
-        X_train_subset = X_train_scaled[:, feature_indices]
-        X_val_subset = X_val_scaled[:, feature_indices]
-        X_test_subset = X_test_scaled[:, feature_indices]
-        
-        # Model eğit
-        rf = RandomForestClassifier(n_estimators=100, random_state=42)
-        rf.fit(X_train_subset, y_train_encoded)
-        
-        # Performance
-        train_acc = rf.score(X_train_subset, y_train_encoded)
-        val_acc = rf.score(X_val_subset, y_val_encoded)
-        test_acc = rf.score(X_test_subset, y_test_encoded)
-        
-        # Cross-validation
-        cv_scores = cross_val_score(rf, X_train_subset, y_train_encoded, cv=5)
-        cv_mean = cv_scores.mean()
-        cv_std = cv_scores.std()
-        
-        overfitting_gap = train_acc - val_acc
-        
-        performance_results[set_name] = {
-            'features': features,
-            'n_features': len(features),
-            'train_acc': train_acc,
-            'val_acc': val_acc,
-            'test_acc': test_acc,
-            'cv_mean': cv_mean,
-            'cv_std': cv_std,
-            'overfitting_gap': overfitting_gap
-        }
-        
-        print(f"  Train Acc: {train_acc:.4f}")
-        print(f"  Val Acc:   {val_acc:.4f}")
-        print(f"  Test Acc:  {test_acc:.4f}")
-        print(f"  CV Mean:   {cv_mean:.4f} (±{cv_std:.4f})")
+        print(f"  Train Acc: {results['train_acc']:.4f}")
+        print(f"  Val Acc:   {results['val_acc']:.4f}")
+        print(f"  Test Acc:  {results['test_acc']:.4f}")
+        print(f"  CV Mean:   {results['cv_mean']:.4f} (±{results['cv_std']:.4f})")
         print(f"  Overfit Gap: {overfitting_gap:.4f}")
         
         if overfitting_gap > 0.1:
@@ -205,6 +175,10 @@ def feature_selection_water_quality():
         else:
             print("  ⚠️  Hafif overfitting")
     
+    timings['total'] = time.perf_counter() - total_start
+    print_timings(timings)
+    save_timings('water_quality', timings)
+    
     # 5. VISUALIZATION
     visualize_feature_selection_results(feature_importance_df, performance_results)
     
@@ -270,29 +244,17 @@ def feature_selection_water_quantity():
         df.replace([np.inf, -np.inf], np.nan, inplace=True)
         df.fillna(0, inplace=True)
     
-    # Normalize
-    scaler = StandardScaler()
-    X_train_scaled = scaler.fit_transform(X_train)
-    X_val_scaled = scaler.transform(X_val)
-    X_test_scaled = scaler.transform(X_test)
+    # Normalize (bir kez, tüm yöntemler paylaşır)
+    total_start = time.perf_counter()
+    data = ScaledMatrices(X_train, y_train, X_val, y_val, X_test, y_test, feature_cols, 'regression')
     
     print(f"Original features: {len(feature_cols)}")
     
-    # Feature selection methods
-    # 1. F-score
-    f_selector = SelectKBest(score_func=f_regression, k='all')
-    f_selector.fit(X_train_scaled, y_train)
-    f_scores = f_selector.scores_
-    
-    # 2. Mutual Information
-    mi_selector = SelectKBest(score_func=mutual_info_regression, k='all')
-    mi_selector.fit(X_train_scaled, y_train)
-    mi_scores = mi_selector.scores_
-    
-    # 3. Random Forest Importance
-    rf_selector = RandomForestRegressor(n_estimators=100, random_state=42)
-    rf_selector.fit(X_train_scaled, y_train)
-    rf_importances = rf_selector.feature_importances_
+    # Feature selection methods (F-score, Mutual Information, Random Forest Importance) paralel
+    selector_results, timings = run_selectors(data, ('f_score', 'mi_score', 'rf_importance'))
+    f_scores = selector_results['f_score']
+    mi_scores = selector_results['mi_score']
+    rf_importances = selector_results['rf_importance']
     
     # Feature importance DataFrame
     feature_importance_df = pd.DataFrame({
@@ -326,57 +288,17 @@ def feature_selection_water_quantity():
         'Top RF': feature_importance_df.head(5)['feature'].tolist()
     }
     
-    performance_results = {}
-    
-    for set_name, features in feature_sets.items():
-        if len(features) == 0:
-            continue
-            
-        print(f"\n{set_name} ({len(features)} features):")
-        
-        # Feature indices
-        feature_indices = [feature_cols.index(f) for f in features]
-        
-        # Subset data
-        X_train_subset = X_train_scaled[:, feature_indices]
-        X_val_subset = X_val_scaled[:, feature_indices]
-        X_test_subset = X_test_scaled[:, feature_indices]
-        
-        # Model eğit
-        rf = RandomForestRegressor(n_estimators=100, random_state=42)
-        rf.fit(X_train_subset, y_train)
-        
-        # Predictions
-        train_pred = rf.predict(X_train_subset)
-        val_pred = rf.predict(X_val_subset)
-        test_pred = rf.predict(X_test_subset)
-        
-        # Metrics
-        train_rmse = np.sqrt(mean_squared_error(y_train, train_pred))
-        val_rmse = np.sqrt(mean_squared_error(y_val, val_pred))
-        test_rmse = np.sqrt(mean_squared_error(y_test, test_pred))
-        
-        train_r2 = r2_score(y_train, train_pred)
-        val_r2 = r2_score(y_val, val_pred)
-        test_r2 = r2_score(y_test, test_pred)
-        
-        overfitting_gap = train_rmse - val_rmse
-        
-        performance_results[set_name] = {
-            'features': features,
-            'n_features': len(features),
-            'train_rmse': train_rmse,
-            'val_rmse': val_rmse,
-            'test_rmse': test_rmse,
-            'train_r2': train_r2,
-            'val_r2': val_r2,
-            'test_r2': test_r2,
-            'overfitting_gap': overfitting_gap
-        }
-        
-        print(f"  Train RMSE: {train_rmse:.0f}, R²: {train_r2:.4f}")
-        print(f"  Val RMSE:   {val_rmse:.0f}, R²: {val_r2:.4f}")
-        print(f"  Test RMSE:  {test_rmse:.0f}, R²: {test_r2:.4f}")
+    # Adaylar paralel eğitilir (aynı feature listesi bir kez)
+    eval_start = time.perf_counter()
+    performance_results = evaluate_feature_sets(data, feature_sets)
+    timings['candidate_evaluation'] = time.perf_counter() - eval_start
+    
+    for set_name, results in performance_results.items():
+        overfitting_gap = results['overfitting_gap']
+        print(f"\n{set_name} ({results['n_features']} features, {results['seconds']:.1f}s):")
+        print(f"  Train RMSE: {results['train_rmse']:.0f}, R²: {results['train_r2']:.4f}")
+        print(f"  Val RMSE:   {results['val_rmse']:.0f}, R²: {results['val_r2']:.4f}")
+        print(f"  Test RMSE:  {results['test_rmse']:.0f}, R²: {results['test_r2']:.4f}")
         print(f"  Overfit Gap: {overfitting_gap:.0f}")
         
         if abs(overfitting_gap) < 10000000:
@@ -386,6 +308,10 @@ def feature_selection_water_quantity():
         else:
             print("  ⚠️  Hafif overfitting")
     
+    timings['total'] = time.perf_counter() - total_start
+    print_timings(timings)
+    save_timings('water_quantity', timings)
+    
     return performance_results, feature_importance_df
 
 def visualize_feature_selection_results(feature_importance_df, performance_results):
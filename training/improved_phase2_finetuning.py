@@ -22,8 +22,17 @@ from datetime import datetime
 import json
 from sklearn.metrics import accuracy_score, classification_report, confusion_matrix
 import time
+import os
+import sys
 from scipy.ndimage import zoom, rotate, gaussian_filter
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from lake_raster.shards import TileShards, shards_exist  # noqa: E402
+
+# python -m lake_raster.shards data/complete_train_dataset.csv data/complete_val_dataset.csv \
+#     data/complete_test_dataset.csv --mode phase2 --out data/shards/phase2_64
+SHARD_DIR = 'data/shards/phase2_64'
+
 logging.basicConfig(
     level=logging.INFO,
     format='%(asctime)s - %(levelname)s - %(message)s',
@@ -35,12 +44,14 @@ logging.basicConfig(
 
 class WaterQualityDataset(Dataset):
     """Su kalitesi dataset'i - DATA AUGMENTATION ile"""
-    def __init__(self, csv_file, max_samples=None, augment=False):
+    def __init__(self, csv_file, max_samples=None, augment=False, shard_dir=None):
         self.df = pd.read_csv(csv_file)
         if max_samples:
             self.df = self.df.sample(n=min(max_samples, len(self.df)), random_state=42)
         
         self.augment = augment
+        # Ön işlenmiş memmap shard'lar (varsa TIF her epoch'ta yeniden okunmaz)
+        self.shards = TileShards(shard_dir) if shard_dir else None
         
         # Label encoding
         self.label_mapping = {'good': 0, 'fair': 1, 'excellent': 2}
@@ -84,12 +95,9 @@ class WaterQualityDataset(Dataset):
     def __len__(self):
         return len(self.df)
     
-    def __getitem__(self, idx):
-        row = self.df.iloc[idx]
-        
+    def _read_tif(self, tif_path):
+        """TIF dosyasını oku, normalize et ve 64x64 tensor'a çevir"""
         try:
-            # TIF dosyasını oku
-            tif_path = row['file_path']
             with rasterio.open(tif_path) as src:
                 data = src.read(1)
                 
@@ -118,6 +126,24 @@ class WaterQualityDataset(Dataset):
         except Exception as e:
             img_tensor = torch.zeros(1, 64, 64)
         
+        return img_tensor
+    
+    def __getitem__(self, idx):
+        row = self.df.iloc[idx]
+        tif_path = row['file_path']
+        
+        if self.shards is not None and tif_path in self.shards:
+            # Ön işlenmiş örnek: memmap shard'dan kopyasız okunur
+            data = self.shards.get(tif_path)
+            if data is None:
+                img_tensor = torch.zeros(1, 64, 64)
+            else:
+                if self.augment:
+                    data = self.augment_image(data)
+                img_tensor = torch.from_numpy(np.ascontiguousarray(data, dtype=np.float32)).unsqueeze(0)
+        else:
+            img_tensor = self._read_tif(tif_path)
+        
         label = int(row['quality_encoded'])
         quality_score = float(row.get('quality_score', 0.5))
         
@@ -479,9 +505,11 @@ def main():
     
     # Datasets - DATA AUGMENTATION aktif
     logging.info("Dataset'ler yukleniyor...")
-    train_dataset = WaterQualityDataset('data/complete_train_dataset.csv', max_samples=20000, augment=True)
-    val_dataset = WaterQualityDataset('data/complete_val_dataset.csv', max_samples=3000, augment=False)
-    test_dataset = WaterQualityDataset('data/complete_test_dataset.csv', max_samples=3000, augment=False)
+    shard_dir = SHARD_DIR if shards_exist(SHARD_DIR) else None
+    logging.info(f"Shards: {shard_dir}")
+    train_dataset = WaterQualityDataset('data/complete_train_dataset.csv', max_samples=20000, augment=True, shard_dir=shard_dir)
+    val_dataset = WaterQualityDataset('data/complete_val_dataset.csv', max_samples=3000, augment=False, shard_dir=shard_dir)
+    test_dataset = WaterQualityDataset('data/complete_test_dataset.csv', max_samples=3000, augment=False, shard_dir=shard_dir)
     
     # Class weights hesapla
     label_counts = train_dataset.df['quality_label'].value_counts()
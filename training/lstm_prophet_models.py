@@ -13,6 +13,8 @@ from sklearn.metrics import mean_squared_error, r2_score, mean_absolute_error
 import warnings
 warnings.filterwarnings('ignore')
 
+from sequences import LakeSequences
+
 def lstm_water_quantity_model():
     """LSTM modeli ile su miktarı tahmini"""
     print("=" * 60)
@@ -88,23 +90,31 @@ def lstm_water_quantity_model():
     X_val_scaled = scaler.transform(X_val)
     X_test_scaled = scaler.transform(X_test)
     
-    # LSTM için sequence oluştur (basit yaklaşım)
-    def create_sequences(X, y, seq_length=12):
-        X_seq, y_seq = [], []
-        for i in range(seq_length, len(X)):
-            X_seq.append(X[i-seq_length:i])
-            y_seq.append(y.iloc[i])
-        return np.array(X_seq), np.array(y_seq)
-    
+    # LSTM için göl farkında sequence'ler (kopyasız pencereler, batch'ler tembel üretilir)
     seq_length = 12
-    X_train_seq, y_train_seq = create_sequences(pd.DataFrame(X_train_scaled), y_train, seq_length)
-    X_val_seq, y_val_seq = create_sequences(pd.DataFrame(X_val_scaled), y_val, seq_length)
-    X_test_seq, y_test_seq = create_sequences(pd.DataFrame(X_test_scaled), y_test, seq_length)
+    train_seq = LakeSequences(X_train_scaled, y_train, train_df['lake_id'], seq_length)
+    val_seq = LakeSequences(X_val_scaled, y_val, val_df['lake_id'], seq_length)
+    test_seq = LakeSequences(X_test_scaled, y_test, test_df['lake_id'], seq_length)
+    y_train_seq, y_val_seq, y_test_seq = train_seq.targets, val_seq.targets, test_seq.targets
     
     print(f"LSTM Sequence shapes:")
-    print(f"Train: X={X_train_seq.shape}, y={y_train_seq.shape}")
-    print(f"Val: X={X_val_seq.shape}, y={y_val_seq.shape}")
-    print(f"Test: X={X_test_seq.shape}, y={y_test_seq.shape}")
+    print(f"Train: X={train_seq.shape}, y={y_train_seq.shape}")
+    print(f"Val: X={val_seq.shape}, y={y_val_seq.shape}")
+    print(f"Test: X={test_seq.shape}, y={y_test_seq.shape}")
+    
+    batch_size = 32
+    shuffle_rng = np.random.default_rng(42)
+    
+    def as_dataset(seqs, shuffle=False):
+        # from_generator her epoch'ta generator'ı yeniden çağırır
+        signature = (
+            tf.TensorSpec(shape=(None, seq_length, len(feature_cols)), dtype=tf.float32),
+            tf.TensorSpec(shape=(None,), dtype=tf.float64),
+        )
+        return tf.data.Dataset.from_generator(
+            lambda: seqs.batches(batch_size, shuffle=shuffle, rng=shuffle_rng),
+            output_signature=signature,
+        ).prefetch(2)
     
     # LSTM model oluştur
     model = Sequential([
@@ -126,18 +136,17 @@ def lstm_water_quantity_model():
     
     # Model eğit
     history = model.fit(
-        X_train_seq, y_train_seq,
-        validation_data=(X_val_seq, y_val_seq),
+        as_dataset(train_seq, shuffle=True),
+        validation_data=as_dataset(val_seq),
         epochs=50,
-        batch_size=32,
         callbacks=[early_stopping],
         verbose=0
     )
     
     # Predictions
-    train_pred = model.predict(X_train_seq, verbose=0).flatten()
-    val_pred = model.predict(X_val_seq, verbose=0).flatten()
-    test_pred = model.predict(X_test_seq, verbose=0).flatten()
+    train_pred = model.predict(as_dataset(train_seq), verbose=0).flatten()
+    val_pred = model.predict(as_dataset(val_seq), verbose=0).flatten()
+    test_pred = model.predict(as_dataset(test_seq), verbose=0).flatten()
     
     # Metrics
     train_rmse = np.sqrt(mean_squared_error(y_train_seq, train_pred))
@@ -183,37 +192,93 @@ def lstm_water_quantity_model():
     
     return lstm_results
 
+PROPHET_MIN_TRAIN_ROWS = 10
+
+def _fit_prophet_lake(task):
+    """Tek göl için Prophet fit + tahmin (process pool worker'ı)"""
+    import logging
+    import time
+    from prophet import Prophet
+    logging.getLogger('cmdstanpy').setLevel(logging.WARNING)
+    logging.getLogger('prophet').setLevel(logging.WARNING)
+    
+    lake_id, (train_ds, train_y), (val_ds, _), (test_ds, _) = task
+    result = {'lake_id': lake_id, 'n_train': len(train_y), 'fit_seconds': 0.0}
+    if len(train_y) < PROPHET_MIN_TRAIN_ROWS:  # Yeterli veri yoksa atla
+        result['status'] = 'skipped'
+        return result
+    
+    start = time.perf_counter()
+    try:
+        model = Prophet(
+            yearly_seasonality=True,
+            weekly_seasonality=False,
+            daily_seasonality=False,
+            seasonality_mode='multiplicative',
+            changepoint_prior_scale=0.05,  # Conservative
+            seasonality_prior_scale=10.0
+        )
+        model.fit(pd.DataFrame({'ds': train_ds, 'y': train_y}))
+        
+        def predict(ds):
+            if len(ds) == 0:
+                return np.array([])
+            return model.predict(pd.DataFrame({'ds': ds}))['yhat'].values
+        
+        result['train_pred'] = predict(train_ds)
+        result['val_pred'] = predict(val_ds)
+        result['test_pred'] = predict(test_ds)
+        result['status'] = 'ok'
+    except Exception as e:
+        result['status'] = 'error'
+        result['error'] = str(e)
+    result['fit_seconds'] = time.perf_counter() - start
+    return result
+
+def fit_prophet_lakes(tasks, max_workers=None):
+    """Göl başına Prophet'i process pool'da fit et -> {lake_id: sonuç}"""
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+    
+    results = {}
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(_fit_prophet_lake, task): task[0] for task in tasks}
+        for i, future in enumerate(as_completed(futures), 1):
+            result = future.result()
+            results[futures[future]] = result
+            print(f"  [{i}/{len(tasks)}] Göl {result['lake_id']}: {result['status']} "
+                  f"({result['fit_seconds']:.1f}s)")
+    return results
+
 def prophet_water_quantity_model():
     """Prophet modeli ile su miktarı tahmini"""
     print("\n" + "=" * 60)
     print("PROPHET MODEL - SU MİKTARI TAHMİNİ")
     print("=" * 60)
     
-    try:
-        from prophet import Prophet
-        print("✅ Prophet yüklü - Prophet modeli oluşturuluyor...")
-    except ImportError:
+    # Prophet yalnızca worker'larda import edilir; burada sadece kurulu mu bakılır
+    import importlib.util
+    if importlib.util.find_spec('prophet') is None:
         print("❌ Prophet yüklü değil - Prophet modeli atlanıyor")
         return None
+    print("✅ Prophet yüklü - Prophet modeli oluşturuluyor...")
     
     # Veriyi yükle
     train_df = pd.read_parquet('water_quantity/output/train_combined.parquet')
     val_df = pd.read_parquet('water_quantity/output/val_combined.parquet')
     test_df = pd.read_parquet('water_quantity/output/test_combined.parquet')
     
-    # Prophet için veri hazırlama
+    # Prophet için veri hazırlama: göl başına sadece (ds, y) dizileri,
+    # böylece worker'lara tüm DataFrame değil yalnızca kendi gölü gider
     def prepare_prophet_data(df):
-        df = df.copy()
-        # Prophet için gerekli sütunlar: ds (date), y (target)
-        df['ds'] = pd.to_datetime(df['date'])
-        df['y'] = df['target_water_area_m2']
+        df = pd.DataFrame({
+            'lake_id': df['lake_id'].values,
+            'ds': pd.to_datetime(df['date']).values,
+            'y': df['target_water_area_m2'].values,
+        }).dropna(subset=['ds', 'y'])
         
-        # Göl bazlı analiz için
         results = {}
-        for lake_id in df['lake_id'].unique():
-            lake_data = df[df['lake_id'] == lake_id].copy()
-            lake_data = lake_data.sort_values('ds')
-            results[lake_id] = lake_data[['ds', 'y']].dropna()
+        for lake_id, lake_data in df.sort_values('ds', kind='stable').groupby('lake_id', sort=False):
+            results[lake_id] = (lake_data['ds'].values, lake_data['y'].values)
         
         return results
     
@@ -224,56 +289,47 @@ def prophet_water_quantity_model():
     
     print(f"Prophet için {len(train_data)} göl verisi hazırlandı")
     
-    # Her göl için Prophet modeli
-    prophet_results = {}
-    all_train_preds = []
-    all_val_preds = []
-    all_test_preds = []
-    all_train_actuals = []
-    all_val_actuals = []
-    all_test_actuals = []
-    
-    for lake_id in list(train_data.keys())[:3]:  # İlk 3 göl için (hız için)
-        print(f"\nGöl {lake_id} için Prophet modeli...")
-        
-        # Train data
-        train_lake = train_data[lake_id]
-        val_lake = val_data.get(lake_id, pd.DataFrame())
-        test_lake = test_data.get(lake_id, pd.DataFrame())
-        
-        if len(train_lake) < 10:  # Yeterli veri yoksa atla
+    # Her göl için Prophet modeli (tüm göller, paralel)
+    empty = (np.array([], dtype='datetime64[ns]'), np.array([], dtype=float))
+    tasks = [
+        (lake_id, train_data[lake_id], val_data.get(lake_id, empty), test_data.get(lake_id, empty))
+        for lake_id in sorted(train_data)
+    ]
+    lake_results = fit_prophet_lakes(tasks)
+    
+    all_train_preds, all_train_actuals = [], []
+    all_val_preds, all_val_actuals = [], []
+    all_test_preds, all_test_actuals = [], []
+    timing_rows = []
+    for lake_id, _, _, _ in tasks:  # Göl sırası sabit (metrikler tekrarlanabilir)
+        result = lake_results[lake_id]
+        timing_rows.append({
+            'lake_id': lake_id,
+            'status': result['status'],
+            'n_train': result['n_train'],
+            'fit_seconds': result['fit_seconds'],
+            'error': result.get('error'),
+        })
+        if result['status'] != 'ok':
             continue
-        
-        # Prophet modeli
-        model = Prophet(
-            yearly_seasonality=True,
-            weekly_seasonality=False,
-            daily_seasonality=False,
-            seasonality_mode='multiplicative',
-            changepoint_prior_scale=0.05,  # Conservative
-            seasonality_prior_scale=10.0
-        )
-        
-        # Model eğit
-        model.fit(train_lake)
-        
-        # Gelecek tarihleri oluştur
-        if len(val_lake) > 0:
-            val_future = pd.DataFrame({'ds': val_lake['ds']})
-            val_pred = model.predict(val_future)['yhat'].values
-            all_val_preds.extend(val_pred)
-            all_val_actuals.extend(val_lake['y'].values)
-        
-        if len(test_lake) > 0:
-            test_future = pd.DataFrame({'ds': test_lake['ds']})
-            test_pred = model.predict(test_future)['yhat'].values
-            all_test_preds.extend(test_pred)
-            all_test_actuals.extend(test_lake['y'].values)
-        
-        # Train için fit edilmiş değerler
-        train_pred = model.predict(pd.DataFrame({'ds': train_lake['ds']}))['yhat'].values
-        all_train_preds.extend(train_pred)
-        all_train_actuals.extend(train_lake['y'].values)
+        all_train_preds.extend(result['train_pred'])
+        all_train_actuals.extend(train_data[lake_id][1])
+        all_val_preds.extend(result['val_pred'])
+        all_val_actuals.extend(val_data.get(lake_id, empty)[1])
+        all_test_preds.extend(result['test_pred'])
+        all_test_actuals.extend(test_data.get(lake_id, empty)[1])
+    
+    timing_df = pd.DataFrame(timing_rows)
+    timing_df.to_csv('data/prophet_per_lake_timing.csv', index=False)
+    fitted = int((timing_df['status'] == 'ok').sum())
+    print(f"\nProphet: {fitted}/{len(timing_df)} göl fit edildi "
+          f"(atlanan: {int((timing_df['status'] == 'skipped').sum())}, "
+          f"hata: {int((timing_df['status'] == 'error').sum())})")
+    if fitted:
+        fit_times = timing_df.loc[timing_df['status'] == 'ok', 'fit_seconds']
+        print(f"Göl başına fit süresi: ort {fit_times.mean():.1f}s, maks {fit_times.max():.1f}s, "
+              f"toplam {fit_times.sum():.1f}s")
+    print("✅ Göl bazlı süreler: data/prophet_per_lake_timing.csv")
     
     # Genel metrics
     if len(all_train_preds) > 0:
@@ -323,7 +379,9 @@ def prophet_water_quantity_model():
         'train_mae': train_mae,
         'val_mae': val_mae,
         'test_mae': test_mae,
-        'overfitting_gap': overfitting_gap
+        'overfitting_gap': overfitting_gap,
+        'lakes_fitted': fitted,
+        'lakes_total': len(timing_df)
     }
     
     return prophet_results
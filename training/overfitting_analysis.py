@@ -12,6 +12,7 @@ from sklearn.model_selection import cross_val_score, TimeSeriesSplit
 from sklearn.ensemble import RandomForestClassifier, GradientBoostingClassifier
 from sklearn.metrics import classification_report, confusion_matrix
 from sklearn.preprocessing import StandardScaler
+from backtest import walk_forward_folds, run_backtest, metrics_table
 import warnings
 warnings.filterwarnings('ignore')
 
@@ -203,6 +204,12 @@ def analyze_water_quantity_overfitting():
         'Gradient Boosting (Overfit)': GradientBoostingRegressor(n_estimators=500, max_depth=10, random_state=42)
     }
     
+    # Zaman serisi CV: göl farkında walk-forward fold'lar, tüm (model, fold) çiftleri paralel
+    folds = walk_forward_folds(train_df['date'], train_df['lake_id'], n_folds=5)
+    cv_predictions, _ = run_backtest(models, X_train.to_numpy(dtype=np.float64), y_train.to_numpy(),
+                                     folds, scaler=StandardScaler(), include_train=False)
+    cv_table = metrics_table(cv_predictions, levels=['fold'])
+    
     results = {}
     
     for name, model in models.items():
@@ -226,10 +233,10 @@ def analyze_water_quantity_overfitting():
         test_rmse = np.sqrt(mean_squared_error(y_test, test_pred))
         test_r2 = r2_score(y_test, test_pred)
         
-        # Cross-validation
-        cv_scores = cross_val_score(model, X_train_scaled, y_train, cv=5, scoring='neg_mean_squared_error')
-        cv_rmse = np.sqrt(-cv_scores.mean())
-        cv_std = np.sqrt(cv_scores.std())
+        # Cross-validation (walk-forward fold MSE'leri)
+        fold_mse = cv_table.loc[cv_table['model'] == name, 'rmse'].to_numpy() ** 2
+        cv_rmse = np.sqrt(fold_mse.mean())
+        cv_std = np.sqrt(fold_mse.std())
         
         # Overfitting gap (RMSE difference)
         overfitting_gap = train_rmse - val_rmse
@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+"""
+BAĞIMLILIK FARKINDA, ÖNBELLEKLİ PIPELINE ÇALIŞTIRICI
+run_all_phases.py gibi çok fazlı akışlar için küçük bir DAG runner
+
+- Her faz girdi ve çıktı dosyalarını bildirir; bir fazın girdisi başka
+  bir fazın çıktısıysa aralarında bağımlılık oluşur (ek olarak `after`).
+- Faz anahtarı = script + argümanlar + girdi dosyalarının içerik hash'i.
+  Anahtar değişmediyse ve çıktılar kayıtlı hash'leriyle duruyorsa faz atlanır.
+  Dosya hash'leri (boyut, mtime) ile önbelleklenir, büyük dosyalar her
+  çalıştırmada yeniden okunmaz.
+- Birbirine bağlı olmayan fazlar (ör. kalite ve miktar kolları) paralel
+  çalışır; script fazları ayrı process, fonksiyon fazları ana thread'de.
+- Her faz için süre ve tepe bellek (RSS) çalıştırma raporuna yazılır.
+"""
+
+import hashlib
+import inspect
+import json
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Callable, Optional, Sequence
+
+STATE_PATH = 'data/.pipeline_state.json'
+REPORT_DIR = 'data/pipeline_runs'
+LOG_DIR = 'data/pipeline_logs'
+
+
+@dataclass
+class Phase:
+    """Pipeline fazı: script (ayrı process) ya da func (aynı process)"""
+    name: str
+    title: str
+    inputs: Sequence[str] = ()
+    outputs: Sequence[str] = ()
+    script: Optional[str] = None
+    args: Sequence[str] = ()
+    func: Optional[Callable] = None
+    after: Sequence[str] = ()
+    timeout: Optional[float] = None
+    deps: set = field(default_factory=set)
+
+
+def file_hash(path, cache):
+    """Dosya içerik hash'i; (boyut, mtime) değişmediyse önbellekten"""
+    if not os.path.exists(path):
+        return 'missing'
+    st = os.stat(path)
+    cached = cache.get(path)
+    if cached and cached['size'] == st.st_size and cached['mtime'] == st.st_mtime:
+        return cached['sha256']
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    cache[path] = {'size': st.st_size, 'mtime': st.st_mtime, 'sha256': digest.hexdigest()}
+    return cache[path]['sha256']
+
+
+def phase_key(phase, cache):
+    """Faz anahtarı: kod + argümanlar + girdi içerikleri"""
+    digest = hashlib.sha256()
+    if phase.script:
+        digest.update(file_hash(phase.script, cache).encode())
+    if phase.func is not None:
+        digest.update(f'{phase.func.__module__}.{phase.func.__qualname__}'.encode())
+        digest.update(file_hash(inspect.getsourcefile(phase.func), cache).encode())
+    digest.update(json.dumps(list(phase.args)).encode())
+    for path in sorted(phase.inputs):
+        digest.update(f'{path}={file_hash(path, cache)}'.encode())
+    return digest.hexdigest()
+
+
+def resolve_dependencies(phases):
+    """Çıktı -> faz eşlemesinden ve `after`dan bağımlılıkları kur; döngüyü reddet"""
+    by_name = {p.name: p for p in phases}
+    producers = {}
+    for p in phases:
+        for out in p.outputs:
+            producers[os.path.normpath(out)] = p.name
+    for p in phases:
+        p.deps = {producers[os.path.normpath(i)] for i in p.inputs if os.path.normpath(i) in producers}
+        p.deps |= set(p.after)
+        p.deps.discard(p.name)
+        unknown = p.deps - set(by_name)
+        if unknown:
+            raise ValueError(f'{p.name}: bilinmeyen bağımlılık {sorted(unknown)}')
+
+    # Döngü kontrolü (Kahn)
+    remaining = {p.name: set(p.deps) for p in phases}
+    while remaining:
+        ready = [n for n, d in remaining.items() if not d]
+        if not ready:
+            raise ValueError(f'Bağımlılık döngüsü: {sorted(remaining)}')
+        for n in ready:
+            del remaining[n]
+        for d in remaining.values():
+            d.difference_update(ready)
+    return by_name
+
+
+def _run_script(phase, log_path):
+    """Script'i ayrı process'te çalıştır -> (returncode, peak_rss_mb, saniye)
+
+    Süre worker thread'i işi aldığında başlar; executor kuyruğunda
+    beklenen zaman dahil değildir.
+    """
+    start = time.time()
+    os.makedirs(os.path.dirname(log_path), exist_ok=True)
+    with open(log_path, 'w', encoding='utf-8') as log:
+        proc = subprocess.Popen([sys.executable, phase.script, *phase.args],
+                                stdout=log, stderr=subprocess.STDOUT)
+        if hasattr(os, 'wait4') and phase.timeout is None:
+            # POSIX: bu child'a ait rusage (ru_maxrss Linux'ta KB, macOS'ta byte)
+            _, status, usage = os.wait4(proc.pid, 0)
+            proc.returncode = os.waitstatus_to_exitcode(status)
+            scale = 1024 ** 2 if sys.platform == 'darwin' else 1024
+            return proc.returncode, usage.ru_maxrss / scale, time.time() - start
+        returncode, peak = _poll_process(proc, phase.timeout)
+        return returncode, peak, time.time() - start
+
+
+def _poll_process(proc, timeout):
+    """wait4 olmayan platformlarda (Windows) psutil ile RSS örnekle"""
+    try:
+        import psutil
+        ps = psutil.Process(proc.pid)
+    except Exception:
+        ps = None
+    peak = 0
+    start = time.time()
+    while proc.poll() is None:
+        if timeout is not None and time.time() - start > timeout:
+            proc.kill()
+            proc.wait()
+            raise subprocess.TimeoutExpired(proc.args, timeout)
+        if ps is not None:
+            try:
+                peak = max(peak, ps.memory_info().rss)
+            except Exception:
+                pass
+        time.sleep(0.5)
+    return proc.returncode, (peak / 1024 ** 2 if ps is not None else None)
+
+
+def _run_func(phase):
+    """Fonksiyon fazı (ana thread) -> (returncode, peak_rss_mb)"""
+    ok = phase.func()
+    # Aynı process: runner'ın o ana kadarki tepe RSS'i
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        peak = peak / (1024 ** 2 if sys.platform == 'darwin' else 1024)
+    except ImportError:
+        peak = None
+    return (0 if ok is not False else 1), peak
+
+
+def run_pipeline(phases, jobs=None, force=(), dry_run=False, state_path=STATE_PATH,
+                 report_dir=REPORT_DIR, log_dir=LOG_DIR):
+    """Fazları bağımlılık sırasıyla (bağımsızları paralel) çalıştır -> rapor dict"""
+    by_name = resolve_dependencies(phases)
+    state = {'phases': {}, 'hashes': {}}
+    if os.path.exists(state_path):
+        with open(state_path, 'r', encoding='utf-8') as f:
+            state = json.load(f)
+    cache = state.setdefault('hashes', {})
+    force = set(by_name) if 'all' in force else set(force)
+
+    records = {}
+    pending = dict(by_name)
+    running = {}
+    run_start = time.time()
+
+    def save_state():
+        os.makedirs(os.path.dirname(state_path) or '.', exist_ok=True)
+        with open(state_path, 'w', encoding='utf-8') as f:
+            json.dump(state, f, indent=2)
+
+    def up_to_date(phase, key):
+        prev = state['phases'].get(phase.name)
+        if phase.name in force or not prev or prev.get('key') != key:
+            return False
+        return all(file_hash(o, cache) == prev['outputs'].get(o) for o in phase.outputs)
+
+    def finish(phase, key, status, duration=0.0, peak=None, returncode=None):
+        records[phase.name] = {
+            'phase': phase.name,
+            'title': phase.title,
+            'status': status,
+            'wall_seconds': round(duration, 2),
+            'peak_rss_mb': None if peak is None else round(peak, 1),
+            'returncode': returncode,
+            'deps': sorted(phase.deps),
+        }
+        if status == 'ran':
+            missing = [o for o in phase.outputs if not os.path.exists(o)]
+            if missing:
+                # Önbelleğe yazılmaz: bir sonraki çalıştırmada faz tekrar denenir
+                print(f"⚠️ {phase.title}: beklenen çıktılar yok: {missing}")
+            else:
+                state['phases'][phase.name] = {
+                    'key': key,
+                    'outputs': {o: file_hash(o, cache) for o in phase.outputs},
+                    'finished_at': datetime.now().isoformat(),
+                }
+                save_state()
+        icon = {'ran': '✅', 'skipped': '⏭️', 'failed': '❌', 'blocked': '⛔', 'stale': '🔄'}[status]
+        extra = f" ({duration:.2f}s" + (f", peak {peak:.0f} MB" if peak else '') + ')' if status == 'ran' else ''
+        print(f"{icon} {phase.title}: {status}{extra}")
+
+    executor = ThreadPoolExecutor(max_workers=jobs or os.cpu_count() or 1)
+    try:
+        while pending or running:
+            progressed = False
+            for name in list(pending):
+                phase = pending[name]
+                dep_status = [records.get(d, {}).get('status') for d in phase.deps]
+                if any(s in ('failed', 'blocked') for s in dep_status):
+                    del pending[name]
+                    finish(phase, None, 'blocked')
+                    progressed = True
+                    continue
+                if not all(s in ('ran', 'skipped', 'stale') for s in dep_status):
+                    continue
+
+                del pending[name]
+                progressed = True
+                key = phase_key(phase, cache)
+                if 'stale' not in dep_status and up_to_date(phase, key):
+                    finish(phase, key, 'skipped')
+                    continue
+                if dry_run:
+                    finish(phase, key, 'stale')
+                    continue
+
+                print(f"\n▶️ {phase.title} başlatılıyor...")
+                if phase.func is not None:
+                    start = time.time()
+                    try:
+                        returncode, peak = _run_func(phase)
+                    except Exception as e:
+                        print(f"💥 {phase.title} HATA: {e}")
+                        returncode, peak = 1, None
+                    finish(phase, key, 'ran' if returncode == 0 else 'failed',
+                           time.time() - start, peak, returncode)
+                else:
+                    log_path = os.path.join(log_dir, f'{phase.name}.log')
+                    running[executor.submit(_run_script, phase, log_path)] = (phase, key)
+
+            if running:
+                done, _ = wait(running, timeout=None if not progressed else 0, return_when=FIRST_COMPLETED)
+                for future in done:
+                    phase, key = running.pop(future)
+                    try:
+                        returncode, peak, duration = future.result()
+                    except subprocess.TimeoutExpired as e:
+                        print(f"⏰ {phase.title} ZAMAN AŞIMI!")
+                        returncode, peak, duration = -1, None, e.timeout
+                    except Exception as e:
+                        print(f"💥 {phase.title} HATA: {e}")
+                        returncode, peak, duration = -1, None, 0.0
+                    if returncode != 0:
+                        print(f"   Log: {os.path.join(log_dir, phase.name + '.log')}")
+                    finish(phase, key, 'ran' if returncode == 0 else 'failed',
+                           duration, peak, returncode)
+            elif not progressed and pending:
+                break
+    finally:
+        executor.shutdown(wait=True)
+        if not dry_run:
+            save_state()
+
+    report = {
+        'started_at': datetime.fromtimestamp(run_start).isoformat(),
+        'wall_seconds': round(time.time() - run_start, 2),
+        'dry_run': dry_run,
+        'phases': [records[p.name] for p in phases if p.name in records],
+    }
+    if not dry_run:
+        os.makedirs(report_dir, exist_ok=True)
+        report_path = os.path.join(report_dir, f"run_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+        with open(report_path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        report['report_path'] = report_path
+    return report
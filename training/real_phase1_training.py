@@ -18,8 +18,16 @@ from PIL import Image
 import rasterio
 from sklearn.model_selection import train_test_split
 import json
+import os
+import sys
 from datetime import datetime
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from lake_raster.shards import TileShards, shards_exist  # noqa: E402
+
+# python -m lake_raster.shards data/phase1_manifest.csv --mode phase1 --out data/shards/phase1_64
+SHARD_DIR = 'data/shards/phase1_64'
+
 # Logging setup
 logging.basicConfig(
     level=logging.INFO,
@@ -32,13 +40,15 @@ logging.basicConfig(
 
 class TIFDataset(Dataset):
     """TIF dosyalari icin Dataset"""
-    def __init__(self, manifest_path, transform=None, max_samples=None):
+    def __init__(self, manifest_path, transform=None, max_samples=None, shard_dir=None):
         self.manifest_df = pd.read_csv(manifest_path)
         if max_samples:
             self.manifest_df = self.manifest_df.sample(n=min(max_samples, len(self.manifest_df)), random_state=42)
         
         self.transform = transform
-        logging.info(f"Dataset yuklendi: {len(self.manifest_df)} dosya")
+        # On islenmis memmap shard'lar varsa TIF her epoch'ta yeniden okunmaz
+        self.shards = TileShards(shard_dir) if shard_dir else None
+        logging.info(f"Dataset yuklendi: {len(self.manifest_df)} dosya, shards: {shard_dir}")
     
     def __len__(self):
         return len(self.manifest_df)
@@ -46,6 +56,18 @@ class TIFDataset(Dataset):
     def __getitem__(self, idx):
         file_path = self.manifest_df.iloc[idx]['file_path']
         
+        if self.shards is not None and file_path in self.shards:
+            data = self.shards.get(file_path)
+            if data is None:
+                image = Image.new('RGB', (64, 64), (0, 0, 0))
+            else:
+                # Shard 64x64 ve normalize edilmis (Resize burada etkisiz)
+                band_uint8 = np.rint(data * 255).astype(np.uint8)
+                image = Image.fromarray(band_uint8, mode='L').convert('RGB')
+            if self.transform:
+                image = self.transform(image)
+            return image, idx
+        
         try:
             # TIF dosyasini oku
             with rasterio.open(file_path) as src:
@@ -182,7 +204,8 @@ def train_phase1():
     
     # Tum veri seti ile egitim (376,775 dosya)
     logging.info("Tum veri seti ile egitim baslatiliyor...")
-    dataset = TIFDataset(manifest_path, transform=get_transforms(), max_samples=None)
+    shard_dir = SHARD_DIR if shards_exist(SHARD_DIR) else None
+    dataset = TIFDataset(manifest_path, transform=get_transforms(), max_samples=None, shard_dir=shard_dir)
     
     # DataLoader
     batch_size = 4  # MX450 icin kucuk batch
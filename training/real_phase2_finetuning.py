@@ -17,6 +17,15 @@ from datetime import datetime
 import json
 from sklearn.metrics import accuracy_score, classification_report, confusion_matrix
 import time
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from lake_raster.shards import TileShards, shards_exist  # noqa: E402
+
+# python -m lake_raster.shards data/complete_train_dataset.csv data/complete_val_dataset.csv \
+#     data/complete_test_dataset.csv --mode phase2 --out data/shards/phase2_64
+SHARD_DIR = 'data/shards/phase2_64'
 
 logging.basicConfig(
     level=logging.INFO,
@@ -29,11 +38,14 @@ logging.basicConfig(
 
 class WaterQualityDataset(Dataset):
     """Su kalitesi dataset'i - label'lı verilerle"""
-    def __init__(self, csv_file, max_samples=None):
+    def __init__(self, csv_file, max_samples=None, shard_dir=None):
         self.df = pd.read_csv(csv_file)
         if max_samples:
             self.df = self.df.sample(n=min(max_samples, len(self.df)), random_state=42)
         
+        # Ön işlenmiş memmap shard'lar (varsa TIF her epoch'ta yeniden okunmaz)
+        self.shards = TileShards(shard_dir) if shard_dir else None
+        
         # Label encoding
         self.label_mapping = {'good': 0, 'fair': 1, 'excellent': 2}
         self.df['quality_encoded'] = self.df['quality_label'].map(self.label_mapping)
@@ -44,12 +56,9 @@ class WaterQualityDataset(Dataset):
     def __len__(self):
         return len(self.df)
     
-    def __getitem__(self, idx):
-        row = self.df.iloc[idx]
-        
+    def _read_tif(self, tif_path):
+        """TIF dosyasını oku, normalize et ve 64x64 tensor'a çevir"""
         try:
-            # TIF dosyasını oku
-            tif_path = row['file_path']
             with rasterio.open(tif_path) as src:
                 data = src.read(1)  # İlk band'ı al
                 
@@ -79,6 +88,22 @@ class WaterQualityDataset(Dataset):
             # Hata durumunda sıfır tensor döndür
             img_tensor = torch.zeros(1, 64, 64)
         
+        return img_tensor
+    
+    def __getitem__(self, idx):
+        row = self.df.iloc[idx]
+        tif_path = row['file_path']
+        
+        if self.shards is not None and tif_path in self.shards:
+            # Ön işlenmiş örnek: memmap shard'dan kopyasız okunur
+            data = self.shards.get(tif_path)
+            if data is None:
+                img_tensor = torch.zeros(1, 64, 64)
+            else:
+                img_tensor = torch.from_numpy(np.ascontiguousarray(data, dtype=np.float32)).unsqueeze(0)
+        else:
+            img_tensor = self._read_tif(tif_path)
+        
         # Label ve ekstra features
         label = int(row['quality_encoded'])
         quality_score = float(row.get('quality_score', 0.5))
@@ -344,9 +369,11 @@ def main():
     
     # Datasets (daha küçük subset ile başla - hız için)
     logging.info("Dataset'ler yukleniyor...")
-    train_dataset = WaterQualityDataset('data/complete_train_dataset.csv', max_samples=10000)
-    val_dataset = WaterQualityDataset('data/complete_val_dataset.csv', max_samples=2000)
-    test_dataset = WaterQualityDataset('data/complete_test_dataset.csv', max_samples=2000)
+    shard_dir = SHARD_DIR if shards_exist(SHARD_DIR) else None
+    logging.info(f"Shards: {shard_dir}")
+    train_dataset = WaterQualityDataset('data/complete_train_dataset.csv', max_samples=10000, shard_dir=shard_dir)
+    val_dataset = WaterQualityDataset('data/complete_val_dataset.csv', max_samples=2000, shard_dir=shard_dir)
+    test_dataset = WaterQualityDataset('data/complete_test_dataset.csv', max_samples=2000, shard_dir=shard_dir)
     
     # DataLoaders
     train_loader = DataLoader(train_dataset, batch_size=32, shuffle=True, num_workers=0)
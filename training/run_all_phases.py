@@ -4,45 +4,48 @@
 Phase 1: Self-Supervised Pre-training
 Phase 2: Supervised Fine-tuning  
 Phase 3: Ensemble Methods
++ Su miktarı kolu (LSTM/Prophet) ve final karşılaştırma
+
+Fazlar pipeline.py ile DAG olarak çalışır: girdileri ve kodu değişmeyen
+fazlar atlanır, bağımsız kollar paralel koşar. Proje kökünden:
+    python training/run_all_phases.py                 # sadece değişenler
+    python training/run_all_phases.py --force phase3  # phase3'ü zorla
+    python training/run_all_phases.py --dry-run       # planı göster
 """
 
-import subprocess
-import sys
-import time
+import argparse
+import os
+import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
 import seaborn as sns
 
-def run_phase(phase_script, phase_name):
-    """Bir fazı çalıştır"""
-    print(f"\n{'='*60}")
-    print(f"{phase_name} BAŞLATILIYOR...")
-    print(f"{'='*60}")
-    
-    start_time = time.time()
-    
-    try:
-        result = subprocess.run([sys.executable, phase_script], 
-                              capture_output=True, text=True, timeout=300)
-        
-        end_time = time.time()
-        duration = end_time - start_time
-        
-        if result.returncode == 0:
-            print(f"✅ {phase_name} BAŞARILI!")
-            print(f"⏱️ Süre: {duration:.2f} saniye")
-            return True, duration
-        else:
-            print(f"❌ {phase_name} HATALI!")
-            print(f"Hata: {result.stderr}")
-            return False, duration
-            
-    except subprocess.TimeoutExpired:
-        print(f"⏰ {phase_name} ZAMAN AŞIMI!")
-        return False, 300
-    except Exception as e:
-        print(f"💥 {phase_name} HATA: {e}")
-        return False, 0
+from pipeline import Phase, run_pipeline
+
+TRAINING_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def script(name):
+    return os.path.join(TRAINING_DIR, name)
+
+
+PHASE1_OUTPUTS = [
+    'data/phase1_manifest.csv',
+    'data/phase1_tif_files.csv',
+    'data/phase1_contrastive_pairs.csv',
+    'data/phase1_features_sample.json',
+    'data/phase1_summary.json',
+]
+PHASE2_OUTPUTS = [
+    'data/phase2_model_performance.csv',
+    'data/phase2_predictions.csv',
+    'data/phase2_summary.json',
+]
+PHASE3_OUTPUTS = [
+    'data/phase3_ensemble_performance.csv',
+    'data/phase3_ensemble_predictions.csv',
+    'data/phase3_summary.json',
+]
 
 def create_final_comparison():
     """Final karşılaştırma grafiği"""
@@ -217,46 +220,68 @@ def create_final_comparison():
         print(f"Final karşılaştırma hatası: {e}")
         return False
 
+def build_phases():
+    """Faz tanımları: girdi/çıktı dosyaları bağımlılıkları belirler"""
+    return [
+        # Phase 1 data/gol_* klasörlerini de tarar; yeni tile indirildiyse --force phase1
+        Phase('phase1', 'PHASE 1: SELF-SUPERVISED PRE-TRAINING',
+              script=script('phase1_self_supervised.py'), args=['prepare'],
+              inputs=['data/merged_quality_labels.csv', 'data/real_quality_labels.csv',
+                      'data/real_quality_labels_delta.csv'],
+              outputs=PHASE1_OUTPUTS),
+        Phase('phase2', 'PHASE 2: SUPERVISED FINE-TUNING',
+              script=script('phase2_supervised_finetuning.py'),
+              inputs=['data/balanced_tif_mapping.csv'],
+              outputs=PHASE2_OUTPUTS),
+        Phase('phase3', 'PHASE 3: ENSEMBLE METHODS',
+              script=script('phase3_ensemble.py'),
+              inputs=['data/balanced_tif_mapping.csv'],
+              outputs=PHASE3_OUTPUTS),
+        # Su miktarı kolu, kalite fazlarından bağımsız (paralel çalışır)
+        Phase('quantity_time_series', 'SU MİKTARI: LSTM + PROPHET',
+              script=script('lstm_prophet_models.py'),
+              inputs=['water_quantity/output/train_combined.parquet',
+                      'water_quantity/output/val_combined.parquet',
+                      'water_quantity/output/test_combined.parquet'],
+              outputs=['data/time_series_models_analysis.png',
+                       'data/prophet_per_lake_timing.csv']),
+        Phase('final_comparison', 'FINAL KARŞILAŞTIRMA',
+              func=create_final_comparison,
+              inputs=['data/phase1_summary.json', 'data/phase2_summary.json',
+                      'data/phase3_summary.json', 'data/phase2_model_performance.csv',
+                      'data/phase3_ensemble_performance.csv'],
+              outputs=['data/final_three_phase_comparison.png']),
+    ]
+
 def main():
-    """Ana fonksiyon - 3 fazı çalıştır"""
+    """Ana fonksiyon - fazları bağımlılık sırasıyla çalıştır"""
+    parser = argparse.ArgumentParser(description='3 fazlı yaklaşım (önbellekli DAG runner)')
+    parser.add_argument('--force', nargs='+', default=[], help="Yeniden çalıştırılacak fazlar ('all' hepsi)")
+    parser.add_argument('--jobs', type=int, default=None, help='Paralel faz sayısı')
+    parser.add_argument('--dry-run', action='store_true', help='Sadece hangi fazların çalışacağını göster')
+    args = parser.parse_args()
+    
     print("🚀 3 FAZLI YAKLAŞIM BAŞLATILIYOR")
     print("=" * 60)
     
-    phases = [
-        ('phase1_self_supervised.py', 'PHASE 1: SELF-SUPERVISED PRE-TRAINING'),
-        ('phase2_supervised_finetuning.py', 'PHASE 2: SUPERVISED FINE-TUNING'),
-        ('phase3_ensemble.py', 'PHASE 3: ENSEMBLE METHODS')
-    ]
-    
-    results = {}
-    total_time = 0
-    
-    for phase_script, phase_name in phases:
-        success, duration = run_phase(phase_script, phase_name)
-        results[phase_name] = {'success': success, 'duration': duration}
-        total_time += duration
-        
-        if not success:
-            print(f"❌ {phase_name} başarısız! Devam ediliyor...")
-    
-    # Final karşılaştırma
-    print(f"\n{'='*60}")
-    print("FINAL KARŞILAŞTIRMA OLUŞTURULUYOR...")
-    print(f"{'='*60}")
-    
-    create_final_comparison()
+    phases = build_phases()
+    report = run_pipeline(phases, jobs=args.jobs, force=args.force, dry_run=args.dry_run)
     
     # Sonuç özeti
     print(f"\n{'='*60}")
     print("3 FAZLI YAKLAŞIM TAMAMLANDI!")
     print(f"{'='*60}")
     
-    for phase_name, result in results.items():
-        status = "✅ BAŞARILI" if result['success'] else "❌ BAŞARISIZ"
-        print(f"{phase_name}: {status} ({result['duration']:.2f}s)")
+    print(f"{'Faz':<45}{'Durum':<10}{'Süre (s)':>10}{'Tepe RAM (MB)':>15}")
+    for record in report['phases']:
+        peak = '-' if record['peak_rss_mb'] is None else f"{record['peak_rss_mb']:.0f}"
+        print(f"{record['title']:<45}{record['status']:<10}{record['wall_seconds']:>10.2f}{peak:>15}")
     
-    print(f"\nToplam süre: {total_time:.2f} saniye")
-    print(f"Başarılı faz: {sum(1 for r in results.values() if r['success'])}/3")
+    print(f"\nToplam süre: {report['wall_seconds']:.2f} saniye")
+    ok = sum(1 for r in report['phases'] if r['status'] in ('ran', 'skipped'))
+    print(f"Güncel faz: {ok}/{len(phases)}")
+    if 'report_path' in report:
+        print(f"Çalıştırma raporu: {report['report_path']}")
     
     print(f"\n📁 Oluşturulan dosyalar:")
     print(f"  - data/phase1_*.csv, *.json, *.png")
@@ -264,7 +289,7 @@ def main():
     print(f"  - data/phase3_*.csv, *.json, *.png")
     print(f"  - data/final_three_phase_comparison.png")
     
-    return results
+    return report
 
 if __name__ == "__main__":
     results = main()
@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+"""
+PARALEL FEATURE SELECTION MOTORU
+feature_selection.py için ortak ölçeklenmiş matrisler, paralel seçiciler ve aday değerlendirme
+
+feature_selection.py f-score, mutual information, RFE, RandomForest önemi ve
+SelectFromModel'i sırayla çalıştırıp her aday feature seti için ayrı bir
+RandomForest eğitiyordu; RFE step=1 ile her adımda 100 ağaçlık ormanı
+yeniden kuruyordu. Burada:
+
+- StandardScaler bir kez fit edilir; train/val/test matrisleri tüm
+  yöntemler ve adaylar arasında paylaşılır (joblib büyük dizileri worker'lara
+  memmap olarak geçirir, kopya yok).
+- Seçiciler ve aday set değerlendirmeleri joblib ile paralel çalışır; aynı
+  feature listesine sahip adaylar bir kez değerlendirilir.
+- RFE kademeli adımla (kalan fazlalığın bir oranı, hedefe yaklaşınca 1) ve
+  isteğe bağlı erken durdurmayla çalışır. Erken durdurma train'den ayrılan
+  bir dilimle yapılır; validation satırları aday karşılaştırmasına kalır.
+- SelectFromModel, RF önemlerini yeniden fit etmeden kullanır (aynı
+  random_state ile aynı sonuç).
+- Her yöntem ve aday için süre skorların yanında raporlanır.
+"""
+
+import math
+import time
+
+import numpy as np
+from joblib import Parallel, delayed
+from sklearn.ensemble import RandomForestClassifier, RandomForestRegressor
+from sklearn.feature_selection import f_classif, f_regression, mutual_info_classif, mutual_info_regression
+from sklearn.metrics import mean_squared_error, r2_score
+from sklearn.model_selection import cross_val_score, train_test_split
+from sklearn.preprocessing import StandardScaler
+
+RF_PARAMS = {'n_estimators': 100, 'random_state': 42}
+
+
+class ScaledMatrices:
+    """Bir kez ölçeklenmiş train/val/test matrisleri (tüm yöntemler paylaşır)"""
+
+    def __init__(self, X_train, y_train, X_val, y_val, X_test, y_test, feature_names, task):
+        scaler = StandardScaler()
+        self.X_train = np.ascontiguousarray(scaler.fit_transform(X_train))
+        self.X_val = np.ascontiguousarray(scaler.transform(X_val))
+        self.X_test = np.ascontiguousarray(scaler.transform(X_test))
+        self.y_train = np.asarray(y_train)
+        self.y_val = np.asarray(y_val)
+        self.y_test = np.asarray(y_test)
+        self.feature_names = list(feature_names)
+        self.task = task  # 'classification' | 'regression'
+        self.scaler = scaler
+
+    def indices(self, features):
+        return [self.feature_names.index(f) for f in features]
+
+
+def _forest(task, rf_params=None):
+    params = dict(RF_PARAMS, **(rf_params or {}))
+    if task == 'classification':
+        return RandomForestClassifier(**params)
+    return RandomForestRegressor(**params)
+
+
+# ---------------------------------------------------------------------------
+# Seçiciler
+# ---------------------------------------------------------------------------
+
+def _f_score(data, **_):
+    score_func = f_classif if data.task == 'classification' else f_regression
+    return score_func(data.X_train, data.y_train)[0]
+
+
+def _mi_score(data, random_state=None, **_):
+    score_func = mutual_info_classif if data.task == 'classification' else mutual_info_regression
+    return score_func(data.X_train, data.y_train, random_state=random_state)
+
+
+def _rf_importance(data, rf_params=None, **_):
+    model = _forest(data.task, rf_params)
+    model.fit(data.X_train, data.y_train)
+    return model.feature_importances_
+
+
+def rfe_schedule(n_features, n_select, fraction=0.3):
+    """Her turda elenecek feature sayısı: fazlalığın `fraction` kadarı, en az 1"""
+    steps = []
+    remaining = n_features
+    while remaining > n_select:
+        step = max(1, int(math.floor((remaining - n_select) * fraction)))
+        steps.append(step)
+        remaining -= step
+    return steps
+
+
+def _early_stop_split(data, holdout, random_state=42):
+    """Train satırlarından (fit, erken durdurma) dilimleri
+
+    Sınıflandırmada katmanlı rastgele, regresyonda sırayı koruyan son dilim.
+    """
+    classification = data.task == 'classification'
+    return train_test_split(
+        data.X_train, data.y_train, test_size=holdout, shuffle=classification,
+        stratify=data.y_train if classification else None,
+        random_state=random_state if classification else None,
+    )
+
+
+def _rfe(data, rf_params=None, n_select=5, fraction=0.3, patience=None, holdout=0.2, **_):
+    """Kademeli RFE -> (seçilen indeksler, tur sayısı)
+
+    patience verilmezse tam olarak n_select feature döner. Verilirse
+    modeller train'in (1 - holdout) kısmında eğitilir ve her tur ayrılan
+    train diliminde skorlanır (validation satırlarına dokunulmaz; aksi halde
+    'RFE' adayının validation skoru iyimser olur). Skor `patience` tur
+    boyunca iyileşmezse eleme durur ve en iyi skorlu alt küme döner; bu
+    alt küme n_select'ten fazla feature içerebilir.
+    """
+    X_fit, y_fit = data.X_train, data.y_train
+    if patience is not None:
+        X_fit, X_stop, y_fit, y_stop = _early_stop_split(data, holdout)
+    active = np.arange(data.X_train.shape[1])
+    best_score, best_active, stale, rounds = -np.inf, active, 0, 0
+    for step in rfe_schedule(len(active), n_select, fraction) + [0]:
+        model = _forest(data.task, rf_params)
+        model.fit(X_fit[:, active], y_fit)
+        rounds += 1
+        if patience is not None:
+            score = model.score(X_stop[:, active], y_stop)
+            if score > best_score:
+                best_score, best_active, stale = score, active, 0
+            else:
+                stale += 1
+                if stale >= patience:
+                    return best_active, rounds
+        if step == 0:
+            break
+        # En düşük önemli `step` feature'ı ele (sklearn RFE ile aynı sıralama)
+        keep = np.sort(np.argsort(model.feature_importances_, kind='stable')[step:])
+        active = active[keep]
+    return (active if patience is None else best_active), rounds
+
+
+SELECTORS = {
+    'f_score': _f_score,
+    'mi_score': _mi_score,
+    'rf_importance': _rf_importance,
+    'rfe': _rfe,
+}
+
+
+def _timed(name, func, data, kwargs):
+    start = time.perf_counter()
+    result = func(data, **kwargs)
+    return name, result, time.perf_counter() - start
+
+
+def run_selectors(data, methods=('f_score', 'mi_score', 'rf_importance'), n_jobs=-1, **kwargs):
+    """Seçicileri paralel çalıştır -> (sonuçlar, süreler)
+
+    'select_from_model' istenirse RF önemlerinden (medyan eşiği) türetilir.
+    rfe sonucu seçilen feature isimleri listesidir.
+    """
+    need_rf = 'select_from_model' in methods and 'rf_importance' not in methods
+    run = [m for m in methods if m in SELECTORS] + (['rf_importance'] if need_rf else [])
+    outputs = Parallel(n_jobs=min(len(run), n_jobs if n_jobs > 0 else len(run)) or 1)(
+        delayed(_timed)(name, SELECTORS[name], data, kwargs) for name in run
+    )
+    results, timings = {}, {}
+    for name, result, seconds in outputs:
+        timings[name] = seconds
+        if name == 'rfe':
+            active, rounds = result
+            results[name] = [data.feature_names[i] for i in active]
+            timings['rfe_rounds'] = rounds
+        else:
+            results[name] = result
+    if 'select_from_model' in methods:
+        importances = results['rf_importance']
+        # SelectFromModel(threshold='median'): importance >= medyan
+        mask = importances >= np.median(importances)
+        results['select_from_model'] = [f for f, keep in zip(data.feature_names, mask) if keep]
+        timings['select_from_model'] = 0.0
+        if need_rf:
+            del results['rf_importance']
+    return results, timings
+
+
+# ---------------------------------------------------------------------------
+# Aday set değerlendirme
+# ---------------------------------------------------------------------------
+
+def _evaluate(data, features, rf_params=None, cv=5):
+    start = time.perf_counter()
+    idx = data.indices(features)
+    X_train = data.X_train[:, idx]
+    X_val = data.X_val[:, idx]
+    X_test = data.X_test[:, idx]
+    model = _forest(data.task, rf_params)
+    model.fit(X_train, data.y_train)
+
+    if data.task == 'classification':
+        train_acc = model.score(X_train, data.y_train)
+        val_acc = model.score(X_val, data.y_val)
+        test_acc = model.score(X_test, data.y_test)
+        cv_scores = cross_val_score(_forest(data.task, rf_params), X_train, data.y_train, cv=cv)
+        result = {
+            'train_acc': train_acc,
+            'val_acc': val_acc,
+            'test_acc': test_acc,
+            'cv_mean': cv_scores.mean(),
+            'cv_std': cv_scores.std(),
+            'overfitting_gap': train_acc - val_acc,
+        }
+    else:
+        preds = {s: model.predict(X) for s, X in (('train', X_train), ('val', X_val), ('test', X_test))}
+        ys = {'train': data.y_train, 'val': data.y_val, 'test': data.y_test}
+        result = {}
+        for s in ('train', 'val', 'test'):
+            result[f'{s}_rmse'] = np.sqrt(mean_squared_error(ys[s], preds[s]))
+        for s in ('train', 'val', 'test'):
+            result[f'{s}_r2'] = r2_score(ys[s], preds[s])
+        result['overfitting_gap'] = result['train_rmse'] - result['val_rmse']
+    result['seconds'] = time.perf_counter() - start
+    return result
+
+
+def evaluate_feature_sets(data, feature_sets, n_jobs=-1, rf_params=None, cv=5):
+    """Aday setleri paralel değerlendir -> {set adı: metrikler}
+
+    Boş setler atlanır; aynı feature listesine sahip setler bir kez eğitilir.
+    """
+    unique = {}
+    for features in feature_sets.values():
+        if features:
+            unique.setdefault(tuple(features), None)
+    keys = list(unique)
+    outputs = Parallel(n_jobs=min(len(keys), n_jobs if n_jobs > 0 else len(keys)) or 1)(
+        delayed(_evaluate)(data, list(k), rf_params, cv) for k in keys
+    )
+    unique = dict(zip(keys, outputs))
+
+    results = {}
+    for set_name, features in feature_sets.items():
+        if not features:
+            continue
+        results[set_name] = {'features': features, 'n_features': len(features), **unique[tuple(features)]}
+    return results
+
+
+def print_timings(timings, title='SÜRELER'):
+    print(f"\n⏱️  {title}:")
+    for name, seconds in timings.items():
+        if name.endswith('_rounds'):
+            continue
+        extra = f" ({timings[name + '_rounds']} tur)" if f'{name}_rounds' in timings else ''
+        print(f"  {name:<22} {seconds:8.2f}s{extra}")
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+LAKE-AWARE SLIDING-WINDOW SEQUENCES
+LSTM için göl sınırlarına uyan, kopyasız (strided view) pencereler
+
+create_sequences() eskiden X[i-seq_length:i] dilimlerini listeye ekleyip
+np.array() ile (satır x seq_length x feature) boyutunda tam kopya
+oluşturuyordu ve göller arasındaki sınırları görmüyordu. LakeSequences
+kaynak matrisi bir kez (göl sırasına göre, float32) tutar; pencereler
+sliding_window_view ile bu matrisin üzerinde görünümdür. Bellek kullanımı
+kaynak matris + geçerli pencere başlangıç indeksleri kadardır; sadece
+istenen batch kopyalanır.
+
+Pencere i: satırlar [start, start + seq_length), hedef satır start + seq_length
+(eski create_sequences ile aynı hizalama), hepsi aynı gölde.
+"""
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+class LakeSequences:
+    """(X, y, lake) tablosu üzerinde göl farkında kayan pencereler"""
+
+    def __init__(self, X, y, groups=None, seq_length=12, dtype=np.float32):
+        X = np.asarray(X)
+        y = np.asarray(y)
+        n = len(X)
+        if groups is None:
+            codes = np.zeros(n, dtype=np.int64)
+        else:
+            _, codes = np.unique(np.asarray(groups), return_inverse=True)
+
+        # Göllerin satırları bitişik olmalı; değilse (göl içi sıra korunarak) bir kez sırala
+        changes = np.flatnonzero(codes[1:] != codes[:-1]) + 1
+        n_groups = int(codes.max()) + 1 if n else 0
+        if len(changes) != max(n_groups - 1, 0):
+            order = np.argsort(codes, kind='stable')
+            X, y, codes = X[order], y[order], codes[order]
+            changes = np.flatnonzero(codes[1:] != codes[:-1]) + 1
+        else:
+            order = None
+
+        self.seq_length = seq_length
+        self.order = order  # kaynak satır sırası (None: değişmedi)
+        self.X = np.ascontiguousarray(X, dtype=dtype)
+        self.y = np.asarray(y, dtype=np.float64)
+        self.groups = codes
+
+        # Pencere başlangıcı ve hedef satırı aynı göl bloğunda olmalı
+        block_starts = np.concatenate([[0], changes])
+        block_ends = np.concatenate([changes, [n]])
+        starts = [
+            np.arange(b0, b1 - seq_length, dtype=np.int64)
+            for b0, b1 in zip(block_starts, block_ends)
+            if b1 - b0 > seq_length
+        ]
+        self.starts = np.concatenate(starts) if starts else np.zeros(0, dtype=np.int64)
+
+        # (n - seq_length + 1, seq_length, n_features) görünümü, kopya yok
+        if n >= seq_length:
+            self.windows = sliding_window_view(self.X, seq_length, axis=0).transpose(0, 2, 1)
+        else:
+            self.windows = np.zeros((0, seq_length, self.X.shape[1]), dtype=dtype)
+
+    def __len__(self):
+        return len(self.starts)
+
+    @property
+    def shape(self):
+        return (len(self), self.seq_length, self.X.shape[1])
+
+    @property
+    def targets(self):
+        """Pencere hedefleri (1-D, kopya yalnızca len(self) kadar)"""
+        return self.y[self.starts + self.seq_length]
+
+    @property
+    def target_rows(self):
+        """Hedef satırların kaynak tablodaki indeksleri"""
+        rows = self.starts + self.seq_length
+        return rows if self.order is None else self.order[rows]
+
+    def __getitem__(self, i):
+        """Tek pencere: (seq_length, n_features) görünümü ve hedef"""
+        start = self.starts[i]
+        return self.windows[start], self.y[start + self.seq_length]
+
+    def view(self):
+        """Tüm pencereler kesintisizse (tek göl) tam strided görünüm, değilse None"""
+        if len(self) and self.starts[-1] - self.starts[0] + 1 == len(self):
+            return self.windows[self.starts[0]:self.starts[-1] + 1]
+        return None
+
+    def batch(self, indices):
+        """Seçilen pencereleri (batch_size, seq_length, n_features) olarak topla"""
+        starts = self.starts[indices]
+        return self.windows[starts], self.y[starts + self.seq_length]
+
+    def batches(self, batch_size=32, shuffle=False, rng=None):
+        """Batch'leri tembel üret; aynı rng ile her çağrıda (epoch) yeni karıştırma"""
+        if shuffle:
+            rng = rng if rng is not None else np.random.default_rng()
+            indices = rng.permutation(len(self))
+        else:
+            indices = np.arange(len(self))
+        for b in range(0, len(indices), batch_size):
+            yield self.batch(indices[b:b + batch_size])
+
+    def to_array(self):
+        """Eski create_sequences çıktısı gibi tam kopya (küçük veri / uyumluluk)"""
+        return self.batch(np.arange(len(self)))
+
@@ -3,18 +3,25 @@
 import pandas as pd
 import numpy as np
 from pathlib import Path
-from catboost import CatBoostRegressor
 from sklearn.metrics import mean_absolute_error, mean_squared_error
 import json
 import os
+import sys
 import warnings
 warnings.filterwarnings("ignore")
 
+# Ortak çok ufuklu eğitim sürücüsü backend/horizon_training.py
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "backend"))
+from horizon_training import (  # noqa: E402
+    HorizonPools, build_feature_matrix, fill_missing_features, train_horizons,
+)
+
 # 1) Dosya yolu ve çıktı klasörü
 
 DATA_DIR = Path(r"C:\Users\glylm\Desktop\proje_aqua\water_quantity\output")
 MODEL_DIR = DATA_DIR / "models"
 MODEL_DIR.mkdir(parents=True, exist_ok=True)
+POOL_CACHE_DIR = DATA_DIR / "pool_cache"
 
 TRAIN_FILE = DATA_DIR / "train_combined.parquet"
 VAL_FILE = DATA_DIR / "val_combined.parquet"
@@ -33,62 +40,58 @@ test_df = pd.read_parquet(TEST_FILE)
 
 # 3) Eksik feature doldurma
 
-num_cols = train_df.select_dtypes(include=[np.number]).columns.tolist()
-num_cols = [c for c in num_cols if c not in ["lake_id", TARGET_COL]]
-for col in num_cols:
-    median_val = train_df[col].median()
-    train_df[col].fillna(median_val, inplace=True)
-    val_df[col].fillna(median_val, inplace=True)
-    test_df[col].fillna(median_val, inplace=True)
-
-train_df.fillna(method="ffill", inplace=True)
-val_df.fillna(method="ffill", inplace=True)
-test_df.fillna(method="ffill", inplace=True)
+fill_missing_features(train_df, val_df, test_df, TARGET_COL)
 
 # 4) Model ve tahmin
-
-metrics_summary = {}
-predictions_list = []
-
-for H in HORIZONS:
-    print(f"\n=== Training horizon H={H} ===")
-    # Horizon filtreleme
-    X_train = train_df[train_df["H"] == H].drop(columns=["lake_name", "date", TARGET_COL])
-    y_train = train_df.loc[train_df["H"] == H, TARGET_COL]
-    
-    X_val = val_df[val_df["H"] == H].drop(columns=["lake_name", "date", TARGET_COL])
-    y_val = val_df.loc[val_df["H"] == H, TARGET_COL]
-    
-    X_test = test_df[test_df["H"] == H].drop(columns=["lake_name", "date", TARGET_COL])
-    y_test = test_df.loc[test_df["H"] == H, TARGET_COL]
-
-    # CatBoost
-    model = CatBoostRegressor(
+# Özellik matrisleri split başına bir kez kurulur, ufuklar satır indeksleri;
+# üç ufuk eşzamanlı eğitilir (thread'ler ufuklar arasında bölünür)
+
+feature_cols = [c for c in train_df.columns if c not in ["lake_name", "date", TARGET_COL]]
+pools = HorizonPools(
+    {name: build_feature_matrix(df, feature_cols, TARGET_COL, "H")
+     for name, df in [("train", train_df), ("val", val_df), ("test", test_df)]},
+    cache_dir=str(POOL_CACHE_DIR),
+)
+results, training_report = train_horizons(
+    pools,
+    dict(
         iterations=2000,
         depth=6,
         learning_rate=0.05,
         loss_function="RMSE",
         random_seed=42,
         verbose=100
-    )
-    model.fit(
-        X_train, y_train,
-        eval_set=(X_val, y_val),
-        use_best_model=True
-    )
+    ),
+    HORIZONS,
+    fit_params={"use_best_model": True},
+)
+
+metrics_summary = {}
+predictions_list = []
+
+for H in HORIZONS:
+    if "model" not in results.get(H, {}):
+        print(f"H{H}: model eğitilemedi, atlanıyor")
+        continue
+    model = results[H]["model"]
 
     # Tahmin
+    X_test, y_test = pools.data("test", H)
     test_pred = model.predict(X_test)
     
     # Metrikler
-    mask = ~y_test.isna()
+    mask = ~np.isnan(y_test)
     y_clean, p_clean = y_test[mask], test_pred[mask]
     mae = mean_absolute_error(y_clean, p_clean)
     rmse = np.sqrt(mean_squared_error(y_clean, p_clean))
-    metrics_summary[f"H{H}"] = {"MAE": mae, "RMSE": rmse, "Test_rows": len(y_clean)}
+    metrics_summary[f"H{H}"] = {
+        "MAE": mae, "RMSE": rmse, "Test_rows": len(y_clean),
+        "Fit_seconds": round(results[H]["fit_seconds"], 2),
+        "Best_iteration": results[H]["best_iteration"],
+    }
     print(f"H{H} Test -> MAE={mae:.0f} | RMSE={rmse:.0f} | {len(y_clean)} rows")
 
-    # Tahminleri kaydet
+    # Tahminleri kaydet (pools.data satırları test_df sırasıyla)
     temp_df = test_df[test_df["H"] == H].copy()
     temp_df["predicted_water_area"] = test_pred
     predictions_list.append(temp_df[["lake_id","date","H",TARGET_COL,"predicted_water_area"]])
@@ -98,6 +101,8 @@ for H in HORIZONS:
     model.save_model(str(model_path))
     print(f"Saved model -> {model_path}")
 
+print(f"Eğitim duvar süresi: {training_report['wall_seconds']:.1f}s")
+
 
 # 5) CSV/JSON kaydetme
 
@@ -106,6 +111,8 @@ all_predictions.to_parquet(MODEL_DIR / "all_predictions.parquet", index=False)
 pd.DataFrame.from_dict(metrics_summary, orient="index").to_csv(MODEL_DIR / "metrics_summary.csv")
 with open(MODEL_DIR / "metrics_summary.json", "w") as f:
     json.dump(metrics_summary, f, indent=2)
+with open(MODEL_DIR / "training_report.json", "w") as f:
+    json.dump(training_report, f, indent=2)
 
 print("All predictions and metrics saved.")
 